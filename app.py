@@ -1,34 +1,51 @@
 import streamlit as st
-import pandas as pd
-import joblib
 
 # ==========================================
-# Cargar modelo entrenado
+# Cargar modelo entrenado (una vez por proceso, solo al pedir una predicción)
 # ==========================================
-try:
-    model = joblib.load("modelo_protector_solar_mejorado.pkl")
-    EXPECTED_FEATURES = model.feature_names_in_ if hasattr(model, 'feature_names_in_') else [
-        'Edad',
-        'Género_Femenino', 'Género_Masculino', 'Género_Prefiero no decirlo',
-        'Tipo_de_piel_Grasa', 'Tipo_de_piel_Mixta', 'Tipo_de_piel_Normal', 'Tipo_de_piel_Seca', 'Tipo_de_piel_Sensible',
-        'Color_de_piel_Clara', 'Color_de_piel_Morena clara', 'Color_de_piel_Morena oscura', 'Color_de_piel_Muy clara', 'Color_de_piel_Oscura',
-        'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_A veces', 
-        'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_No', 
-        'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_Sí',
-        'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Entre 1 y 3 horas', 
-        'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Más de 3 horas', 
-        'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Menos de 1 hora',
-        'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Casi nunca', 
-        'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Frecuentemente', 
-        'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Muy frecuentemente', 
-        'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Ocasionalmente'
-    ]
-except FileNotFoundError:
-    st.error("🚨 ERROR: El archivo del modelo 'modelo_protector_solar_mejorado.pkl' no fue encontrado.")
-    st.stop()
-except Exception as e:
-    st.error(f"🚨 ERROR al cargar el modelo: {e}")
-    st.stop()
+def obtener_predictor():
+    # Importación diferida: numpy y el modelo no retrasan el primer renderizado
+    from recomendador.bosque import bosque_para
+    from recomendador.cache import cache_predicciones
+    from recomendador.codificador import codificador_para
+    from recomendador.modelo import cargar_modelo, verificar_columnas
+    from recomendador.prediccion import Predictor
+    from recomendador.registro import registro_predicciones
+    from recomendador.tabla import cargar_tabla_si_vigente
+
+    try:
+        modelo_cargado = cargar_modelo()
+        verificar_columnas(modelo_cargado)
+        model = modelo_cargado.modelo
+        EXPECTED_FEATURES = model.feature_names_in_ if hasattr(model, 'feature_names_in_') else [
+            'Edad',
+            'Género_Femenino', 'Género_Masculino', 'Género_Prefiero no decirlo',
+            'Tipo_de_piel_Grasa', 'Tipo_de_piel_Mixta', 'Tipo_de_piel_Normal', 'Tipo_de_piel_Seca', 'Tipo_de_piel_Sensible',
+            'Color_de_piel_Clara', 'Color_de_piel_Morena clara', 'Color_de_piel_Morena oscura', 'Color_de_piel_Muy clara', 'Color_de_piel_Oscura',
+            'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_A veces', 
+            'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_No', 
+            'Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol_Sí',
+            'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Entre 1 y 3 horas', 
+            'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Más de 3 horas', 
+            'Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol_Menos de 1 hora',
+            'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Casi nunca', 
+            'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Frecuentemente', 
+            'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Muy frecuentemente', 
+            'Qué_tan_frecuente_realizas_actividades_al_aire_libre_Ocasionalmente'
+        ]
+        # Bosque compilado + codificador + tabla precalculada (None si falta o no corresponde al modelo)
+        # + caché de perfiles compartida por todas las sesiones del proceso
+        # + registro de cada perfil puntuado, escrito en segundo plano
+        return Predictor(
+            bosque_para(modelo_cargado), codificador_para(EXPECTED_FEATURES), cargar_tabla_si_vigente(modelo_cargado),
+            cache_predicciones, modelo_cargado.version, registro_predicciones(),
+        )
+    except FileNotFoundError:
+        st.error("🚨 ERROR: El archivo del modelo 'modelo_protector_solar_mejorado.pkl' no fue encontrado.")
+        st.stop()
+    except Exception as e:
+        st.error(f"🚨 ERROR al cargar el modelo: {e}")
+        st.stop()
 
 # ==========================================
 # Configuración de Página
@@ -196,147 +213,146 @@ st.divider()
 # ==========================================
 # Sección 3: Sensibilidad y Exposición Solar
 # ==========================================
-with st.container(border=True):
-    st.markdown("### ☀️ Paso 3: Tu exposición al sol")
-    
-    # Sensibilidad a quemaduras
-    st.markdown("#### 🔥 ¿Tu piel se enrojece o quema fácilmente con el sol?")
-    
-    # Valor por defecto
-    if 'quemarse' not in st.session_state:
-        st.session_state.quemarse = "A veces"
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        btn_type = "primary" if st.session_state.quemarse == "Sí" else "secondary"
-        if st.button("🚨 Sí, muy fácil", use_container_width=True, key="quema_si", type=btn_type):
-            st.session_state.quemarse = "Sí"
-    
-    with col2:
-        btn_type = "primary" if st.session_state.quemarse == "A veces" else "secondary"
-        if st.button("⚠️ A veces", use_container_width=True, key="quema_aveces", type=btn_type):
-            st.session_state.quemarse = "A veces"
-    
-    with col3:
-        btn_type = "primary" if st.session_state.quemarse == "No" else "secondary"
-        if st.button("✅ No, raramente", use_container_width=True, key="quema_no", type=btn_type):
-            st.session_state.quemarse = "No"
-    
-    quemarse = st.session_state.quemarse
-    
-    st.markdown("---")
-    
-    # Horas de exposición
-    st.markdown("#### ⏰ ¿Cuántas horas al día estás expuesto al sol?")
-    
-    # Valor por defecto
-    if 'horas_sol' not in st.session_state:
-        st.session_state.horas_sol = "Entre 1 y 3 horas"
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        card_class = 'option-card-selected' if st.session_state.horas_sol == "Menos de 1 hora" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>🌤️</div>
-                <strong>Menos de 1 hora</strong><br>
-                <small>Interior la mayor parte del día</small>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="hora1", use_container_width=True):
-            st.session_state.horas_sol = "Menos de 1 hora"
-            st.rerun()
-    
-    with col2:
-        card_class = 'option-card-selected' if st.session_state.horas_sol == "Entre 1 y 3 horas" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>☀️</div>
-                <strong>Entre 1 y 3 horas</strong><br>
-                <small>Exposición moderada</small>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="hora2", use_container_width=True):
-            st.session_state.horas_sol = "Entre 1 y 3 horas"
-            st.rerun()
-    
-    with col3:
-        card_class = 'option-card-selected' if st.session_state.horas_sol == "Más de 3 horas" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>🌞</div>
-                <strong>Más de 3 horas</strong><br>
-                <small>Exposición intensa</small>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="hora3", use_container_width=True):
-            st.session_state.horas_sol = "Más de 3 horas"
-            st.rerun()
-    
-    horas_sol = st.session_state.horas_sol
-    
-    st.markdown("---")
-    
-    # Actividades al aire libre
-    st.markdown("#### 🏃 ¿Con qué frecuencia realizas actividades al aire libre?")
-    
-    # Valor por defecto
-    if 'aire_libre' not in st.session_state:
-        st.session_state.aire_libre = "Ocasionalmente"
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        card_class = 'option-card-selected' if st.session_state.aire_libre == "Casi nunca" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>🏠</div>
-                <strong>Casi nunca</strong>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="aire1", use_container_width=True):
-            st.session_state.aire_libre = "Casi nunca"
-            st.rerun()
-    
-    with col2:
-        card_class = 'option-card-selected' if st.session_state.aire_libre == "Ocasionalmente" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>🚶</div>
-                <strong>Ocasionalmente</strong>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="aire2", use_container_width=True):
-            st.session_state.aire_libre = "Ocasionalmente"
-            st.rerun()
-    
-    with col3:
-        card_class = 'option-card-selected' if st.session_state.aire_libre == "Frecuentemente" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>🏃</div>
-                <strong>Frecuentemente</strong>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="aire3", use_container_width=True):
-            st.session_state.aire_libre = "Frecuentemente"
-            st.rerun()
-    
-    with col4:
-        card_class = 'option-card-selected' if st.session_state.aire_libre == "Muy frecuentemente" else 'option-card'
-        st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='big-emoji'>⛰️</div>
-                <strong>Muy frecuente</strong>
-            </div>
-        """, unsafe_allow_html=True)
-        if st.button("Seleccionar", key="aire4", use_container_width=True):
-            st.session_state.aire_libre = "Muy frecuentemente"
-            st.rerun()
-    
-    aire_libre = st.session_state.aire_libre
+# Valores por defecto (fuera del fragmento: el resto de la página también los lee)
+if 'quemarse' not in st.session_state:
+    st.session_state.quemarse = "A veces"
+if 'horas_sol' not in st.session_state:
+    st.session_state.horas_sol = "Entre 1 y 3 horas"
+if 'aire_libre' not in st.session_state:
+    st.session_state.aire_libre = "Ocasionalmente"
+
+
+def seleccionar(campo, valor):
+    # Se ejecuta antes de la siguiente corrida: la tarjeta ya sale marcada sin st.rerun()
+    st.session_state[campo] = valor
+
+
+# Fragmento: elegir una opción solo vuelve a ejecutar esta sección, no toda la página
+@st.fragment
+def seccion_exposicion():
+    with st.container(border=True):
+        st.markdown("### ☀️ Paso 3: Tu exposición al sol")
+        
+        # Sensibilidad a quemaduras
+        st.markdown("#### 🔥 ¿Tu piel se enrojece o quema fácilmente con el sol?")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            btn_type = "primary" if st.session_state.quemarse == "Sí" else "secondary"
+            st.button("🚨 Sí, muy fácil", use_container_width=True, key="quema_si", type=btn_type,
+                      on_click=seleccionar, args=("quemarse", "Sí"))
+        
+        with col2:
+            btn_type = "primary" if st.session_state.quemarse == "A veces" else "secondary"
+            st.button("⚠️ A veces", use_container_width=True, key="quema_aveces", type=btn_type,
+                      on_click=seleccionar, args=("quemarse", "A veces"))
+        
+        with col3:
+            btn_type = "primary" if st.session_state.quemarse == "No" else "secondary"
+            st.button("✅ No, raramente", use_container_width=True, key="quema_no", type=btn_type,
+                      on_click=seleccionar, args=("quemarse", "No"))
+        
+        st.markdown("---")
+        
+        # Horas de exposición
+        st.markdown("#### ⏰ ¿Cuántas horas al día estás expuesto al sol?")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            card_class = 'option-card-selected' if st.session_state.horas_sol == "Menos de 1 hora" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>🌤️</div>
+                    <strong>Menos de 1 hora</strong><br>
+                    <small>Interior la mayor parte del día</small>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="hora1", use_container_width=True,
+                      on_click=seleccionar, args=("horas_sol", "Menos de 1 hora"))
+        
+        with col2:
+            card_class = 'option-card-selected' if st.session_state.horas_sol == "Entre 1 y 3 horas" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>☀️</div>
+                    <strong>Entre 1 y 3 horas</strong><br>
+                    <small>Exposición moderada</small>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="hora2", use_container_width=True,
+                      on_click=seleccionar, args=("horas_sol", "Entre 1 y 3 horas"))
+        
+        with col3:
+            card_class = 'option-card-selected' if st.session_state.horas_sol == "Más de 3 horas" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>🌞</div>
+                    <strong>Más de 3 horas</strong><br>
+                    <small>Exposición intensa</small>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="hora3", use_container_width=True,
+                      on_click=seleccionar, args=("horas_sol", "Más de 3 horas"))
+        
+        st.markdown("---")
+        
+        # Actividades al aire libre
+        st.markdown("#### 🏃 ¿Con qué frecuencia realizas actividades al aire libre?")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            card_class = 'option-card-selected' if st.session_state.aire_libre == "Casi nunca" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>🏠</div>
+                    <strong>Casi nunca</strong>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="aire1", use_container_width=True,
+                      on_click=seleccionar, args=("aire_libre", "Casi nunca"))
+        
+        with col2:
+            card_class = 'option-card-selected' if st.session_state.aire_libre == "Ocasionalmente" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>🚶</div>
+                    <strong>Ocasionalmente</strong>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="aire2", use_container_width=True,
+                      on_click=seleccionar, args=("aire_libre", "Ocasionalmente"))
+        
+        with col3:
+            card_class = 'option-card-selected' if st.session_state.aire_libre == "Frecuentemente" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>🏃</div>
+                    <strong>Frecuentemente</strong>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="aire3", use_container_width=True,
+                      on_click=seleccionar, args=("aire_libre", "Frecuentemente"))
+        
+        with col4:
+            card_class = 'option-card-selected' if st.session_state.aire_libre == "Muy frecuentemente" else 'option-card'
+            st.markdown(f"""
+                <div class='{card_class}'>
+                    <div class='big-emoji'>⛰️</div>
+                    <strong>Muy frecuente</strong>
+                </div>
+            """, unsafe_allow_html=True)
+            st.button("Seleccionar", key="aire4", use_container_width=True,
+                      on_click=seleccionar, args=("aire_libre", "Muy frecuentemente"))
+        
+
+
+seccion_exposicion()
+quemarse = st.session_state.quemarse
+horas_sol = st.session_state.horas_sol
+aire_libre = st.session_state.aire_libre
 
 st.divider()
 
@@ -360,45 +376,39 @@ st.divider()
 # ==========================================
 
 if predict_button:
+    from recomendador.esquema import NOMBRES
+    from recomendador.metricas import cronometro
+    from recomendador.prediccion import NIVEL_ALTO, NIVEL_MAXIMO
+
+    # Tiempos por etapa (solo con RECOMENDADOR_METRICAS=1)
     with st.spinner("🔄 Analizando tu perfil..."):
-        # 1. Convertir entrada a DataFrame
-        entrada = pd.DataFrame({
-            "Edad": [edad],
-            "Género": [genero],
-            "Tipo_de_piel": [tipo_piel],
-            "Color_de_piel": [color_piel],
-            "Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol": [quemarse],
-            "Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol": [horas_sol],
-            "Qué_tan_frecuente_realizas_actividades_al_aire_libre": [aire_libre]
-        })
+        with cronometro("carga_modelo"):
+            predictor = obtener_predictor()
+        perfil = {
+            "Edad": edad,
+            "Género": genero,
+            "Tipo_de_piel": tipo_piel,
+            "Color_de_piel": color_piel,
+            "Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol": quemarse,
+            "Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol": horas_sol,
+            "Qué_tan_frecuente_realizas_actividades_al_aire_libre": aire_libre
+        }
 
-        # 2. Procesar y alinear columnas
+        # Una sola pasada por el modelo: clase, probabilidad y nivel de SPF
         try:
-            entrada_encoded = pd.get_dummies(entrada)
-            
-            final_features = []
-            for col in EXPECTED_FEATURES:
-                if col in entrada_encoded.columns:
-                    final_features.append(entrada_encoded[col])
-                else:
-                    final_features.append(pd.Series([0], name=col))
-            
-            entrada_aligned = pd.concat(final_features, axis=1)
-            if 'Edad' in entrada_aligned.columns:
-                entrada_aligned['Edad'] = entrada['Edad']
-            entrada_aligned = entrada_aligned[EXPECTED_FEATURES]
-
-        except Exception as e:
+            with cronometro("prediccion"):
+                resultado = predictor.predecir(perfil)
+        except ValueError as e:
             st.error(f"Error al procesar la entrada: {e}")
             st.stop()
 
-        # 3. Predicción
-        pred = model.predict(entrada_aligned)[0]
-        prob_si = model.predict_proba(entrada_aligned)[0][1]
+        pred = resultado.etiqueta
+        prob_si = resultado.prob_si
 
     # ==========================================
     # Mostrar Resultado
     # ==========================================
+    render = cronometro("render")
     
     st.markdown("## 🎯 Tu Recomendación Personalizada")
     
@@ -427,7 +437,7 @@ if predict_button:
             """)
             
             # Recomendación de SPF según probabilidad
-            if prob_si > 0.85:
+            if resultado.nivel_spf == NIVEL_MAXIMO:
                 st.error("### 🚨 Nivel de Protección: MÁXIMO", icon="⚠️")
                 st.markdown("""
                     - **SPF Recomendado:** 50+ (Muy Alto)
@@ -436,7 +446,7 @@ if predict_button:
                     - **Tipo:** Resistente al agua y de amplio espectro
                     - **Extra:** Usa sombrero, gafas y ropa protectora
                 """)
-            elif prob_si > 0.65:
+            elif resultado.nivel_spf == NIVEL_ALTO:
                 st.warning("### ⚠️ Nivel de Protección: ALTO", icon="☀️")
                 st.markdown("""
                     - **SPF Recomendado:** 30-50 (Alto)
@@ -502,10 +512,32 @@ if predict_button:
             st.metric("Exposición Solar", horas_sol)
             st.metric("Actividades", aire_libre)
 
+        # Cuánto movió cada respuesta la probabilidad de "Sí" respecto a la base del modelo
+        explicacion = predictor.explicar(perfil)
+        st.markdown("#### 🔍 ¿Qué influyó en tu recomendación?")
+        for campo, aporte in explicacion.ordenados(minimo=0.0005):
+            icono = "🔺" if aporte > 0 else "🔻"
+            st.markdown(f"{icono} **{NOMBRES[campo]}**: {aporte * 100:+.1f} puntos")
+        st.caption(
+            f"Partiendo de una probabilidad base de {explicacion.base * 100:.1f}%, "
+            f"tus respuestas la llevan a {prob_si * 100:.1f}%. "
+            "🔺 acerca la recomendación al uso diario; 🔻 la aleja."
+        )
+        if explicacion.sin_columna:
+            # Respuestas que no caen en ninguna categoría del modelo (p. ej. la edad exacta)
+            st.caption(
+                "No las usa el modelo: "
+                + ", ".join(NOMBRES[campo] for campo in explicacion.sin_columna)
+                + "."
+            )
+
+    render.detener()
+
 # ==========================================
 # Pie de página
 # ==========================================
 st.markdown("---")
+st.page_link("pages/1_📊_Estadísticas.py", label="Ver las estadísticas de la encuesta", icon="📊")
 st.markdown("""
     <div style='text-align: center; color: #666;'>
         <p>🧪 <strong>Sunscreen AI Predictor</strong> | Proyecto de Machine Learning y Estadística</p>
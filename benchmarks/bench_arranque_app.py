@@ -0,0 +1,96 @@
+"""Presupuesto de arranque en frío de ``app.py``.
+
+Ejecuta la app en modo "bare" de Streamlit (sin servidor) con
+``python -X importtime`` en procesos nuevos, muestra los módulos de primer
+nivel que más tardan en importarse y termina con código 1 si el arranque
+supera el presupuesto de ``presupuesto_arranque.json`` o si se importa
+alguno de los módulos que no deben cargarse antes del primer renderizado.
+
+Uso::
+
+    python benchmarks/bench_arranque_app.py [--repeticiones 5] [--top 15]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+RUTA_PRESUPUESTO = Path(__file__).resolve().parent / "presupuesto_arranque.json"
+
+_LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def leer_importtime(texto: str) -> List[Tuple[str, int, int]]:
+    """(módulo, acumulado en µs, nivel de anidación) por cada línea de ``-X importtime``."""
+    filas = []
+    for linea in texto.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            filas.append((modulo, int(acumulado), len(sangria) // 2))
+    return filas
+
+
+def medir_arranque() -> Tuple[float, List[Tuple[str, int, int]]]:
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "app.py"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    segundos = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f"app.py terminó con código {proceso.returncode}:\n{proceso.stderr[-2000:]}")
+    return segundos, leer_importtime(proceso.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Módulos de primer nivel a mostrar")
+    args = parser.parse_args(argv)
+
+    presupuesto = json.loads(RUTA_PRESUPUESTO.read_text(encoding="utf-8"))
+    tiempos = []
+    acumulados: Dict[str, List[int]] = {}
+    importados = set()
+    for _ in range(args.repeticiones):
+        segundos, filas = medir_arranque()
+        tiempos.append(segundos)
+        for modulo, acumulado, nivel in filas:
+            importados.add(modulo)
+            if nivel == 0:
+                acumulados.setdefault(modulo, []).append(acumulado)
+
+    mediana = statistics.median(tiempos)
+    print(f"{'módulo':<40} {'importación (ms)':>17}")
+    ranking = sorted(acumulados.items(), key=lambda par: -statistics.median(par[1]))
+    for modulo, valores in ranking[:args.top]:
+        print(f"{modulo:<40} {statistics.median(valores) / 1000:>17.1f}")
+    print(f"\nArranque en frío (mediana de {args.repeticiones}): {mediana:.3f} s "
+          f"(presupuesto {presupuesto['segundos_maximos']:.3f} s)")
+
+    fallos = []
+    if mediana > presupuesto["segundos_maximos"]:
+        fallos.append(f"el arranque tardó {mediana:.3f} s")
+    prohibidos = sorted(
+        modulo for modulo in importados
+        if modulo.split(".")[0] in presupuesto["modulos_prohibidos"]
+    )
+    if prohibidos:
+        raiz_prohibidos = sorted({modulo.split(".")[0] for modulo in prohibidos})
+        fallos.append(f"se importaron módulos diferidos antes del primer renderizado: {raiz_prohibidos}")
+
+    for fallo in fallos:
+        print(f"🚨 Regresión: {fallo}", file=sys.stderr)
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
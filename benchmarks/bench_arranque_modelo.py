@@ -0,0 +1,60 @@
+"""Arranque en frío y memoria residente: ``.pkl`` de joblib frente al artefacto ``.bosque``.
+
+Cada medición corre en un proceso nuevo para incluir el costo de importar
+las dependencias (sklearn, scipy...) que arrastra cada formato.
+
+Uso::
+
+    python benchmarks/bench_arranque_modelo.py
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MEDICION = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from recomendador.modelo import cargar_modelo
+modelo_cargado = cargar_modelo(sys.argv[1])
+segundos = time.perf_counter() - inicio
+rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"segundos": segundos, "rss_mib": rss_kib / 1024, "sklearn": "sklearn" in sys.modules}))
+"""
+
+
+def medir(ruta: Path, repeticiones: int) -> dict:
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", MEDICION, str(ruta)],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        )
+        resultados.append(json.loads(salida.stdout))
+    return {
+        "segundos": statistics.median(r["segundos"] for r in resultados),
+        "rss_mib": statistics.median(r["rss_mib"] for r in resultados),
+        "sklearn": resultados[0]["sklearn"],
+    }
+
+
+def main(repeticiones: int = 5) -> None:
+    from recomendador.modelo import RUTA_ARTEFACTO, RUTA_MODELO
+
+    print(f"{'formato':<10} {'tamaño (KiB)':>13} {'arranque (s)':>13} {'RSS máx (MiB)':>14} {'sklearn':>8}")
+    for ruta in (RUTA_MODELO, RUTA_ARTEFACTO):
+        if not ruta.exists():
+            print(f"{ruta.suffix:<10} (no existe)")
+            continue
+        r = medir(ruta, repeticiones)
+        print(f"{ruta.suffix:<10} {ruta.stat().st_size / 1024:>13.0f} {r['segundos']:>13.3f} "
+              f"{r['rss_mib']:>14.1f} {'sí' if r['sklearn'] else 'no':>8}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(RAIZ))
+    main()
@@ -0,0 +1,63 @@
+"""Latencia del bosque compilado frente a ``predict_proba`` de sklearn.
+
+Uso::
+
+    python benchmarks/bench_bosque.py
+"""
+
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recomendador.bosque import compilar_bosque  # noqa: E402
+from recomendador.codificador import codificador_para  # noqa: E402
+from recomendador.esquema import CAMPOS, DOMINIOS  # noqa: E402
+from recomendador.modelo import RUTA_MODELO, cargar_modelo  # noqa: E402
+
+
+def perfiles_aleatorios(n: int, semilla: int = 42) -> dict:
+    rng = np.random.default_rng(semilla)
+    return {campo: np.asarray(DOMINIOS[campo], dtype=object)[rng.integers(0, len(DOMINIOS[campo]), n)]
+            for campo in CAMPOS}
+
+
+def medir(funcion, X: np.ndarray, repeticiones: int) -> float:
+    funcion(X)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(X)
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main() -> None:
+    modelo = cargar_modelo(RUTA_MODELO).modelo
+    inicio = time.perf_counter()
+    bosque = compilar_bosque(modelo)
+    print(f"Compilación: {bosque.n_arboles} árboles, {bosque.n_nodos} nodos, "
+          f"{bosque.nbytes / 1024:.0f} KiB en {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    # sklearn se mide con el arreglo tal cual: sin el aviso por falta de nombres de columna
+    warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+    X = codificador_para(modelo.feature_names_in_).codificar_lote(perfiles_aleatorios(10_000))
+    diferencia = np.abs(bosque.predict_proba(X) - modelo.predict_proba(X)).max()
+    print(f"Diferencia máxima con sklearn: {diferencia:.2e}")
+
+    print(f"{'filas':>8} {'sklearn (ms)':>14} {'compilado (ms)':>16} {'aceleración':>12}")
+    for filas, repeticiones in ((1, 200), (10_000, 5)):
+        lote = X[:filas]
+        t_sklearn = medir(modelo.predict_proba, lote, repeticiones)
+        t_compilado = medir(bosque.predict_proba, lote, repeticiones)
+        print(f"{filas:>8} {t_sklearn * 1e3:>14.3f} {t_compilado * 1e3:>16.3f} {t_sklearn / t_compilado:>11.1f}x")
+
+    # Sin agrupar filas repetidas: costo del recorrido de los árboles por sí solo
+    t_sin_duplicados = medir(bosque._predict_proba, X, 5)
+    print(f"{'10000*':>8} {'':>14} {t_sin_duplicados * 1e3:>16.3f}   (*sin agrupar filas repetidas)")
+
+
+if __name__ == "__main__":
+    main()
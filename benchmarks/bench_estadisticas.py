@@ -0,0 +1,71 @@
+"""Agregados de la encuesta: recuento completo frente a incremental.
+
+Genera un CSV sintético remuestreando las respuestas reales hasta ``--filas``
+filas, mide el recuento completo, la lectura desde la caché sin cambios y la
+actualización tras añadir ``--nuevas`` filas al final. Comprueba que el
+resultado incremental coincide con un recuento completo del archivo final.
+
+Uso::
+
+    python benchmarks/bench_estadisticas.py [--filas 1000000] [--nuevas 10000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recomendador import estadisticas  # noqa: E402
+from recomendador.entrenamiento import RUTA_DATOS  # noqa: E402
+
+
+def _remuestrear(respuestas: pd.DataFrame, filas: int, semilla: int) -> pd.DataFrame:
+    indices = np.random.default_rng(semilla).integers(0, len(respuestas), filas)
+    return respuestas.iloc[indices]
+
+
+def _medir(ruta: Path, **kwargs):
+    inicio = time.perf_counter()
+    agregados, origen = estadisticas.calcular_agregados(ruta, **kwargs)
+    return agregados, origen, time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Costo de los agregados de la encuesta.")
+    parser.add_argument("--filas", type=int, default=1_000_000, help="Filas del CSV sintético")
+    parser.add_argument("--nuevas", type=int, default=10_000, help="Filas añadidas al final")
+    args = parser.parse_args()
+
+    respuestas = pd.read_csv(RUTA_DATOS, encoding="utf-8", dtype=str)
+    with tempfile.TemporaryDirectory() as directorio:
+        estadisticas.DIRECTORIO_CACHE = Path(directorio) / "cache"
+        ruta = Path(directorio) / "respuestas.csv"
+        _remuestrear(respuestas, args.filas, 0).to_csv(ruta, index=False, encoding="utf-8")
+        print(f"CSV sintético: {args.filas:,} filas, {ruta.stat().st_size / 2 ** 20:.0f} MiB")
+
+        _, origen, segundos = _medir(ruta)
+        print(f"{origen:<12} {segundos:>8.2f} s")
+        _, origen, segundos = _medir(ruta)
+        print(f"{origen:<12} {segundos:>8.2f} s")
+
+        _remuestrear(respuestas, args.nuevas, 1).to_csv(ruta, mode="a", header=False, index=False,
+                                                       encoding="utf-8")
+        incremental, origen, segundos = _medir(ruta)
+        print(f"{origen:<12} {segundos:>8.2f} s  (+{args.nuevas:,} filas)")
+
+        completo, _, segundos = _medir(ruta, usar_cache=False)
+        print(f"{'recuento':<12} {segundos:>8.2f} s  (archivo final, sin caché)")
+        iguales = incremental.filas == completo.filas and all(
+            incremental.tabla(*par).equals(completo.tabla(*par)) for par in completo.conteos
+        )
+        print(f"Incremental igual al recuento completo: {'sí' if iguales else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Costo de explicar una predicción frente a ``predict_proba`` del bosque compilado.
+
+Mide el precálculo de los aportes por nodo (una vez por modelo) y, para 1 y
+10 000 filas, ``predict_proba`` sola frente a ``aportes_matriz``. Comprueba
+además que ``sesgo + suma de aportes`` reproduce la probabilidad de "Sí".
+
+Uso::
+
+    python benchmarks/bench_explicacion.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bosque import medir, perfiles_aleatorios  # noqa: E402
+from recomendador.bosque import bosque_para  # noqa: E402
+from recomendador.codificador import codificador_para  # noqa: E402
+from recomendador.explicacion import Explicador  # noqa: E402
+from recomendador.modelo import cargar_modelo  # noqa: E402
+from recomendador.prediccion import CLASE_SI  # noqa: E402
+
+
+def main() -> None:
+    bosque = bosque_para(cargar_modelo())
+    inicio = time.perf_counter()
+    explicador = Explicador(bosque, CLASE_SI)
+    print(f"Precálculo: {bosque.n_nodos} nodos × {len(explicador.campos)} campos "
+          f"en {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+    X = codificador_para(bosque.feature_names_in_).codificar_lote(perfiles_aleatorios(10_000))
+    prob_si = bosque.predict_proba(X)[:, int(np.flatnonzero(bosque.classes_ == CLASE_SI)[0])]
+    error = np.abs(explicador.sesgo + explicador.aportes_matriz(X).sum(axis=1) - prob_si).max()
+    print(f"Error máximo de sesgo + aportes frente a prob_si: {error:.2e}")
+
+    print(f"{'filas':>8} {'predict_proba (ms)':>19} {'explicación (ms)':>17} {'relación':>9}")
+    for filas, repeticiones in ((1, 500), (10_000, 5)):
+        lote = X[:filas]
+        t_prediccion = medir(bosque.predict_proba, lote, repeticiones)
+        t_explicacion = medir(explicador.aportes_matriz, lote, repeticiones)
+        print(f"{filas:>8} {t_prediccion * 1e3:>19.3f} {t_explicacion * 1e3:>17.3f} "
+              f"{t_explicacion / t_prediccion:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Memoria total del servicio de predicción con 1, 4 y 16 procesos.
+
+Compara tres formas de escalar ``recomendador.servidor``:
+
+- ``pkl``: N servidores independientes, cada uno con su copia del ``.pkl``
+  deserializado (lo que pasa al lanzar varios procesos sin más);
+- ``bosque``: N servidores independientes que mapean el mismo ``.bosque``;
+- ``compartido``: un servidor con ``--procesos N``; el padre mapea el
+  artefacto y los hijos lo heredan por ``fork``.
+
+Tras esperar a que todos respondan ``/listo`` y enviar unas predicciones, suma
+el RSS y el PSS (``/proc/<pid>/smaps_rollup``) de todos los procesos. El RSS
+cuenta varias veces las páginas compartidas; el PSS las reparte entre los
+procesos que las usan, así que su suma es la memoria física real.
+
+Uso::
+
+    python benchmarks/bench_memoria_procesos.py [--procesos 1,4,16] [--modos pkl,bosque,compartido]
+"""
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from recomendador.modelo import RUTA_ARTEFACTO, RUTA_MODELO  # noqa: E402
+
+MODOS = ("pkl", "bosque", "compartido")
+PERFIL = {
+    "Edad": 25, "genero": "Femenino", "Tipo_de_piel": "Grasa", "Color_de_piel": "Clara",
+    "quemarse": "Sí", "horas_sol": "Entre 1 y 3 horas", "aire_libre": "Ocasionalmente",
+}
+PREDICCIONES_POR_PROCESO = 20
+TIEMPO_MAXIMO_S = 180.0
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _lanzar(modelo: Path, puerto: int, procesos: int = 1) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "recomendador.servidor", "--modelo", str(modelo), "--puerto", str(puerto),
+         "--procesos", str(procesos)],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def _esperar_listo(puerto: int) -> None:
+    limite = time.monotonic() + TIEMPO_MAXIMO_S
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/listo", timeout=2) as respuesta:
+                if json.load(respuesta)["listo"]:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor en el puerto {puerto} no quedó listo")
+
+
+def _predecir(puerto: int, veces: int) -> None:
+    datos = json.dumps(PERFIL).encode("utf-8")
+    for _ in range(veces):
+        # Conexión nueva por petición: el kernel reparte entre los procesos del socket
+        peticion = urllib.request.Request(f"http://127.0.0.1:{puerto}/predecir", data=datos, method="POST")
+        with urllib.request.urlopen(peticion, timeout=10) as respuesta:
+            respuesta.read()
+
+
+def _descendientes(pid: int) -> List[int]:
+    pids = [pid]
+    for tarea in Path(f"/proc/{pid}/task").iterdir():
+        hijos = (tarea / "children").read_text().split()
+        for hijo in hijos:
+            pids += _descendientes(int(hijo))
+    return pids
+
+
+def _memoria(pid: int) -> Dict[str, float]:
+    valores = {}
+    for linea in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        campo, _, resto = linea.partition(":")
+        if campo in ("Rss", "Pss"):
+            valores[campo.lower()] = int(resto.split()[0]) / 1024
+    return valores
+
+
+def medir(modo: str, procesos: int) -> Dict[str, float]:
+    if modo == "compartido":
+        puertos = [_puerto_libre()]
+        servidores = [_lanzar(RUTA_ARTEFACTO, puertos[0], procesos)]
+    else:
+        modelo = RUTA_MODELO if modo == "pkl" else RUTA_ARTEFACTO
+        puertos = [_puerto_libre() for _ in range(procesos)]
+        servidores = [_lanzar(modelo, puerto) for puerto in puertos]
+    try:
+        for puerto in puertos:
+            _esperar_listo(puerto)
+        for puerto in puertos:
+            _predecir(puerto, PREDICCIONES_POR_PROCESO * procesos // len(puertos))
+        pids = [p for servidor in servidores for p in _descendientes(servidor.pid)]
+        memorias = [_memoria(pid) for pid in pids]
+    finally:
+        for servidor in servidores:
+            servidor.terminate()
+        for servidor in servidores:
+            servidor.wait()
+    return {
+        "procesos_so": len(pids),
+        "rss_mib": sum(m["rss"] for m in memorias),
+        "pss_mib": sum(m["pss"] for m in memorias),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Memoria total del servidor con varios procesos.")
+    parser.add_argument("--procesos", default="1,4,16", help="Trabajadores a comparar")
+    parser.add_argument("--modos", default=",".join(MODOS), help="Subconjunto de " + ",".join(MODOS))
+    args = parser.parse_args()
+
+    niveles = [int(n) for n in args.procesos.split(",")]
+    print(f"{'modo':<11} {'trabajadores':>12} {'procesos SO':>12} {'RSS total (MiB)':>16} {'PSS total (MiB)':>16}")
+    resultados: Dict[str, Dict[int, Dict[str, float]]] = {}
+    for modo in args.modos.split(","):
+        for n in niveles:
+            r = resultados.setdefault(modo, {})[n] = medir(modo, n)
+            print(f"{modo:<11} {n:>12} {r['procesos_so']:>12} {r['rss_mib']:>16.1f} {r['pss_mib']:>16.1f}")
+
+    if len(niveles) > 1:
+        print()
+        print(f"PSS adicional por trabajador (de {niveles[0]} a {niveles[-1]}):")
+        for modo, por_nivel in resultados.items():
+            extra = (por_nivel[niveles[-1]]["pss_mib"] - por_nivel[niveles[0]]["pss_mib"]) / (niveles[-1] - niveles[0])
+            print(f"  {modo:<11} {extra:>7.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
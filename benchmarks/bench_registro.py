@@ -0,0 +1,89 @@
+"""Costo del registro de predicciones y del monitor de deriva.
+
+Mide, en un directorio temporal:
+
+- ``Predictor.predecir`` con perfiles ya en caché (``--distintos`` perfiles
+  repetidos), sin y con registro: lo que añade el registro a la petición;
+- cuánto tarda el hilo escritor en dejar en disco todo lo encolado;
+- ``MonitorDeriva.leer_registro`` sobre esas líneas, y una segunda lectura
+  sin líneas nuevas.
+
+Uso::
+
+    python benchmarks/bench_registro.py [--predicciones 50000] [--distintos 1000]
+"""
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from recomendador.deriva import MonitorDeriva  # noqa: E402
+from recomendador.esquema import CAMPOS, DOMINIOS  # noqa: E402
+from recomendador.modelo import cargar_modelo  # noqa: E402
+from recomendador.prediccion import crear_predictor  # noqa: E402
+from recomendador.registro import RegistroPredicciones  # noqa: E402
+
+
+def perfiles(n: int, semilla: int = 42):
+    rng = np.random.default_rng(semilla)
+    indices = {campo: rng.integers(0, len(DOMINIOS[campo]), n) for campo in CAMPOS}
+    return [{campo: DOMINIOS[campo][int(indices[campo][i])] for campo in CAMPOS} for i in range(n)]
+
+
+def medir(predictor, lista) -> np.ndarray:
+    tiempos = np.empty(len(lista))
+    for i, perfil in enumerate(lista):
+        inicio = time.perf_counter()
+        predictor.predecir(perfil)
+        tiempos[i] = time.perf_counter() - inicio
+    return tiempos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Costo del registro de predicciones.")
+    parser.add_argument("--predicciones", type=int, default=50_000)
+    parser.add_argument("--distintos", type=int, default=1_000, help="Perfiles distintos (caben en la caché)")
+    args = parser.parse_args()
+
+    modelo_cargado = cargar_modelo()
+    distintos = perfiles(args.distintos)
+    lista = [distintos[i % len(distintos)] for i in range(args.predicciones)]
+    with tempfile.TemporaryDirectory() as directorio:
+        predictor = crear_predictor(modelo_cargado, usar_registro=False)
+        medir(predictor, lista)  # llena la caché: se mide el camino más corto
+        sin_registro = medir(predictor, lista)
+
+        predictor.registro = RegistroPredicciones(Path(directorio))
+        con_registro = medir(predictor, lista)
+        inicio = time.perf_counter()
+        predictor.registro.vaciar()
+        espera = time.perf_counter() - inicio
+        predictor.registro.cerrar()
+
+        print(f"{'predecir (caché)':<22} {'p50 (µs)':>9} {'p99 (µs)':>9}")
+        for nombre, tiempos in (("sin registro", sin_registro), ("con registro", con_registro)):
+            print(f"{nombre:<22} {np.percentile(tiempos, 50) * 1e6:>9.1f} {np.percentile(tiempos, 99) * 1e6:>9.1f}")
+        print(f"Escritas {predictor.registro.escritos:,} líneas, descartadas {predictor.registro.descartados:,}; "
+              f"el escritor terminó {espera * 1e3:.0f} ms después de la última petición")
+
+        monitor = MonitorDeriva.desde_entrenamiento(modelo_cargado)
+        memoria_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        inicio = time.perf_counter()
+        leidas = monitor.leer_registro(Path(directorio))
+        segundos = time.perf_counter() - inicio
+        print(f"Monitor: {leidas:,} líneas en {segundos:.2f} s ({leidas / segundos:,.0f} líneas/s), "
+              f"pico de memoria +{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memoria_antes) / 1024:.1f} MiB")
+        inicio = time.perf_counter()
+        leidas = monitor.leer_registro(Path(directorio))
+        print(f"Relectura sin cambios: {leidas} líneas en {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
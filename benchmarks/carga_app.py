@@ -0,0 +1,342 @@
+"""Prueba de carga: cuántas sesiones concurrentes aguanta un proceso de ``app.py``.
+
+Levanta ``streamlit run app.py`` sin navegador y simula sesiones hablando el
+mismo protocolo que el frontend (websocket ``/_stcore/stream`` con mensajes
+protobuf de Streamlit). Cada sesión carga la página y luego, en bucle, elige
+un perfil al azar entre las opciones que la app envía (edad, radio de género,
+selectores de piel), pulsa las tarjetas de quemarse/horas/aire libre
+(re-ejecuciones del fragmento) y pulsa el botón de predicción. La
+concurrencia sube por niveles y en cada uno se mide:
+
+- throughput (predicciones/s) y latencia p50/p95/p99 desde que se envía el
+  clic de predicción hasta que el servidor termina la ejecución;
+- latencia p95 de los clics en tarjetas;
+- RSS del proceso del servidor al terminar el nivel y su pico.
+
+Los resultados se guardan como línea base y las corridas siguientes se
+comparan con ella (código de salida 1 si hay regresión)::
+
+    python benchmarks/carga_app.py --guardar        # fija la línea base
+    python benchmarks/carga_app.py                  # compara con ella
+
+Requiere ``websockets`` (lo instala el servidor de Streamlit) y Linux para
+leer el RSS en ``/proc``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+RAIZ = Path(__file__).resolve().parent.parent
+RUTA_APP = RAIZ / "app.py"
+RUTA_LINEA_BASE = Path(__file__).resolve().parent / "linea_base_carga.json"
+
+NIVELES = (1, 2, 4, 8, 16)
+# Claves de las tarjetas de cada grupo (sección 3 de la app)
+TARJETAS = (
+    ("quema_si", "quema_aveces", "quema_no"),
+    ("hora1", "hora2", "hora3"),
+    ("aire1", "aire2", "aire3", "aire4"),
+)
+ETIQUETA_PREDICCION = "OBTENER"
+# La latencia "se degrada" cuando el p95 supera este múltiplo del de una sesión
+FACTOR_DEGRADACION = 2.0
+TIEMPO_MAXIMO_S = 60.0
+
+
+class Sesion:
+    """Una pestaña del navegador: widgets conocidos y estado que se reenvía."""
+
+    def __init__(self, url: str, rng: random.Random) -> None:
+        self.url = url
+        self.rng = rng
+        self.ws: Any = None
+        self.widgets: Dict[str, Any] = {}
+        self.fragmentos: Dict[str, str] = {}
+        self.estados: Dict[str, Dict[str, Any]] = {}
+
+    async def __aenter__(self) -> "Sesion":
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.ws.close()
+
+    async def ejecutar(self, disparador: Optional[str] = None, fragmento: str = "") -> List[str]:
+        """Pide una ejecución y espera a que termine; devuelve los textos markdown recibidos."""
+        mensaje = BackMsg()
+        mensaje.rerun_script.query_string = ""
+        mensaje.rerun_script.fragment_id = fragmento
+        for widget_id, valor in self.estados.items():
+            mensaje.rerun_script.widget_states.widgets.add(id=widget_id, **valor)
+        if disparador is not None:
+            mensaje.rerun_script.widget_states.widgets.add(id=disparador, trigger_value=True)
+        await self.ws.send(mensaje.SerializeToString())
+
+        textos = []
+        while True:
+            recibido = ForwardMsg()
+            recibido.ParseFromString(await asyncio.wait_for(self.ws.recv(), TIEMPO_MAXIMO_S))
+            tipo = recibido.WhichOneof("type")
+            if tipo == "script_finished":
+                if recibido.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if recibido.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("error de compilación de app.py")
+                return textos
+            if tipo != "delta" or recibido.delta.WhichOneof("type") != "new_element":
+                continue
+            elemento = recibido.delta.new_element
+            clase = elemento.WhichOneof("type")
+            if clase == "exception":
+                raise RuntimeError(elemento.exception.message)
+            if clase == "markdown":
+                textos.append(elemento.markdown.body)
+            elif clase in ("button", "slider", "radio", "selectbox"):
+                widget = getattr(elemento, clase)
+                self.widgets[_nombre(clase, widget, self.widgets)] = widget
+                if recibido.delta.fragment_id:
+                    self.fragmentos[widget.id] = recibido.delta.fragment_id
+
+    def elegir_perfil(self) -> None:
+        for clase, widget in self.widgets.items():
+            if clase.startswith("slider"):
+                valor = self.rng.randint(int(widget.min), int(widget.max))
+                self.estados[widget.id] = {"double_array_value": {"data": [valor]}}
+            elif clase.startswith(("radio", "selectbox")):
+                self.estados[widget.id] = {"string_value": self.rng.choice(list(widget.options))}
+
+    def boton(self, clave: str) -> Any:
+        return self.widgets[f"button:{clave}"]
+
+
+def _nombre(clase: str, widget: Any, conocidos: Dict[str, Any]) -> str:
+    if clase == "button":
+        clave = widget.id.rsplit("-", 1)[-1]
+        return f"button:{clave}" if clave != "None" else f"button:{widget.label}"
+    for i in range(len(conocidos) + 1):
+        nombre = f"{clase}{i}"
+        if nombre not in conocidos or conocidos[nombre].id == widget.id:
+            return nombre
+    raise AssertionError
+
+
+async def _sesion(url: str, semilla: int, limite: float, medidas: Dict[str, List[Any]]) -> None:
+    rng = random.Random(semilla)
+    async with Sesion(url, rng) as sesion:
+        await sesion.ejecutar()
+        prediccion = next(w for n, w in sesion.widgets.items() if ETIQUETA_PREDICCION in n)
+        while time.perf_counter() < limite:
+            try:
+                for grupo in TARJETAS:
+                    tarjeta = sesion.boton(rng.choice(grupo))
+                    inicio = time.perf_counter()
+                    await sesion.ejecutar(tarjeta.id, sesion.fragmentos.get(tarjeta.id, ""))
+                    medidas["tarjeta"].append(time.perf_counter() - inicio)
+
+                sesion.elegir_perfil()
+                inicio = time.perf_counter()
+                textos = await sesion.ejecutar(prediccion.id)
+                duracion = time.perf_counter() - inicio
+            except (RuntimeError, asyncio.TimeoutError) as e:
+                medidas["errores"].append(str(e) or type(e).__name__)
+                continue
+            if any("Confianza" in texto for texto in textos):
+                medidas["prediccion"].append(duracion)
+            else:
+                medidas["errores"].append("la página no mostró la recomendación")
+
+
+def _leer_status(pid: int) -> Dict[str, float]:
+    valores = {}
+    with open(f"/proc/{pid}/status") as status:
+        for linea in status:
+            campo, _, resto = linea.partition(":")
+            if campo in ("VmRSS", "VmHWM"):
+                valores[campo] = int(resto.split()[0]) / 1024
+    return valores
+
+
+def _percentil(valores: List[float], q: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+async def calentar(url: str) -> None:
+    """Una predicción sin medir: la primera carga el modelo e importa NumPy."""
+    async with Sesion(url, random.Random(0)) as sesion:
+        await sesion.ejecutar()
+        sesion.elegir_perfil()
+        await sesion.ejecutar(next(w for n, w in sesion.widgets.items() if ETIQUETA_PREDICCION in n).id)
+
+
+async def medir_nivel(url: str, pid: int, sesiones: int, duracion_s: float, semilla: int) -> Dict[str, Any]:
+    medidas: Dict[str, List[Any]] = {"prediccion": [], "tarjeta": [], "errores": []}
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        _sesion(url, semilla * 1000 + i, inicio + duracion_s, medidas) for i in range(sesiones)
+    ))
+    transcurrido = time.perf_counter() - inicio
+    latencias = medidas["prediccion"]
+    memoria = _leer_status(pid)
+    return {
+        "sesiones": sesiones,
+        "predicciones": len(latencias),
+        "errores": len(medidas["errores"]),
+        "throughput": len(latencias) / transcurrido,
+        "p50_s": _percentil(latencias, 0.50),
+        "p95_s": _percentil(latencias, 0.95),
+        "p99_s": _percentil(latencias, 0.99),
+        "media_s": statistics.fmean(latencias) if latencias else None,
+        "tarjeta_p95_s": _percentil(medidas["tarjeta"], 0.95),
+        "rss_mib": memoria["VmRSS"],
+        "rss_pico_mib": memoria["VmHWM"],
+    }
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(puerto: int) -> subprocess.Popen:
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(RUTA_APP), "--server.headless", "true",
+         "--server.port", str(puerto), "--browser.gatherUsageStats", "false"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + TIEMPO_MAXIMO_S
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=1):
+                return proceso
+        except OSError:
+            if proceso.poll() is not None:
+                break
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError("El servidor de Streamlit no arrancó")
+
+
+def sostenible(niveles: List[Dict[str, Any]]) -> int:
+    """Mayor concurrencia cuyo p95 no supera FACTOR_DEGRADACION × el de una sesión."""
+    base = niveles[0]["p95_s"]
+    if base is None:
+        return 0
+    aceptables = [n["sesiones"] for n in niveles if n["p95_s"] is not None and n["p95_s"] <= FACTOR_DEGRADACION * base]
+    return max(aceptables, default=0)
+
+
+def comparar(actual: Dict[str, Any], linea_base: Dict[str, Any], tolerancia: float) -> List[str]:
+    regresiones = []
+    previos = {n["sesiones"]: n for n in linea_base["niveles"]}
+    for nivel in actual["niveles"]:
+        previo = previos.get(nivel["sesiones"])
+        if previo is None:
+            continue
+        if nivel["throughput"] < previo["throughput"] * (1 - tolerancia):
+            regresiones.append(
+                f"{nivel['sesiones']} sesiones: throughput {nivel['throughput']:.1f}/s "
+                f"(línea base {previo['throughput']:.1f}/s)"
+            )
+        if nivel["p95_s"] and previo["p95_s"] and nivel["p95_s"] > previo["p95_s"] * (1 + tolerancia):
+            regresiones.append(
+                f"{nivel['sesiones']} sesiones: p95 {nivel['p95_s'] * 1000:.0f} ms "
+                f"(línea base {previo['p95_s'] * 1000:.0f} ms)"
+            )
+        if nivel["rss_mib"] > previo["rss_mib"] * (1 + tolerancia):
+            regresiones.append(
+                f"{nivel['sesiones']} sesiones: RSS {nivel['rss_mib']:.0f} MiB (línea base {previo['rss_mib']:.0f} MiB)"
+            )
+        if nivel["errores"] > previo["errores"]:
+            regresiones.append(f"{nivel['sesiones']} sesiones: {nivel['errores']} errores")
+    return regresiones
+
+
+def _ms(valor: Optional[float]) -> float:
+    return float("nan") if valor is None else valor * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de app.py con sesiones simuladas.")
+    parser.add_argument("--niveles", default=",".join(map(str, NIVELES)), help="Sesiones concurrentes por nivel")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por nivel")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--linea-base", type=Path, default=RUTA_LINEA_BASE)
+    parser.add_argument("--guardar", action="store_true", help="Guarda esta corrida como línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.4,
+                        help="Empeoramiento relativo admitido frente a la línea base")
+    args = parser.parse_args()
+
+    import streamlit
+
+    puerto = _puerto_libre()
+    servidor = iniciar_servidor(puerto)
+    url = f"ws://127.0.0.1:{puerto}/_stcore/stream"
+    niveles = []
+    try:
+        asyncio.run(calentar(url))
+        print(f"{'sesiones':>8} {'pred/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+              f"{'tarjeta p95':>12} {'errores':>8} {'RSS (MiB)':>10}")
+        for sesiones in (int(n) for n in args.niveles.split(",")):
+            nivel = asyncio.run(medir_nivel(url, servidor.pid, sesiones, args.duracion, args.semilla))
+            niveles.append(nivel)
+            print(f"{sesiones:>8} {nivel['throughput']:>8.1f} {_ms(nivel['p50_s']):>9.0f} {_ms(nivel['p95_s']):>9.0f} "
+                  f"{_ms(nivel['p99_s']):>9.0f} {_ms(nivel['tarjeta_p95_s']):>12.0f} {nivel['errores']:>8} "
+                  f"{nivel['rss_mib']:>10.1f}")
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    resultado = {
+        "duracion_s": args.duracion,
+        "semilla": args.semilla,
+        "niveles": niveles,
+        "sostenible": sostenible(niveles),
+        "entorno": {
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "cpus": os.cpu_count(),
+        },
+    }
+    print(f"Concurrencia sostenible (p95 ≤ {FACTOR_DEGRADACION:g}× el de una sesión): {resultado['sostenible']}")
+
+    if args.guardar:
+        args.linea_base.write_text(json.dumps(resultado, indent=2) + "\n", encoding="utf-8")
+        print(f"Línea base guardada en {args.linea_base}")
+        return 0
+    if not args.linea_base.exists():
+        print("Sin línea base; usa --guardar para fijarla")
+        return 0
+
+    linea_base = json.loads(args.linea_base.read_text(encoding="utf-8"))
+    if linea_base.get("entorno") != resultado["entorno"]:
+        print(f"⚠️ Línea base tomada en otro entorno: {linea_base.get('entorno')}", file=sys.stderr)
+    regresiones = comparar(resultado, linea_base, args.tolerancia)
+    for regresion in regresiones:
+        print(f"🚨 Regresión: {regresion}", file=sys.stderr)
+    if not regresiones:
+        print(f"✅ Sin regresiones frente a {args.linea_base.name} (tolerancia {args.tolerancia:.0%})")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Cuenta cuántas veces se ejecuta ``app.py`` completo por cada interacción.
+
+Usa ``streamlit.testing`` para pulsar cada botón del formulario y cuenta las
+ejecuciones completas del script (una llamada a ``st.set_page_config`` por
+ejecución). Cada interacción debe costar como mucho una; termina con código 1
+si alguna cuesta más, por ejemplo si vuelve un ``st.rerun()`` tras guardar la
+selección.
+
+``AppTest`` no distingue las re-ejecuciones parciales de ``st.fragment``: las
+cuenta como completas, así que el máximo sigue siendo 1.
+
+Uso::
+
+    python benchmarks/contar_ejecuciones.py
+"""
+
+import logging
+import sys
+import warnings
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+RUTA_APP = Path(__file__).resolve().parent.parent / "app.py"
+MAXIMO_EJECUCIONES = 1
+
+# (clave del botón, campo de session_state, valor esperado tras pulsarlo)
+INTERACCIONES = [
+    ("quema_si", "quemarse", "Sí"),
+    ("quema_aveces", "quemarse", "A veces"),
+    ("quema_no", "quemarse", "No"),
+    ("hora1", "horas_sol", "Menos de 1 hora"),
+    ("hora2", "horas_sol", "Entre 1 y 3 horas"),
+    ("hora3", "horas_sol", "Más de 3 horas"),
+    ("aire1", "aire_libre", "Casi nunca"),
+    ("aire2", "aire_libre", "Ocasionalmente"),
+    ("aire3", "aire_libre", "Frecuentemente"),
+    ("aire4", "aire_libre", "Muy frecuentemente"),
+]
+
+
+class ContadorEjecuciones:
+    def __init__(self) -> None:
+        self.ejecuciones = 0
+        self._original = st.set_page_config
+
+    def __call__(self, *args, **kwargs):
+        self.ejecuciones += 1
+        return self._original(*args, **kwargs)
+
+
+def main() -> int:
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    contador = ContadorEjecuciones()
+    st.set_page_config = contador
+
+    app = AppTest.from_file(str(RUTA_APP), default_timeout=60)
+    contador.ejecuciones = 0
+    app.run()
+    print(f"{'interacción':<28} {'ejecuciones':>11}")
+    print(f"{'carga inicial':<28} {contador.ejecuciones:>11}")
+
+    fallos = []
+    for clave, campo, esperado in INTERACCIONES:
+        contador.ejecuciones = 0
+        app.button(key=clave).click().run()
+        print(f"{clave:<28} {contador.ejecuciones:>11}")
+        if contador.ejecuciones > MAXIMO_EJECUCIONES:
+            fallos.append(f"'{clave}' ejecutó el script {contador.ejecuciones} veces")
+        if app.session_state[campo] != esperado:
+            fallos.append(f"'{clave}' dejó {campo}={app.session_state[campo]!r}, se esperaba {esperado!r}")
+        if app.exception:
+            fallos.append(f"'{clave}' lanzó una excepción: {app.exception}")
+
+    contador.ejecuciones = 0
+    next(b for b in app.button if "OBTENER" in b.label).click().run()
+    print(f"{'predicción':<28} {contador.ejecuciones:>11}")
+    if contador.ejecuciones > MAXIMO_EJECUCIONES:
+        fallos.append(f"la predicción ejecutó el script {contador.ejecuciones} veces")
+
+    for fallo in fallos:
+        print(f"🚨 Regresión: {fallo}", file=sys.stderr)
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import streamlit as st
+
+from recomendador.entrenamiento import OBJETIVO
+from recomendador.estadisticas import (
+    CONSCIENCIA,
+    FACTORES,
+    HORAS_SOL,
+    NOMBRES,
+    QUEMADURAS,
+    RESULTADOS,
+    SI,
+    TIPO_PIEL,
+    agregados_vigentes,
+    intervalo_wilson,
+    medias,
+    prueba_chi2,
+    pruebas,
+    tasas,
+)
+
+st.set_page_config(page_title="Estadísticas de la Encuesta", page_icon="📊", layout="wide")
+
+st.markdown("<h1 style='text-align: center;'>📊 Estadísticas de la Encuesta</h1>", unsafe_allow_html=True)
+st.markdown(
+    "<p style='text-align: center; font-size: 1.1rem;'>"
+    "Hábitos de protección solar de quienes respondieron la encuesta del estudio."
+    "</p>",
+    unsafe_allow_html=True,
+)
+
+try:
+    # Conteos acumulados: solo se leen las filas nuevas del CSV
+    agregados, origen = agregados_vigentes()
+except (FileNotFoundError, ValueError) as e:
+    st.error(f"🚨 ERROR al leer las respuestas de la encuesta: {e}")
+    st.stop()
+
+if agregados.filas == 0:
+    st.info("Todavía no hay respuestas en la encuesta.")
+    st.stop()
+
+
+def porcentaje(parte: float, total: float) -> str:
+    # Sin respuestas en la columna no hay proporción que mostrar
+    return f"{parte / total * 100:.1f}%" if total else "—"
+
+
+uso = agregados.tabla(TIPO_PIEL, OBJETIVO).sum()
+quemaduras = agregados.tabla(TIPO_PIEL, QUEMADURAS).sum()
+con_respuesta = int(uso.drop(labels="Sin respuesta", errors="ignore").sum())
+quemaduras_con_respuesta = int(quemaduras.drop(labels="Sin respuesta", errors="ignore").sum())
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Respuestas", f"{agregados.filas:,}")
+with col2:
+    st.metric("Usa protector a diario", porcentaje(uso.get(SI, 0), con_respuesta))
+    if con_respuesta:
+        inferior, superior = intervalo_wilson(uso.get(SI, 0), con_respuesta)
+        st.caption(f"IC 95 %: {inferior * 100:.1f}% – {superior * 100:.1f}%")
+with col3:
+    st.metric("Se quemó en el último año", porcentaje(quemaduras.get(SI, 0), quemaduras_con_respuesta))
+
+st.divider()
+
+# ==========================================
+# Tasas de uso por perfil
+# ==========================================
+with st.container(border=True):
+    st.markdown("### ☀️ Uso diario de protector por perfil")
+    factor = st.radio(
+        "Agrupar por",
+        options=list(FACTORES),
+        index=FACTORES.index(TIPO_PIEL),
+        format_func=NOMBRES.get,
+        horizontal=True,
+    )
+    por_nivel = tasas(agregados, factor)
+    por_nivel[["tasa", "ic_inferior", "ic_superior"]] *= 100
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.bar_chart(por_nivel["tasa"], y_label="% que lo usa a diario", x_label=NOMBRES[factor])
+    with col2:
+        st.dataframe(
+            por_nivel,
+            column_config={
+                "respuestas": st.column_config.NumberColumn("Respuestas"),
+                "casos": st.column_config.NumberColumn("Lo usan a diario"),
+                "tasa": st.column_config.NumberColumn("Tasa", format="%.1f%%"),
+                "ic_inferior": st.column_config.NumberColumn("IC 95 % inf.", format="%.1f%%"),
+                "ic_superior": st.column_config.NumberColumn("IC 95 % sup.", format="%.1f%%"),
+            },
+            width="stretch",
+        )
+        st.caption("Intervalos de Wilson al 95 %; con pocas respuestas por grupo son anchos.")
+
+# ==========================================
+# Tablas cruzadas
+# ==========================================
+with st.container(border=True):
+    st.markdown("### 🔀 Tablas cruzadas")
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        fila = st.selectbox("Filas", options=list(FACTORES), index=FACTORES.index(HORAS_SOL),
+                            format_func=NOMBRES.get)
+    with col2:
+        columna = st.selectbox("Columnas", options=list(RESULTADOS), format_func=NOMBRES.get)
+    with col3:
+        porcentajes = st.toggle("Porcentaje por fila", value=True)
+
+    tabla = agregados.tabla(fila, columna)
+    if porcentajes:
+        # Los grupos sin respuestas no tienen porcentaje: se omiten en lugar de mostrar NaN
+        totales = tabla.sum(axis=1)
+        tabla = tabla.loc[totales > 0].div(totales[totales > 0], axis=0)
+        st.dataframe((tabla * 100).round(1), width="stretch")
+    else:
+        st.dataframe(tabla, width="stretch")
+
+    prueba = prueba_chi2(agregados, fila, columna)
+    if prueba is None:
+        st.info("No hay variación suficiente para una prueba de independencia.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("χ²", f"{prueba.chi2:.2f}", help=f"{prueba.grados_libertad} grados de libertad")
+        with col2:
+            st.metric("p-valor", f"{prueba.p_valor:.4f}")
+        with col3:
+            st.metric("V de Cramér", f"{prueba.v_cramer:.2f}")
+        if prueba.celdas_esperado_bajo > 0.2:
+            st.warning(
+                f"El {prueba.celdas_esperado_bajo * 100:.0f}% de las celdas tiene frecuencia esperada "
+                "menor que 5: el p-valor es solo orientativo.",
+                icon="⚠️",
+            )
+        st.caption("Las respuestas vacías se muestran en la tabla pero no entran en la prueba.")
+
+# ==========================================
+# Consciencia y asociación con el uso diario
+# ==========================================
+col1, col2 = st.columns(2)
+with col1:
+    with st.container(border=True):
+        st.markdown("### 🧠 Consciencia sobre los efectos del sol")
+        st.dataframe(
+            medias(agregados, factor, CONSCIENCIA).round(2),
+            column_config={
+                "respuestas": st.column_config.NumberColumn("Respuestas"),
+                "media": st.column_config.NumberColumn("Media (1-5)"),
+                "ic_inferior": st.column_config.NumberColumn("IC 95 % inf."),
+                "ic_superior": st.column_config.NumberColumn("IC 95 % sup."),
+            },
+            width="stretch",
+        )
+        st.caption(f"Agrupado por {NOMBRES[factor].lower()}; intervalos t de Student al 95 %.")
+
+with col2:
+    with st.container(border=True):
+        st.markdown("### 📈 ¿Qué se asocia con el uso diario?")
+        st.dataframe(
+            pruebas(agregados, OBJETIVO)[["chi2", "grados_libertad", "p_valor", "v_cramer"]].round(4),
+            column_config={
+                "chi2": st.column_config.NumberColumn("χ²"),
+                "grados_libertad": st.column_config.NumberColumn("gl", format="%d"),
+                "p_valor": st.column_config.NumberColumn("p-valor"),
+                "v_cramer": st.column_config.NumberColumn("V de Cramér"),
+            },
+            width="stretch",
+        )
+        st.caption("Chi-cuadrado de independencia de cada factor con el uso diario, de menor a mayor p-valor.")
+
+st.caption(f"{agregados.filas:,} respuestas · agregados: {origen} · SHA-256 {agregados.sha256[:12]}")
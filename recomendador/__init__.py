@@ -0,0 +1 @@
+"""Núcleo de servicio del recomendador de protector solar."""
@@ -0,0 +1,292 @@
+"""Búsqueda de hiperparámetros del Random Forest por reducción sucesiva.
+
+El recurso que se reparte son los folds de la validación cruzada del notebook
+(``StratifiedKFold`` de 5 folds, el mismo que usa ``cross_val_score``): todos
+los candidatos se evalúan en el primer fold, el mejor tercio pasa a tres folds
+y el mejor tercio de esos a los cinco. Cada evaluación (parámetros, hash del
+CSV, fold) se guarda en disco, así que una búsqueda interrumpida o repetida
+retoma sin volver a entrenar.
+
+El informe compara la accuracy con el costo de inferencia del bosque compilado
+(árboles × profundidad alcanzada) y recomienda el bosque más barato que no
+pierde accuracy frente a los parámetros actuales.
+
+Uso::
+
+    python -m recomendador.ajuste [--procesos -1] [--tolerancia 0.0]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from recomendador.entrenamiento import (
+    DIRECTORIO_CACHE,
+    FOLDS,
+    PARAMETROS,
+    RUTA_DATOS,
+    VERSION_PREPROCESADO,
+    cargar_datos,
+)
+from recomendador.modelo import sha256_archivo
+
+DIRECTORIO_AJUSTE = DIRECTORIO_CACHE.parent / "ajuste"
+
+ESPACIO = {
+    "n_estimators": (25, 50, 100, 200, 300),
+    "max_depth": (2, 3, 4, 6, 8),
+    "min_samples_split": (2, 3, 5),
+}
+# Folds evaluados en cada ronda; tras cada una sigue el mejor 1/ETA
+RONDAS = (1, 3, FOLDS)
+ETA = 3
+
+Parametros = Dict[str, Any]
+
+# Datos del proceso trabajador, cargados una vez por ``_inicializar``
+_X = None
+_y = None
+_folds: List[Tuple[Any, Any]] = []
+
+
+def candidatos(espacio: Dict[str, Sequence[Any]] = ESPACIO) -> List[Parametros]:
+    """Producto cartesiano del espacio, con la semilla fija del notebook."""
+    nombres = list(espacio)
+    return [
+        {**dict(zip(nombres, valores)), "random_state": PARAMETROS["random_state"]}
+        for valores in itertools.product(*(espacio[n] for n in nombres))
+    ]
+
+
+def _clave(parametros: Parametros) -> str:
+    return json.dumps(parametros, sort_keys=True)
+
+
+def _ruta_cache(parametros: Parametros, sha256_datos: str, fold: int) -> Path:
+    clave = json.dumps(
+        {"parametros": parametros, "datos": sha256_datos, "fold": fold, "folds": FOLDS,
+         "preprocesado": VERSION_PREPROCESADO},
+        sort_keys=True,
+    )
+    return DIRECTORIO_AJUSTE / f"{hashlib.sha256(clave.encode('utf-8')).hexdigest()[:24]}.json"
+
+
+def _leer_cache(ruta: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _escribir_cache(ruta: Path, resultado: Dict[str, Any]) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta_tmp = ruta.with_name(ruta.name + ".tmp")
+    ruta_tmp.write_text(json.dumps(resultado), encoding="utf-8")
+    ruta_tmp.replace(ruta)
+
+
+def _inicializar(ruta_csv: Path) -> None:
+    from sklearn.model_selection import StratifiedKFold
+
+    global _X, _y, _folds
+    _X, _y, _, _ = cargar_datos(ruta_csv)
+    _folds = list(StratifiedKFold(n_splits=FOLDS).split(_X, _y))
+
+
+def _evaluar(parametros: Parametros, fold: int) -> Dict[str, Any]:
+    """Entrena en un fold y mide accuracy y profundidad alcanzada."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    entrenamiento, prueba = _folds[fold]
+    modelo = RandomForestClassifier(**parametros, n_jobs=1)
+    inicio = time.perf_counter()
+    modelo.fit(_X.iloc[entrenamiento], _y.iloc[entrenamiento])
+    ajuste_s = time.perf_counter() - inicio
+    return {
+        "accuracy": float(modelo.score(_X.iloc[prueba], _y.iloc[prueba])),
+        "profundidad": max(e.tree_.max_depth for e in modelo.estimators_),
+        "nodos": sum(e.tree_.node_count for e in modelo.estimators_),
+        "ajuste_s": ajuste_s,
+    }
+
+
+class Busqueda:
+    """Evalúa candidatos por fold, con caché en disco y un pool de procesos."""
+
+    def __init__(self, ruta_csv: Path = RUTA_DATOS, procesos: int = -1, usar_cache: bool = True) -> None:
+        self.ruta_csv = Path(ruta_csv)
+        self.procesos = (os.cpu_count() or 1) if procesos == -1 else procesos
+        self.usar_cache = usar_cache
+        self.sha256_datos = sha256_archivo(self.ruta_csv)
+        self.resultados: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.entrenados = 0
+        self.desde_cache = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "Busqueda":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def evaluar(self, lista: Iterable[Parametros], n_folds: int) -> None:
+        """Completa los primeros ``n_folds`` folds de cada candidato."""
+        pendientes = []
+        for parametros in lista:
+            hechos = self.resultados.setdefault(_clave(parametros), {})
+            for fold in range(n_folds):
+                if fold in hechos:
+                    continue
+                guardado = _leer_cache(_ruta_cache(parametros, self.sha256_datos, fold)) if self.usar_cache else None
+                if guardado is not None:
+                    hechos[fold] = guardado
+                    self.desde_cache += 1
+                else:
+                    pendientes.append((parametros, fold))
+        if not pendientes:
+            return
+
+        if self._pool is None:
+            # Cada trabajador lee el dataset preprocesado una sola vez
+            self._pool = ProcessPoolExecutor(self.procesos, initializer=_inicializar, initargs=(self.ruta_csv,))
+        futuros = {self._pool.submit(_evaluar, p, fold): (p, fold) for p, fold in pendientes}
+        for futuro in as_completed(futuros):
+            parametros, fold = futuros[futuro]
+            resultado = futuro.result()
+            # Se guarda al terminar cada fold: una interrupción no pierde lo ya hecho
+            _escribir_cache(_ruta_cache(parametros, self.sha256_datos, fold), resultado)
+            self.resultados[_clave(parametros)][fold] = resultado
+            self.entrenados += 1
+
+    def resumen(self, parametros: Parametros) -> Dict[str, Any]:
+        folds = self.resultados.get(_clave(parametros), {})
+        scores = [folds[f]["accuracy"] for f in sorted(folds)]
+        profundidad = max(folds[f]["profundidad"] for f in folds)
+        media = sum(scores) / len(scores)
+        return {
+            "parametros": parametros,
+            "folds": len(scores),
+            "cv_scores": scores,
+            "cv_promedio": media,
+            "cv_desviacion": (sum((s - media) ** 2 for s in scores) / len(scores)) ** 0.5,
+            "profundidad": profundidad,
+            # Niveles recorridos por el bosque compilado en cada predicción
+            "costo": parametros["n_estimators"] * profundidad,
+            "nodos_promedio": sum(folds[f]["nodos"] for f in folds) / len(folds),
+        }
+
+
+def _orden(resumen: Dict[str, Any]) -> Tuple[float, int]:
+    # Mayor accuracy primero; a igualdad, el bosque más barato
+    return -resumen["cv_promedio"], resumen["costo"]
+
+
+def reduccion_sucesiva(busqueda: Busqueda, lista: List[Parametros], rondas: Sequence[int] = RONDAS,
+                       eta: int = ETA) -> List[Dict[str, Any]]:
+    """Devuelve el resumen de cada ronda (candidatos evaluados y cuántos siguen)."""
+    historial = []
+    vivos = list(lista)
+    for i, n_folds in enumerate(rondas):
+        busqueda.evaluar(vivos, n_folds)
+        resumenes = sorted((busqueda.resumen(p) for p in vivos), key=_orden)
+        siguen = len(vivos) if i == len(rondas) - 1 else max(1, len(vivos) // eta)
+        historial.append({"folds": n_folds, "candidatos": len(vivos), "siguen": siguen})
+        vivos = [r["parametros"] for r in resumenes[:siguen]]
+    return historial
+
+
+def frontera(resumenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Candidatos que ninguno más barato supera en accuracy."""
+    mejor = float("-inf")
+    puntos = []
+    for r in sorted(resumenes, key=lambda r: (r["costo"], -r["cv_promedio"])):
+        if r["cv_promedio"] > mejor:
+            puntos.append(r)
+            mejor = r["cv_promedio"]
+    return puntos
+
+
+def buscar(ruta_csv: Path = RUTA_DATOS, procesos: int = -1, usar_cache: bool = True,
+           tolerancia: float = 0.0, espacio: Dict[str, Sequence[Any]] = ESPACIO) -> Dict[str, Any]:
+    """Ejecuta la búsqueda y arma el informe accuracy vs. costo."""
+    referencia = dict(PARAMETROS)
+    lista = candidatos(espacio)
+    inicio = time.perf_counter()
+    with Busqueda(ruta_csv, procesos, usar_cache) as busqueda:
+        historial = reduccion_sucesiva(busqueda, lista)
+        # La referencia siempre se evalúa completa para poder comparar
+        busqueda.evaluar([referencia], FOLDS)
+    duracion_s = time.perf_counter() - inicio
+
+    completos = [
+        busqueda.resumen(p) for p in lista + [referencia]
+        if len(busqueda.resultados.get(_clave(p), {})) == FOLDS
+    ]
+    completos = list({_clave(r["parametros"]): r for r in completos}.values())
+    actual = busqueda.resumen(referencia)
+    aceptables = [r for r in completos if r["cv_promedio"] >= actual["cv_promedio"] - tolerancia]
+    recomendado = min(aceptables, key=lambda r: (r["costo"], -r["cv_promedio"]))
+    return {
+        "datos": {"archivo": Path(ruta_csv).name, "sha256": busqueda.sha256_datos},
+        "espacio": {nombre: list(valores) for nombre, valores in espacio.items()},
+        "rondas": historial,
+        "evaluaciones": {"entrenadas": busqueda.entrenados, "desde_cache": busqueda.desde_cache},
+        "duracion_s": duracion_s,
+        "tolerancia": tolerancia,
+        "actual": actual,
+        "recomendado": recomendado,
+        "frontera": frontera(completos),
+        "completos": sorted(completos, key=_orden),
+    }
+
+
+def _fila(r: Dict[str, Any]) -> str:
+    p = r["parametros"]
+    return (f"{p['n_estimators']:>6} {str(p['max_depth']):>6} {p['min_samples_split']:>6} "
+            f"{r['profundidad']:>6} {r['costo']:>7} {r['cv_promedio']:>8.3f} {r['cv_desviacion']:>7.3f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros por reducción sucesiva.")
+    parser.add_argument("--datos", type=Path, default=RUTA_DATOS, help="CSV de la encuesta")
+    parser.add_argument("--procesos", type=int, default=-1, help="Procesos del pool (-1 = todos los núcleos)")
+    parser.add_argument("--tolerancia", type=float, default=0.0,
+                        help="Pérdida de accuracy CV aceptada frente a los parámetros actuales")
+    parser.add_argument("--sin-cache", action="store_true", help="Vuelve a entrenar todos los folds")
+    parser.add_argument("--informe", type=Path, default=DIRECTORIO_AJUSTE / "informe.json",
+                        help="Ruta del informe JSON")
+    args = parser.parse_args(argv)
+
+    informe = buscar(args.datos, args.procesos, usar_cache=not args.sin_cache, tolerancia=args.tolerancia)
+    args.informe.parent.mkdir(parents=True, exist_ok=True)
+    args.informe.write_text(json.dumps(informe, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for ronda in informe["rondas"]:
+        print(f"🔎 {ronda['candidatos']} candidatos × {ronda['folds']} folds → siguen {ronda['siguen']}")
+    evaluaciones = informe["evaluaciones"]
+    print(f"⏱️ {informe['duracion_s']:.1f} s ({evaluaciones['entrenadas']} folds entrenados, "
+          f"{evaluaciones['desde_cache']} desde caché)")
+    print()
+    print("Frontera accuracy vs. costo:")
+    print(" árbol  prof.  split  real    costo   cv_acc     std")
+    for r in informe["frontera"]:
+        print(_fila(r))
+    print("Actual:")
+    print(_fila(informe["actual"]))
+    print("Recomendado:")
+    print(_fila(informe["recomendado"]))
+    recomendado = {k: v for k, v in informe["recomendado"]["parametros"].items() if PARAMETROS.get(k) != v}
+    if recomendado:
+        print(f"\npython -m recomendador.entrenamiento --parametros '{json.dumps(recomendado)}'")
+    print(f"\n📄 Informe en {args.informe}")
+
+
+if __name__ == "__main__":
+    main()
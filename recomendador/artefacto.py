@@ -0,0 +1,190 @@
+"""Artefacto compacto del modelo: bosque compilado en un solo archivo mapeable.
+
+Estructura del archivo (``.bosque``)::
+
+    b"BOSQUE\\0\\0"            8 bytes
+    versión                  uint32 little-endian
+    longitud del encabezado  uint32 little-endian
+    encabezado JSON          utf-8
+    arreglos                 alineados a 64 bytes
+
+El encabezado describe cada arreglo (dtype, forma, desplazamiento), las
+columnas, las clases, el hash de los datos de entrenamiento, las métricas y
+el SHA-256 de los arreglos. La carga mapea el archivo en memoria, verifica
+la suma y no importa sklearn.
+
+Conversión del ``.pkl`` actual::
+
+    python -m recomendador.artefacto --datos "Encuesta ... formulario 1.csv"
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from recomendador.bosque import BosqueCompilado, compilar_bosque
+from recomendador.modelo import RAIZ_PROYECTO, RUTA_ARTEFACTO, RUTA_MODELO, sha256_archivo
+
+MAGIA = b"BOSQUE\0\0"
+VERSION = 1
+ALINEACION = 64
+EXTENSION = RUTA_ARTEFACTO.suffix
+
+_CABECERA = struct.Struct("<8sII")
+_ARREGLOS = ("caracteristicas", "umbrales", "hijos", "valores", "raices")
+
+
+class ArtefactoInvalido(ValueError):
+    """El archivo no es un artefacto válido o está corrupto."""
+
+
+def _alinear(posicion: int) -> int:
+    return -(-posicion // ALINEACION) * ALINEACION
+
+
+def guardar_artefacto(
+    modelo: Any,
+    ruta: Union[str, Path] = RUTA_ARTEFACTO,
+    datos: Optional[Union[str, Path]] = None,
+    metricas: Optional[Mapping[str, Any]] = None,
+    sha256_modelo: Optional[str] = None,
+) -> Path:
+    """Compila ``modelo`` (o usa el bosque ya compilado) y lo escribe en ``ruta``.
+
+    ``datos`` es el CSV de entrenamiento, del que solo se guarda el hash.
+    ``sha256_modelo`` identifica el ``.pkl`` de origen (lo usa la tabla de perfiles).
+    """
+    bosque = modelo if isinstance(modelo, BosqueCompilado) else compilar_bosque(modelo)
+    ruta = Path(ruta)
+
+    arreglos = {nombre: np.ascontiguousarray(getattr(bosque, nombre)) for nombre in _ARREGLOS}
+    descripcion: Dict[str, Dict[str, Any]] = {}
+    desplazamiento = 0
+    for nombre, arreglo in arreglos.items():
+        descripcion[nombre] = {
+            "dtype": arreglo.dtype.str,
+            "forma": list(arreglo.shape),
+            "desplazamiento": desplazamiento,
+        }
+        desplazamiento = _alinear(desplazamiento + arreglo.nbytes)
+
+    carga = bytearray(desplazamiento)
+    for nombre, arreglo in arreglos.items():
+        inicio = descripcion[nombre]["desplazamiento"]
+        carga[inicio:inicio + arreglo.nbytes] = arreglo.tobytes()
+
+    encabezado = {
+        "formato": VERSION,
+        "arreglos": descripcion,
+        "profundidad": bosque.profundidad,
+        "clases": bosque.classes_.tolist(),
+        "columnas": [str(c) for c in bosque.feature_names_in_],
+        "sha256_datos": sha256_archivo(Path(datos)) if datos is not None else None,
+        "sha256_modelo": sha256_modelo,
+        "metricas": dict(metricas or {}),
+        "sha256_arreglos": hashlib.sha256(carga).hexdigest(),
+    }
+    texto = json.dumps(encabezado, ensure_ascii=False).encode("utf-8")
+    inicio_carga = _alinear(_CABECERA.size + len(texto))
+    texto = texto.ljust(inicio_carga - _CABECERA.size, b" ")
+
+    ruta_tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(ruta_tmp, "wb") as archivo:
+        archivo.write(_CABECERA.pack(MAGIA, VERSION, len(texto)))
+        archivo.write(texto)
+        archivo.write(carga)
+    ruta_tmp.replace(ruta)
+    return ruta
+
+
+def leer_encabezado(ruta: Union[str, Path]) -> Tuple[Dict[str, Any], int]:
+    """Encabezado del artefacto y posición donde empiezan los arreglos."""
+    with open(ruta, "rb") as archivo:
+        cabecera = archivo.read(_CABECERA.size)
+        if len(cabecera) < _CABECERA.size:
+            raise ArtefactoInvalido(f"{ruta} es demasiado corto")
+        magia, version, longitud = _CABECERA.unpack(cabecera)
+        if magia != MAGIA:
+            raise ArtefactoInvalido(f"{ruta} no es un artefacto de bosque")
+        if version != VERSION:
+            raise ArtefactoInvalido(f"Versión de artefacto no soportada: {version}")
+        encabezado = json.loads(archivo.read(longitud).decode("utf-8"))
+    return encabezado, _CABECERA.size + longitud
+
+
+def cargar_artefacto(ruta: Union[str, Path] = RUTA_ARTEFACTO,
+                     verificar: bool = True) -> Tuple[BosqueCompilado, Dict[str, Any]]:
+    """Mapea el artefacto en memoria y devuelve el bosque y su encabezado."""
+    encabezado, inicio_carga = leer_encabezado(ruta)
+    mapa = np.memmap(ruta, dtype=np.uint8, mode="r")
+    carga = mapa[inicio_carga:]
+    if verificar and hashlib.sha256(carga).hexdigest() != encabezado["sha256_arreglos"]:
+        raise ArtefactoInvalido(f"La suma de verificación de {ruta} no coincide")
+
+    arreglos = {}
+    for nombre, info in encabezado["arreglos"].items():
+        dtype = np.dtype(info["dtype"])
+        forma = tuple(info["forma"])
+        inicio = info["desplazamiento"]
+        fin = inicio + dtype.itemsize * int(np.prod(forma, dtype=np.int64))
+        arreglos[nombre] = carga[inicio:fin].view(dtype).reshape(forma)
+
+    bosque = BosqueCompilado(
+        profundidad=encabezado["profundidad"],
+        classes_=np.asarray(encabezado["clases"]),
+        feature_names_in_=np.asarray(encabezado["columnas"], dtype=object),
+        **arreglos,
+    )
+    return bosque, encabezado
+
+
+def _directorio_compartido() -> Path:
+    # tmpfs: el archivo vive en memoria compartida y no toca el disco
+    shm = Path("/dev/shm")
+    return shm if shm.is_dir() else Path(tempfile.gettempdir())
+
+
+def artefacto_compartido(ruta: Union[str, Path]) -> Path:
+    """Ruta de un artefacto mapeable para ``ruta``, creándolo si hace falta.
+
+    Un ``.bosque`` se devuelve tal cual. Un ``.pkl`` se convierte una sola vez
+    en ``/dev/shm`` (nombre según su hash) en un subproceso, para que quien lo
+    pide no cargue sklearn.
+    """
+    ruta = Path(ruta)
+    if ruta.suffix == EXTENSION:
+        return ruta
+    destino = _directorio_compartido() / f"bosque-{sha256_archivo(ruta)[:16]}{EXTENSION}"
+    if not destino.exists():
+        subprocess.run(
+            [sys.executable, "-m", "recomendador.artefacto", "--modelo", str(ruta), "--salida", str(destino)],
+            check=True, stdout=subprocess.DEVNULL, cwd=RAIZ_PROYECTO,
+        )
+    return destino
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Convierte el modelo .pkl en un artefacto compacto.")
+    parser.add_argument("--modelo", type=Path, default=RUTA_MODELO, help="Modelo .pkl de origen")
+    parser.add_argument("--salida", type=Path, default=None, help="Ruta del artefacto (por defecto junto al .pkl)")
+    parser.add_argument("--datos", type=Path, default=None, help="CSV de entrenamiento para registrar su hash")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    modelo = joblib.load(args.modelo)
+    salida = args.salida or args.modelo.with_suffix(EXTENSION)
+    guardar_artefacto(modelo, salida, datos=args.datos, sha256_modelo=sha256_archivo(args.modelo))
+    print(f"✅ Artefacto guardado en {salida} ({salida.stat().st_size / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Bosque aleatorio compilado a arreglos planos de NumPy.
+
+Todos los árboles del ``RandomForestClassifier`` se aplanan en arreglos
+contiguos (característica, umbral, hijos y valores de hoja) y se evalúan a la
+vez, nivel por nivel, sin pasar por el despacho de sklearn por estimador.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+import numpy as np
+
+from recomendador.modelo import ModeloCargado
+
+# Filas evaluadas por bloque: acota la memoria de los índices (filas × árboles)
+FILAS_POR_BLOQUE = 256
+
+
+def por_filas_unicas(funcion: Callable[[np.ndarray], np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Aplica ``funcion`` solo a las filas distintas de ``X`` en lotes grandes."""
+    X = np.atleast_2d(X)
+    if X.shape[0] > FILAS_POR_BLOQUE:
+        # El espacio de entradas es finito: los lotes grandes repiten muchas filas
+        X = np.ascontiguousarray(X)
+        filas = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).reshape(-1)
+        _, primeras, inversa = np.unique(filas, return_index=True, return_inverse=True)
+        if len(primeras) < X.shape[0]:
+            return funcion(X[primeras])[inversa.reshape(-1)]
+    return funcion(X)
+
+
+@dataclass(frozen=True)
+class BosqueCompilado:
+    """Árboles concatenados; las hojas apuntan a sí mismas.
+
+    ``hijos[n, 0]`` es el hijo izquierdo (``x <= umbral``) del nodo ``n`` y
+    ``hijos[n, 1]`` el derecho. ``valores[c]`` guarda, para cada nodo, la
+    fracción de la clase ``c``, igual que ``DecisionTreeClassifier.predict_proba``.
+    """
+
+    caracteristicas: np.ndarray  # int32 (n_nodos,)
+    umbrales: np.ndarray  # float64 (n_nodos,)
+    hijos: np.ndarray  # int32 (n_nodos, 2)
+    valores: np.ndarray  # float64 (n_clases, n_nodos)
+    raices: np.ndarray  # int32 (n_arboles,)
+    profundidad: int
+    classes_: np.ndarray
+    feature_names_in_: np.ndarray
+
+    @property
+    def n_arboles(self) -> int:
+        return len(self.raices)
+
+    @property
+    def n_nodos(self) -> int:
+        return len(self.caracteristicas)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            arreglo.nbytes for arreglo in (self.caracteristicas, self.umbrales, self.hijos, self.valores, self.raices)
+        )
+
+    def hojas(self, X: np.ndarray) -> np.ndarray:
+        """Índice global de la hoja alcanzada por cada fila en cada árbol."""
+        # sklearn compara en float32 contra umbrales float64
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        plano = X.ravel()
+        hijos = self.hijos.ravel()
+        inicio_filas = (np.arange(X.shape[0], dtype=np.int32) * X.shape[1])[:, np.newaxis]
+        nodos = np.broadcast_to(self.raices, (X.shape[0], self.n_arboles)).copy()
+        for _ in range(self.profundidad):
+            derecha = plano.take(inicio_filas + self.caracteristicas.take(nodos)) > self.umbrales.take(nodos)
+            nodos = hijos.take(nodos * 2 + derecha)
+        return nodos
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return por_filas_unicas(self._predict_proba, X)
+
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        salida = np.empty((X.shape[0], len(self.classes_)))
+        for inicio in range(0, X.shape[0], FILAS_POR_BLOQUE):
+            bloque = slice(inicio, inicio + FILAS_POR_BLOQUE)
+            hojas = self.hojas(X[bloque])
+            for clase, valores in enumerate(self.valores):
+                salida[bloque, clase] = valores.take(hojas).sum(axis=1)
+        salida /= self.n_arboles
+        return salida
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def subconjunto(self, indices: Sequence[int]) -> "BosqueCompilado":
+        """Bosque con solo los árboles ``indices``, en ese orden."""
+        fines = np.append(self.raices[1:], self.n_nodos)
+        rangos = [np.arange(self.raices[i], fines[i], dtype=np.int32) for i in indices]
+        nodos = np.concatenate(rangos)
+        # Posición nueva de cada nodo conservado
+        nuevos = np.full(self.n_nodos, -1, dtype=np.int32)
+        nuevos[nodos] = np.arange(len(nodos), dtype=np.int32)
+        hijos = nuevos.take(self.hijos.take(nodos, axis=0))
+        raices = nuevos.take(self.raices.take(np.asarray(indices, dtype=np.intp)))
+        return BosqueCompilado(
+            caracteristicas=self.caracteristicas.take(nodos),
+            umbrales=self.umbrales.take(nodos),
+            hijos=hijos,
+            valores=np.ascontiguousarray(self.valores.take(nodos, axis=1)),
+            raices=raices,
+            profundidad=_profundidad(hijos, raices),
+            classes_=self.classes_,
+            feature_names_in_=self.feature_names_in_,
+        )
+
+
+def _profundidad(hijos: np.ndarray, raices: np.ndarray) -> int:
+    """Niveles hasta que todos los árboles llegan a una hoja."""
+    nodos = raices
+    profundidad = 0
+    while True:
+        internos = nodos[hijos[nodos, 0] != nodos]
+        if len(internos) == 0:
+            return profundidad
+        nodos = hijos[internos].ravel()
+        profundidad += 1
+
+
+def _aplanar_arbol(arbol: Any, desplazamiento: int) -> Tuple[np.ndarray, ...]:
+    hoja = arbol.children_left == -1
+    nodos = np.arange(arbol.node_count, dtype=np.int32) + desplazamiento
+    caracteristicas = np.where(hoja, 0, arbol.feature).astype(np.int32)
+    hijos = np.column_stack([
+        np.where(hoja, nodos, arbol.children_left + desplazamiento),
+        np.where(hoja, nodos, arbol.children_right + desplazamiento),
+    ]).astype(np.int32)
+    valores = arbol.value[:, 0, :]
+    valores = valores / valores.sum(axis=1, keepdims=True)
+    return caracteristicas, arbol.threshold.astype(np.float64), hijos, valores
+
+
+def compilar_bosque(modelo: Any) -> BosqueCompilado:
+    """Aplana un ``RandomForestClassifier`` entrenado (una sola salida)."""
+    if getattr(modelo, "n_outputs_", 1) != 1:
+        raise ValueError("Solo se pueden compilar bosques de una sola salida")
+
+    partes = []
+    raices = []
+    desplazamiento = 0
+    for estimador in modelo.estimators_:
+        arbol = estimador.tree_
+        raices.append(desplazamiento)
+        partes.append(_aplanar_arbol(arbol, desplazamiento))
+        desplazamiento += arbol.node_count
+
+    caracteristicas, umbrales, hijos, valores = (np.concatenate(p) for p in zip(*partes))
+    return BosqueCompilado(
+        caracteristicas=caracteristicas,
+        umbrales=umbrales,
+        hijos=hijos,
+        valores=np.ascontiguousarray(valores.T),
+        raices=np.asarray(raices, dtype=np.int32),
+        profundidad=max(estimador.tree_.max_depth for estimador in modelo.estimators_),
+        classes_=np.asarray(modelo.classes_),
+        feature_names_in_=np.asarray(modelo.feature_names_in_, dtype=object),
+    )
+
+
+_compilados: Dict[str, BosqueCompilado] = {}
+
+
+def predecir_probabilidades(modelo: Any, X: np.ndarray) -> np.ndarray:
+    """``predict_proba`` de un bosque compilado o de un estimador de sklearn.
+
+    Las filas salen del codificador ya alineadas con ``feature_names_in_``;
+    sklearn las recibe en un DataFrame con esos nombres para no avisar en cada
+    llamada por un arreglo sin nombres de columna.
+    """
+    if isinstance(modelo, BosqueCompilado) or not hasattr(modelo, "feature_names_in_"):
+        return modelo.predict_proba(X)
+    import pandas as pd
+
+    return modelo.predict_proba(pd.DataFrame(X, columns=modelo.feature_names_in_))
+
+
+def bosque_para(modelo_cargado: ModeloCargado) -> BosqueCompilado:
+    """Bosque compilado compartido por proceso para una versión del modelo."""
+    if isinstance(modelo_cargado.modelo, BosqueCompilado):
+        return modelo_cargado.modelo
+    bosque = _compilados.get(modelo_cargado.sha256)
+    if bosque is None:
+        bosque = _compilados[modelo_cargado.sha256] = compilar_bosque(modelo_cargado.modelo)
+    return bosque
@@ -0,0 +1,91 @@
+"""Caché LRU de predicciones por perfil, compartida por todo el proceso.
+
+Las entradas de la app son unas pocas opciones categóricas más la edad, así
+que muchos usuarios envían exactamente el mismo perfil. La clave es el perfil
+normalizado (los siete campos en orden canónico) junto con la versión del
+modelo, de modo que un modelo nuevo nunca devuelve resultados del anterior.
+
+La capacidad se fija con ``RECOMENDADOR_CACHE_PERFILES`` (0 la desactiva).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple, TypeVar
+
+from recomendador.esquema import CAMPOS, normalizar_perfil
+
+VARIABLE_CAPACIDAD = "RECOMENDADOR_CACHE_PERFILES"
+CAPACIDAD = 4096
+
+T = TypeVar("T")
+
+
+def clave_perfil(perfil: Mapping[str, Any], version: str) -> Tuple[Hashable, ...]:
+    """Versión del modelo + los siete campos normalizados, en orden canónico."""
+    normalizado = normalizar_perfil(perfil)
+    return (version,) + tuple(normalizado[campo] for campo in CAMPOS)
+
+
+class CachePredicciones:
+    """LRU acotada y segura entre hilos, con contadores para dimensionarla."""
+
+    def __init__(self, capacidad: int = CAPACIDAD) -> None:
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, perfil: Mapping[str, Any], version: str, calcular: Callable[[Mapping[str, Any]], T]) -> T:
+        """Resultado guardado para ``perfil``, o ``calcular(perfil)`` si no lo hay.
+
+        Los errores de ``calcular`` se propagan y no se guardan.
+        """
+        if self.capacidad <= 0:
+            return calcular(perfil)
+        clave = clave_perfil(perfil, version)
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+
+        # Se calcula fuera del lock: un perfil lento no bloquea a los demás
+        resultado = calcular(perfil)
+        with self._lock:
+            self._entradas[clave] = resultado
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+        return resultado
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+def _capacidad_configurada(defecto: int = CAPACIDAD) -> int:
+    valor: Optional[str] = os.environ.get(VARIABLE_CAPACIDAD)
+    return int(valor) if valor else defecto
+
+
+cache_predicciones = CachePredicciones(_capacidad_configurada())
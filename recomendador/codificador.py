@@ -0,0 +1,142 @@
+"""Codificación del formulario directamente a la matriz de entrada del modelo.
+
+Reproduce exactamente el resultado de ``pd.get_dummies`` + alineación con
+``feature_names_in_`` que hacía ``app.py``, pero con índices de columna
+precalculados y sin crear DataFrames por petición.
+"""
+
+from functools import lru_cache
+from numbers import Number
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recomendador.esquema import CAMPOS, DOMINIOS
+
+def _es_faltante(valor: Any) -> bool:
+    return valor is None or (isinstance(valor, float) and valor != valor)
+
+
+def _es_numerico(valor: Any) -> bool:
+    return isinstance(valor, Number) and not isinstance(valor, bool)
+
+
+class CodificadorEntradas:
+    """Convierte perfiles crudos en filas numéricas alineadas con el modelo.
+
+    Cada campo categórico activa la columna ``<campo>_<valor>`` si el modelo
+    la conoce. Los valores del dominio de la app sin columna en el modelo
+    quedan en cero, igual que con ``get_dummies``; cualquier otro valor se
+    rechaza con ``ValueError``. Los valores numéricos solo llegan al modelo si
+    existe una columna con el nombre exacto del campo.
+    """
+
+    def __init__(self, columnas: Sequence[str], campos: Sequence[str] = CAMPOS,
+                 dominios: Mapping[str, Sequence[Any]] = DOMINIOS) -> None:
+        self.columnas: Tuple[str, ...] = tuple(columnas)
+        self.campos: Tuple[str, ...] = tuple(campos)
+        posiciones = {columna: i for i, columna in enumerate(self.columnas)}
+
+        self._numericas: Dict[str, Optional[int]] = {}
+        self._categorias: Dict[str, Dict[str, int]] = {}
+        for campo in self.campos:
+            self._numericas[campo] = posiciones.get(campo)
+            prefijo = f"{campo}_"
+            categorias = {
+                columna[len(prefijo):]: i
+                for columna, i in posiciones.items() if columna.startswith(prefijo)
+            }
+            # -1: valor aceptado que no corresponde a ninguna columna del modelo
+            for valor in dominios.get(campo, ()):
+                if isinstance(valor, str):
+                    categorias.setdefault(valor, -1)
+            self._categorias[campo] = categorias
+
+    @property
+    def n_columnas(self) -> int:
+        return len(self.columnas)
+
+    def categorias(self, campo: str) -> Tuple[str, ...]:
+        """Valores categóricos aceptados para ``campo``."""
+        return tuple(self._categorias[campo])
+
+    def _posicion(self, campo: str, valor: Any) -> int:
+        try:
+            return self._categorias[campo][valor]
+        except KeyError:
+            raise ValueError(f"Categoría desconocida para '{campo}': {valor!r}") from None
+
+    def validar(self, perfil: Mapping[str, Any]) -> None:
+        """Lanza el mismo error que ``codificar`` para ``perfil``, sin codificarlo."""
+        for campo in self.campos:
+            valor = perfil[campo]
+            if not (_es_faltante(valor) or _es_numerico(valor)):
+                self._posicion(campo, valor)
+
+    def codificar(self, perfil: Mapping[str, Any], salida: Optional[np.ndarray] = None) -> np.ndarray:
+        """Codifica un perfil en una fila ``(1, n_columnas)``.
+
+        Si se pasa ``salida`` (arreglo de ``n_columnas`` elementos) se reutiliza
+        en lugar de reservar memoria nueva.
+        """
+        if salida is None:
+            salida = np.zeros((1, self.n_columnas))
+        else:
+            salida.fill(0)
+        fila = salida.reshape(-1)
+        for campo in self.campos:
+            valor = perfil[campo]
+            if _es_faltante(valor):
+                continue
+            if _es_numerico(valor):
+                posicion = self._numericas[campo]
+                if posicion is not None:
+                    fila[posicion] = valor
+                continue
+            posicion = self._posicion(campo, valor)
+            if posicion >= 0:
+                fila[posicion] = 1
+        return salida
+
+    def codificar_lote(self, datos: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        """Codifica columnas completas (dict de secuencias o DataFrame) en una matriz."""
+        n_filas = len(datos[self.campos[0]])
+        salida = np.zeros((n_filas, self.n_columnas))
+        for campo in self.campos:
+            valores = np.asarray(datos[campo])
+            if valores.dtype.kind == "O" and all(_es_numerico(v) for v in valores):
+                valores = valores.astype(np.float64)
+            if valores.dtype.kind in "iuf":
+                posicion = self._numericas[campo]
+                if posicion is not None:
+                    salida[:, posicion] = valores
+                continue
+
+            unicos, inversa = np.unique(valores.astype(object).astype(str), return_inverse=True)
+            faltantes = np.fromiter((_es_faltante(v) for v in valores), dtype=bool, count=n_filas)
+            posiciones_unicas = np.empty(len(unicos), dtype=np.intp)
+            for i, valor in enumerate(unicos):
+                if valor in self._categorias[campo]:
+                    posiciones_unicas[i] = self._categorias[campo][valor]
+                else:
+                    posiciones_unicas[i] = -2
+            posiciones = posiciones_unicas[inversa.reshape(-1)]
+            posiciones[faltantes] = -1
+
+            desconocidas = posiciones == -2
+            if desconocidas.any():
+                ejemplos = sorted(set(valores[desconocidas].tolist()))[:5]
+                raise ValueError(f"Categorías desconocidas para '{campo}': {ejemplos!r}")
+            filas = np.flatnonzero(posiciones >= 0)
+            salida[filas, posiciones[filas]] = 1
+        return salida
+
+
+@lru_cache(maxsize=8)
+def _codificador_cacheado(columnas: Tuple[str, ...]) -> CodificadorEntradas:
+    return CodificadorEntradas(columnas)
+
+
+def codificador_para(columnas: Sequence[str]) -> CodificadorEntradas:
+    """Codificador compartido por proceso para un conjunto de columnas."""
+    return _codificador_cacheado(tuple(columnas))
@@ -0,0 +1,230 @@
+"""Compresión del bosque entrenado para servir más barato.
+
+Dos métodos, ajustados y medidos sobre todas las filas codificadas que el
+modelo puede recibir: para cada campo, una de sus columnas o ninguna. Es el
+dominio completo del codificador, no solo la rejilla de la app (la de
+``recomendador.tabla``), porque ``RECOMENDADOR_MODELO`` cambia el modelo de
+todas las entradas: app, ``lote``, ``servidor`` y ``deriva``.
+
+- ``subconjunto``: selección voraz de árboles del bosque original hasta que
+  el sub-bosque coincide con él en la etiqueta y en el nivel de SPF de todos
+  los perfiles (o en la fracción ``objetivo``).
+- ``destilado``: un único árbol de regresión, lo menos profundo posible,
+  entrenado sobre el ``predict_proba`` del bosque en esa rejilla.
+
+Cada resultado se guarda como artefacto ``.bosque`` con su informe de
+concordancia (en esa rejilla y en las respuestas reales de la encuesta) y
+aceleración en el encabezado. Para servirlo en lugar del
+modelo original basta con apuntar ``RECOMENDADOR_MODELO`` a él::
+
+    python -m recomendador.compresion [--metodo ambos] [--objetivo 1.0]
+    RECOMENDADOR_MODELO=modelo_protector_solar_mejorado_destilado.bosque streamlit run app.py
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from recomendador.artefacto import EXTENSION, guardar_artefacto
+from recomendador.bosque import BosqueCompilado, _aplanar_arbol, bosque_para
+from recomendador.codificador import CodificadorEntradas
+from recomendador.entrenamiento import RUTA_DATOS
+from recomendador.esquema import limpiar_columnas
+from recomendador.modelo import ModeloCargado, cargar_modelo
+from recomendador.prediccion import _desde_probabilidades
+
+METODOS = ("subconjunto", "destilado")
+FILAS_LOTE = 10_000
+
+
+def rejilla_modelo(columnas: List[str]) -> np.ndarray:
+    """Filas codificadas distintas que puede recibir el modelo desde cualquier entrada.
+
+    Cada campo con columnas en el modelo activa una de ellas o ninguna (valor
+    de la app sin columna o respuesta vacía).
+    """
+    codificador = CodificadorEntradas(columnas)
+    campos = [campo for campo in codificador.campos if any(c.startswith(campo + "_") for c in columnas)]
+    niveles = [codificador.categorias(campo) + (None,) for campo in campos]
+    forma = tuple(len(n) for n in niveles)
+    codigos = np.unravel_index(np.arange(int(np.prod(forma))), forma)
+    lote = {campo: np.asarray(n, dtype=object)[cod] for campo, n, cod in zip(campos, niveles, codigos)}
+    X = CodificadorEntradas(columnas, campos=campos).codificar_lote(lote)
+    return np.unique(X, axis=0)
+
+
+def filas_encuesta(columnas: List[str], ruta_csv: Path = RUTA_DATOS) -> np.ndarray:
+    """Respuestas reales de la encuesta, codificadas para el modelo."""
+    import pandas as pd
+
+    df = pd.read_csv(ruta_csv, encoding="utf-8")
+    df.columns = limpiar_columnas(df.columns)
+    codificador = CodificadorEntradas(columnas)
+    return codificador.codificar_lote(df[list(codificador.campos)].astype(object))
+
+
+def concordancia(original: np.ndarray, comprimido: np.ndarray, clases: np.ndarray) -> Dict[str, float]:
+    o = _desde_probabilidades(original, clases)
+    c = _desde_probabilidades(comprimido, clases)
+    diferencia = np.abs(original - comprimido)
+    return {
+        "etiqueta": float(np.mean(o.etiquetas == c.etiquetas)),
+        "nivel_spf": float(np.mean(o.niveles_spf == c.niveles_spf)),
+        "error_prob_medio": float(diferencia.mean()),
+        "error_prob_maximo": float(diferencia.max()),
+    }
+
+
+def _coinciden(original: np.ndarray, comprimido: np.ndarray, clases: np.ndarray) -> np.ndarray:
+    # Lo que ve el usuario: etiqueta y nivel de SPF
+    o = _desde_probabilidades(original, clases)
+    c = _desde_probabilidades(comprimido, clases)
+    return (o.etiquetas == c.etiquetas) & (o.niveles_spf == c.niveles_spf)
+
+
+def seleccionar_arboles(bosque: BosqueCompilado, X: np.ndarray, objetivo: float = 1.0) -> BosqueCompilado:
+    """Agrega árboles de a uno, el que más perfiles hace coincidir con el bosque.
+
+    A igual número de coincidencias se prefiere el que menos aleja las
+    probabilidades; se detiene al alcanzar ``objetivo``.
+    """
+    referencia = bosque.predict_proba(X)
+    hojas = bosque.hojas(X)
+    # Probabilidades de cada árbol: (árboles, filas, clases)
+    por_arbol = np.stack([valores.take(hojas) for valores in bosque.valores], axis=-1).transpose(1, 0, 2)
+
+    elegidos: List[int] = []
+    disponibles = np.ones(bosque.n_arboles, dtype=bool)
+    suma = np.zeros_like(referencia)
+    while disponibles.any():
+        candidatas = (suma + por_arbol[disponibles]) / (len(elegidos) + 1)
+        aciertos = np.array([_coinciden(referencia, c, bosque.classes_).sum() for c in candidatas])
+        errores = np.abs(candidatas - referencia).mean(axis=(1, 2))
+        mejor = np.lexsort((errores, -aciertos))[0]
+        indice = int(np.flatnonzero(disponibles)[mejor])
+        elegidos.append(indice)
+        disponibles[indice] = False
+        suma += por_arbol[indice]
+        if aciertos[mejor] >= objetivo * len(X):
+            break
+    return bosque.subconjunto(elegidos)
+
+
+def _bosque_desde_arbol(estimador: Any, bosque: BosqueCompilado) -> BosqueCompilado:
+    arbol = estimador.tree_
+    caracteristicas, umbrales, hijos, _ = _aplanar_arbol(arbol, 0)
+    # Árbol de regresión multisalida: una salida por clase, ya normalizada
+    valores = np.ascontiguousarray(arbol.value[:, :, 0].T)
+    return BosqueCompilado(
+        caracteristicas=caracteristicas,
+        umbrales=umbrales,
+        hijos=hijos,
+        valores=valores,
+        raices=np.zeros(1, dtype=np.int32),
+        profundidad=int(arbol.max_depth),
+        classes_=bosque.classes_,
+        feature_names_in_=bosque.feature_names_in_,
+    )
+
+
+def destilar(bosque: BosqueCompilado, X: np.ndarray, objetivo: float = 1.0,
+             profundidad_maxima: Optional[int] = None) -> BosqueCompilado:
+    """El árbol de regresión más bajo que imita el ``predict_proba`` del bosque."""
+    from sklearn.tree import DecisionTreeRegressor
+
+    referencia = bosque.predict_proba(X)
+    profundidad_maxima = profundidad_maxima or X.shape[1]
+    for profundidad in range(1, profundidad_maxima + 1):
+        arbol = DecisionTreeRegressor(max_depth=profundidad, random_state=0).fit(X, referencia)
+        destilado = _bosque_desde_arbol(arbol, bosque)
+        if _coinciden(referencia, destilado.predict_proba(X), bosque.classes_).mean() >= objetivo:
+            break
+    return destilado
+
+
+def _latencia(bosque: BosqueCompilado, X: np.ndarray, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        bosque.predict_proba(X)
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos))
+
+
+def informe(original: BosqueCompilado, comprimido: BosqueCompilado, X: np.ndarray,
+            encuesta: Optional[np.ndarray] = None, semilla: int = 0) -> Dict[str, Any]:
+    """Tamaño, concordancia con el original (en ``X`` y en ``encuesta``) y aceleración de ``comprimido``."""
+    lote = X[np.random.default_rng(semilla).integers(len(X), size=FILAS_LOTE)]
+    latencias = {}
+    for nombre, bosque in (("original", original), ("comprimido", comprimido)):
+        latencias[nombre] = {
+            "fila_s": _latencia(bosque, X[:1], 200),
+            "lote_s": _latencia(bosque, lote, 20),
+        }
+    return {
+        "arboles": comprimido.n_arboles,
+        "nodos": comprimido.n_nodos,
+        "profundidad": comprimido.profundidad,
+        "bytes": comprimido.nbytes,
+        "perfiles": len(X),
+        "concordancia": concordancia(original.predict_proba(X), comprimido.predict_proba(X), original.classes_),
+        "respuestas_encuesta": 0 if encuesta is None else len(encuesta),
+        "concordancia_encuesta": None if encuesta is None else concordancia(
+            original.predict_proba(encuesta), comprimido.predict_proba(encuesta), original.classes_
+        ),
+        "latencia": latencias,
+        "aceleracion_fila": latencias["original"]["fila_s"] / latencias["comprimido"]["fila_s"],
+        "aceleracion_lote": latencias["original"]["lote_s"] / latencias["comprimido"]["lote_s"],
+    }
+
+
+def comprimir(modelo_cargado: ModeloCargado, metodo: str, objetivo: float = 1.0) -> Tuple[BosqueCompilado, Dict[str, Any]]:
+    if metodo not in METODOS:
+        raise ValueError(f"Método de compresión desconocido: {metodo!r}")
+    bosque = bosque_para(modelo_cargado)
+    columnas = [str(c) for c in bosque.feature_names_in_]
+    X = rejilla_modelo(columnas)
+    comprimido = seleccionar_arboles(bosque, X, objetivo) if metodo == "subconjunto" else destilar(bosque, X, objetivo)
+    try:
+        encuesta = filas_encuesta(columnas)
+    except (FileNotFoundError, KeyError, ValueError):
+        encuesta = None
+    resultado = informe(bosque, comprimido, X, encuesta)
+    resultado.update({"metodo": metodo, "objetivo": objetivo, "origen_sha256_modelo": modelo_cargado.sha256_modelo})
+    return comprimido, resultado
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Comprime el bosque por selección de árboles o destilación.")
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo .pkl o .bosque (por defecto el preferido)")
+    parser.add_argument("--metodo", choices=METODOS + ("ambos",), default="ambos")
+    parser.add_argument("--objetivo", type=float, default=1.0,
+                        help="Fracción de perfiles con la misma etiqueta y nivel de SPF que el original")
+    args = parser.parse_args(argv)
+
+    modelo_cargado = cargar_modelo(args.modelo)
+    base = modelo_cargado.ruta.with_suffix("")
+    metodos = METODOS if args.metodo == "ambos" else (args.metodo,)
+    for metodo in metodos:
+        comprimido, resultado = comprimir(modelo_cargado, metodo, args.objetivo)
+        salida = base.with_name(f"{base.name}_{metodo}{EXTENSION}")
+        guardar_artefacto(comprimido, salida, metricas={"compresion": resultado})
+        coincide = resultado["concordancia"]
+        print(f"🌲 {metodo}: {resultado['arboles']} árboles, {resultado['nodos']} nodos, "
+              f"profundidad {resultado['profundidad']}, {resultado['bytes'] / 1024:.1f} KiB")
+        print(f"   concordancia en {resultado['perfiles']} perfiles: etiqueta {coincide['etiqueta']:.1%}, "
+              f"nivel SPF {coincide['nivel_spf']:.1%}, error de probabilidad máx. {coincide['error_prob_maximo']:.3f}")
+        encuesta = resultado["concordancia_encuesta"]
+        if encuesta is not None:
+            print(f"   en las {resultado['respuestas_encuesta']} respuestas de la encuesta: "
+                  f"etiqueta {encuesta['etiqueta']:.1%}, nivel SPF {encuesta['nivel_spf']:.1%}")
+        print(f"   aceleración: ×{resultado['aceleracion_fila']:.1f} por fila, "
+              f"×{resultado['aceleracion_lote']:.1f} en lotes de {FILAS_LOTE}")
+        print(f"   ✅ {salida.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Deriva entre los perfiles que recibe el modelo y los datos con que se entrenó.
+
+Lee el registro de predicciones (``recomendador.registro``) desde donde se
+quedó la última vez y acumula, por cada campo que usa el modelo, un
+histograma de la categoría que activa en la matriz de entrada, más uno de
+``prob_si`` en ``CUBETAS_PROBABILIDAD`` cubetas. La referencia son las mismas
+cuentas sobre el CSV de entrenamiento (y las probabilidades que el modelo da a
+esas filas).
+
+Los valores sin columna en el modelo (por ejemplo una edad numérica cuando el
+modelo solo conoce rangos) caen en la categoría ``SIN_COLUMNA``, que en el
+entrenamiento no existe: es justo la señal de que el formulario y los datos
+del modelo ya no coinciden.
+
+La memoria no depende del tamaño del registro: solo se guardan los
+histogramas (acumulado y uno reciente con decaimiento exponencial de vida
+media ``VIDA_MEDIA`` observaciones) y el byte leído de cada archivo.
+
+Se compara con el índice de estabilidad poblacional (PSI):
+< 0.1 estable, 0.1–0.25 moderada, > 0.25 significativa (conviene reentrenar
+con ``recomendador.entrenamiento``).
+
+Uso::
+
+    python -m recomendador.deriva [--registro DIR] [--reiniciar] [--json]
+
+Termina con código 1 si algún campo tiene deriva significativa reciente.
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from recomendador.bosque import bosque_para
+from recomendador.codificador import CodificadorEntradas, codificador_para
+from recomendador.entrenamiento import RUTA_DATOS, cargar_datos
+from recomendador.esquema import CAMPOS, NOMBRES
+from recomendador.modelo import RAIZ_PROYECTO, ModeloCargado, cargar_modelo, ruta_preferida
+from recomendador.prediccion import CLASE_SI
+from recomendador.registro import VARIABLE_DIRECTORIO, archivos_registro
+from recomendador.registro import DIRECTORIO as DIRECTORIO_REGISTRO
+
+RUTA_ESTADO = RAIZ_PROYECTO / ".cache" / "deriva" / "estado.json"
+SIN_COLUMNA = "(sin columna en el modelo)"
+PROBABILIDAD = "prob_si"
+CUBETAS_PROBABILIDAD = 10
+VIDA_MEDIA = 1_000
+REGISTROS_POR_LOTE = 10_000
+# Proporción mínima: una categoría ausente en un lado no da un PSI infinito
+EPSILON = 1e-4
+UMBRAL_MODERADA = 0.1
+UMBRAL_SIGNIFICATIVA = 0.25
+
+
+def psi(observado: np.ndarray, referencia: np.ndarray) -> float:
+    """Índice de estabilidad poblacional entre dos histogramas de conteos."""
+    p = np.maximum(observado / max(observado.sum(), 1e-12), EPSILON)
+    q = np.maximum(referencia / max(referencia.sum(), 1e-12), EPSILON)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def nivel_deriva(valor: float) -> str:
+    if valor > UMBRAL_SIGNIFICATIVA:
+        return "significativa"
+    if valor > UMBRAL_MODERADA:
+        return "moderada"
+    return "estable"
+
+
+def _grupos(codificador: CodificadorEntradas) -> Dict[str, Tuple[List[int], List[str]]]:
+    """Columnas one-hot de cada campo y el nombre de su categoría."""
+    grupos = {}
+    for campo in CAMPOS:
+        prefijo = f"{campo}_"
+        columnas = [(i, c[len(prefijo):]) for i, c in enumerate(codificador.columnas) if c.startswith(prefijo)]
+        if columnas:
+            grupos[campo] = ([i for i, _ in columnas], [nombre for _, nombre in columnas] + [SIN_COLUMNA])
+    return grupos
+
+
+def _cubetas_probabilidad(prob_si: np.ndarray) -> np.ndarray:
+    return np.minimum((np.asarray(prob_si, dtype=float) * CUBETAS_PROBABILIDAD).astype(np.intp),
+                      CUBETAS_PROBABILIDAD - 1)
+
+
+@dataclass
+class Fila:
+    campo: str
+    psi_total: float
+    psi_reciente: float
+    deriva: str
+    # Categoría cuyo peso más cambió en lo reciente frente al entrenamiento
+    categoria: str
+    referencia: float
+    reciente: float
+
+
+class MonitorDeriva:
+    """Histogramas acumulados y recientes frente a los del entrenamiento."""
+
+    def __init__(self, codificador: CodificadorEntradas, referencia: Dict[str, np.ndarray],
+                 vida_media: float = VIDA_MEDIA) -> None:
+        self.codificador = codificador
+        self.grupos = _grupos(codificador)
+        self.categorias: Dict[str, List[str]] = {campo: nombres for campo, (_, nombres) in self.grupos.items()}
+        self.categorias[PROBABILIDAD] = [
+            f"{i / CUBETAS_PROBABILIDAD:.1f}–{(i + 1) / CUBETAS_PROBABILIDAD:.1f}" for i in range(CUBETAS_PROBABILIDAD)
+        ]
+        self.referencia = referencia
+        self.vida_media = vida_media
+        self.acumulado = {campo: np.zeros(len(nombres)) for campo, nombres in self.categorias.items()}
+        self.reciente = {campo: np.zeros(len(nombres)) for campo, nombres in self.categorias.items()}
+        self.observaciones = 0
+        # Byte leído de cada archivo del registro, por inodo (la rotación renombra, no copia)
+        self.posiciones: Dict[str, int] = {}
+
+    @classmethod
+    def desde_entrenamiento(cls, modelo_cargado: ModeloCargado, ruta_csv: Path = RUTA_DATOS,
+                            vida_media: float = VIDA_MEDIA) -> "MonitorDeriva":
+        bosque = bosque_para(modelo_cargado)
+        codificador = codificador_para(bosque.feature_names_in_)
+        X, _, _, _ = cargar_datos(ruta_csv)
+        X = X.reindex(columns=list(codificador.columnas), fill_value=0).to_numpy(dtype=float)
+        monitor = cls(codificador, {}, vida_media)
+        prob_si = bosque.predict_proba(X)[:, int(np.flatnonzero(bosque.classes_ == CLASE_SI)[0])]
+        monitor.referencia = monitor._conteos(X, prob_si)
+        return monitor
+
+    def _conteos(self, X: np.ndarray, prob_si: np.ndarray, pesos: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        conteos = {}
+        for campo, (columnas, nombres) in self.grupos.items():
+            bloque = X[:, columnas]
+            codigos = np.where(bloque.any(axis=1), bloque.argmax(axis=1), len(columnas))
+            conteos[campo] = np.bincount(codigos, weights=pesos, minlength=len(nombres)).astype(float)
+        conteos[PROBABILIDAD] = np.bincount(
+            _cubetas_probabilidad(prob_si), weights=pesos, minlength=CUBETAS_PROBABILIDAD
+        ).astype(float)
+        return conteos
+
+    def observar_lote(self, datos: Dict[str, List[Any]], prob_si: np.ndarray) -> None:
+        """Suma perfiles crudos (columnas) y sus probabilidades a los histogramas."""
+        try:
+            X = self.codificador.codificar_lote(datos)
+        except ValueError:
+            # Algún valor fuera del dominio: se descartan solo esas filas
+            X, prob_si = self._filas_validas(datos, prob_si)
+        n = len(prob_si)
+        # Cada observación pesa 0.5^(observaciones posteriores / vida media)
+        pesos = 0.5 ** (np.arange(n - 1, -1, -1) / self.vida_media)
+        decaimiento = 0.5 ** (n / self.vida_media)
+        for campo, conteo in self._conteos(X, prob_si).items():
+            self.acumulado[campo] += conteo
+        for campo, conteo in self._conteos(X, prob_si, pesos).items():
+            self.reciente[campo] = self.reciente[campo] * decaimiento + conteo
+        self.observaciones += n
+
+    def _filas_validas(self, datos: Dict[str, List[Any]], prob_si: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        filas, validas = [], []
+        for i, valores in enumerate(zip(*(datos[campo] for campo in CAMPOS))):
+            try:
+                filas.append(self.codificador.codificar(dict(zip(CAMPOS, valores)))[0])
+            except (KeyError, ValueError):
+                continue
+            validas.append(i)
+        X = np.asarray(filas).reshape(len(filas), len(self.codificador.columnas))
+        return X, prob_si[validas]
+
+    def informe(self) -> List[Fila]:
+        filas = []
+        for campo, nombres in self.categorias.items():
+            referencia = self.referencia[campo]
+            reciente = self.reciente[campo]
+            p = reciente / max(reciente.sum(), 1e-12)
+            q = referencia / max(referencia.sum(), 1e-12)
+            mayor = int(np.argmax(np.abs(p - q)))
+            psi_reciente = psi(reciente, referencia)
+            filas.append(Fila(
+                campo=campo,
+                psi_total=psi(self.acumulado[campo], referencia),
+                psi_reciente=psi_reciente,
+                deriva=nivel_deriva(psi_reciente),
+                categoria=nombres[mayor],
+                referencia=float(q[mayor]),
+                reciente=float(p[mayor]),
+            ))
+        return filas
+
+    # Estado persistente entre ejecuciones
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "columnas": list(self.codificador.columnas),
+            "vida_media": self.vida_media,
+            "observaciones": self.observaciones,
+            "posiciones": self.posiciones,
+            "acumulado": {campo: conteo.tolist() for campo, conteo in self.acumulado.items()},
+            "reciente": {campo: conteo.tolist() for campo, conteo in self.reciente.items()},
+        }
+
+    def restaurar(self, estado: Dict[str, Any]) -> bool:
+        """Retoma un estado guardado; ``False`` si era de otro modelo o configuración."""
+        if estado.get("columnas") != list(self.codificador.columnas) or estado.get("vida_media") != self.vida_media:
+            return False
+        self.observaciones = estado["observaciones"]
+        self.posiciones = dict(estado["posiciones"])
+        self.acumulado = {campo: np.asarray(conteo) for campo, conteo in estado["acumulado"].items()}
+        self.reciente = {campo: np.asarray(conteo) for campo, conteo in estado["reciente"].items()}
+        return True
+
+    def leer_registro(self, directorio: Path = DIRECTORIO_REGISTRO) -> int:
+        """Procesa las líneas nuevas del registro; devuelve cuántas leyó."""
+        leidas = 0
+        vistos = {}
+        for ruta in archivos_registro(directorio):
+            estado = os.stat(ruta)
+            inodo = str(estado.st_ino)
+            # Un archivo más corto que lo ya leído es otro con el mismo inodo
+            inicio = self.posiciones.get(inodo, 0) if estado.st_size >= self.posiciones.get(inodo, 0) else 0
+            vistos[inodo] = inicio
+            for perfiles, prob_si, posicion in _lotes_registro(ruta, inicio):
+                if len(prob_si):
+                    self.observar_lote(perfiles, prob_si)
+                vistos[inodo] = posicion
+                leidas += len(prob_si)
+        # Los archivos que ya no existen (rotados más allá de COPIAS) se olvidan
+        self.posiciones = vistos
+        return leidas
+
+
+def _lotes_registro(ruta: Path, inicio: int) -> Iterator[Tuple[Dict[str, List[Any]], np.ndarray, int]]:
+    """Lotes de perfiles del registro desde ``inicio``; la última línea incompleta se deja para después."""
+    with open(ruta, "rb") as archivo:
+        archivo.seek(inicio)
+        posicion = inicio
+        perfiles: Dict[str, List[Any]] = {campo: [] for campo in CAMPOS}
+        prob_si: List[float] = []
+        for linea in archivo:
+            if not linea.endswith(b"\n"):
+                break
+            posicion += len(linea)
+            try:
+                registro = json.loads(linea)
+                valores = [registro["perfil"][campo] for campo in CAMPOS]
+                probabilidad = float(registro["prob_si"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            for campo, valor in zip(CAMPOS, valores):
+                perfiles[campo].append(valor)
+            prob_si.append(probabilidad)
+            if len(prob_si) >= REGISTROS_POR_LOTE:
+                yield perfiles, np.asarray(prob_si), posicion
+                perfiles = {campo: [] for campo in CAMPOS}
+                prob_si = []
+        if prob_si:
+            yield perfiles, np.asarray(prob_si), posicion
+        elif posicion > inicio:
+            yield perfiles, np.zeros(0), posicion
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Deriva de los perfiles servidos frente al entrenamiento.")
+    parser.add_argument("--registro", type=Path, default=None, help="Directorio del registro de predicciones")
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo .pkl o .bosque (por defecto el preferido)")
+    parser.add_argument("--datos", type=Path, default=RUTA_DATOS, help="CSV de entrenamiento (referencia)")
+    parser.add_argument("--estado", type=Path, default=RUTA_ESTADO, help="Dónde guardar los histogramas")
+    parser.add_argument("--reiniciar", action="store_true", help="Descarta el estado y relee todo el registro")
+    parser.add_argument("--json", action="store_true", help="Imprime el informe en JSON")
+    args = parser.parse_args(argv)
+
+    directorio = args.registro or Path(os.environ.get(VARIABLE_DIRECTORIO) or DIRECTORIO_REGISTRO)
+    monitor = MonitorDeriva.desde_entrenamiento(cargar_modelo(args.modelo or ruta_preferida()), args.datos)
+    if not args.reiniciar and args.estado.exists():
+        monitor.restaurar(json.loads(args.estado.read_text(encoding="utf-8")))
+    nuevas = monitor.leer_registro(directorio)
+
+    args.estado.parent.mkdir(parents=True, exist_ok=True)
+    ruta_tmp = args.estado.with_name(args.estado.name + ".tmp")
+    ruta_tmp.write_text(json.dumps(monitor.estado()), encoding="utf-8")
+    ruta_tmp.replace(args.estado)
+
+    filas = monitor.informe()
+    if args.json:
+        print(json.dumps({"observaciones": monitor.observaciones, "nuevas": nuevas,
+                          "campos": [vars(fila) for fila in filas]}, ensure_ascii=False, indent=2))
+    elif monitor.observaciones == 0:
+        print(f"Sin predicciones registradas en {directorio}")
+    else:
+        print(f"📈 {monitor.observaciones:,} predicciones ({nuevas:,} nuevas) frente al entrenamiento")
+        print(f"{'campo':<28} {'PSI total':>9} {'PSI reciente':>12}  {'deriva':<13} mayor cambio reciente")
+        for fila in filas:
+            nombre = NOMBRES.get(fila.campo, "Probabilidad de Sí")
+            cambio = f"{fila.categoria}: {fila.referencia * 100:.0f}% → {fila.reciente * 100:.0f}%"
+            print(f"{nombre:<28} {fila.psi_total:>9.3f} {fila.psi_reciente:>12.3f}  {fila.deriva:<13} {cambio}")
+    return 1 if any(fila.deriva == "significativa" for fila in filas) and monitor.observaciones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
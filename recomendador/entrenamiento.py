@@ -0,0 +1,179 @@
+"""Entrenamiento reproducible y paralelo, equivalente a ``analisis_MEJORADO.ipynb``.
+
+Repite los pasos del notebook (limpieza de encabezados, ``get_dummies``,
+``train_test_split``, ``RandomForestClassifier`` y validación cruzada de 5
+folds) usando todos los núcleos tanto para el ajuste del bosque como para los
+folds. El dataset limpio y codificado se guarda en caché según el hash del
+CSV, así que volver a entrenar con los mismos datos se salta el preprocesado.
+
+Uso::
+
+    python -m recomendador.entrenamiento [--datos respuestas.csv] [--procesos -1] [--parametros '{"max_depth": 4}']
+
+Escribe el ``.pkl``, el artefacto ``.bosque`` y un ``.json`` de metadatos
+(columnas, métricas, tiempos) que la app usa para verificar las columnas.
+"""
+
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from recomendador.esquema import (
+    AIRE_LIBRE,
+    COLOR_PIEL,
+    EDAD,
+    HORAS_SOL,
+    TIPO_PIEL,
+    limpiar_columnas,
+)
+from recomendador.modelo import RAIZ_PROYECTO, RUTA_MODELO, sha256_archivo
+
+RUTA_DATOS = RAIZ_PROYECTO / "Encuesta de estadística (respuestas) - Respuestas de formulario 1.csv"
+DIRECTORIO_CACHE = RAIZ_PROYECTO / ".cache" / "entrenamiento"
+
+COLUMNAS_MODELO = [EDAD, TIPO_PIEL, COLOR_PIEL, HORAS_SOL, AIRE_LIBRE]
+OBJETIVO = "Usas_protector_solar_diariamente"
+
+PARAMETROS = {
+    "n_estimators": 300,
+    "max_depth": 6,
+    "min_samples_split": 3,
+    "random_state": 42,
+}
+TAMANO_TEST = 0.2
+SEMILLA_DIVISION = 42
+FOLDS = 5
+
+# Cambiar si cambia la preparación de datos, para invalidar la caché
+VERSION_PREPROCESADO = 1
+
+
+def preparar_datos(ruta_csv: Path):
+    """Carga, limpia y codifica el CSV igual que el notebook; devuelve ``X, y``."""
+    import pandas as pd
+
+    df = pd.read_csv(ruta_csv, encoding="utf-8")
+    df.columns = limpiar_columnas(df.columns)
+    df = df[COLUMNAS_MODELO + [OBJETIVO]].dropna()
+    y = df[OBJETIVO].map({"Sí": 1, "No": 0})
+    X = pd.get_dummies(df[COLUMNAS_MODELO])
+    return X, y
+
+
+def cargar_datos(ruta_csv: Path, usar_cache: bool = True) -> Tuple[Any, Any, str, bool]:
+    """``X, y``, hash del CSV y si salieron de la caché."""
+    import pandas as pd
+
+    sha256_datos = sha256_archivo(ruta_csv)
+    ruta_cache = DIRECTORIO_CACHE / f"{sha256_datos[:16]}_v{VERSION_PREPROCESADO}.pkl"
+    if usar_cache and ruta_cache.exists():
+        X, y = pd.read_pickle(ruta_cache)
+        return X, y, sha256_datos, True
+
+    X, y = preparar_datos(ruta_csv)
+    if usar_cache:
+        DIRECTORIO_CACHE.mkdir(parents=True, exist_ok=True)
+        ruta_tmp = ruta_cache.with_name(ruta_cache.name + ".tmp")
+        pd.to_pickle((X, y), ruta_tmp)
+        ruta_tmp.replace(ruta_cache)
+    return X, y, sha256_datos, False
+
+
+def entrenar(
+    ruta_csv: Path = RUTA_DATOS,
+    ruta_modelo: Path = RUTA_MODELO,
+    procesos: int = -1,
+    usar_cache: bool = True,
+    parametros: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Entrena, evalúa y guarda el modelo; devuelve los metadatos escritos."""
+    import joblib
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import cross_val_score, train_test_split
+
+    from recomendador.artefacto import guardar_artefacto
+
+    parametros = {**PARAMETROS, **(parametros or {})}
+    tiempos: Dict[str, float] = {}
+
+    inicio = time.perf_counter()
+    X, y, sha256_datos, desde_cache = cargar_datos(ruta_csv, usar_cache)
+    tiempos["datos_s"] = time.perf_counter() - inicio
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TAMANO_TEST, random_state=SEMILLA_DIVISION
+    )
+    modelo = RandomForestClassifier(**parametros, n_jobs=procesos)
+
+    inicio = time.perf_counter()
+    modelo.fit(X_train, y_train)
+    tiempos["ajuste_s"] = time.perf_counter() - inicio
+    accuracy_test = accuracy_score(y_test, modelo.predict(X_test))
+
+    # Cada fold en su propio proceso; el bosque de cada fold se ajusta en serie
+    inicio = time.perf_counter()
+    scores = cross_val_score(
+        RandomForestClassifier(**parametros, n_jobs=1), X, y, cv=FOLDS, n_jobs=procesos
+    )
+    tiempos["validacion_cruzada_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ruta_modelo = Path(ruta_modelo)
+    # Se guarda sin n_jobs: al servir se predicen filas sueltas
+    modelo.set_params(n_jobs=None)
+    joblib.dump(modelo, ruta_modelo)
+    sha256_modelo = sha256_archivo(ruta_modelo)
+    metricas = {
+        "accuracy_test": accuracy_test,
+        "cv_scores": scores.tolist(),
+        "cv_promedio": float(scores.mean()),
+    }
+    guardar_artefacto(
+        modelo, ruta_modelo.with_suffix(".bosque"), datos=ruta_csv, metricas=metricas, sha256_modelo=sha256_modelo
+    )
+    tiempos["guardado_s"] = time.perf_counter() - inicio
+
+    metadatos = {
+        "columnas": list(modelo.feature_names_in_),
+        "parametros": parametros,
+        "metricas": metricas,
+        "tiempos": tiempos,
+        "filas": int(len(X)),
+        "datos": {"archivo": Path(ruta_csv).name, "sha256": sha256_datos, "desde_cache": desde_cache},
+        "sha256_modelo": sha256_modelo,
+        "entorno": {"python": platform.python_version(), "sklearn": sklearn.__version__},
+    }
+    ruta_modelo.with_suffix(".json").write_text(
+        json.dumps(metadatos, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    return metadatos
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Entrena el Random Forest del recomendador.")
+    parser.add_argument("--datos", type=Path, default=RUTA_DATOS, help="CSV de la encuesta")
+    parser.add_argument("--salida", type=Path, default=RUTA_MODELO, help="Ruta del modelo .pkl")
+    parser.add_argument("--procesos", type=int, default=-1, help="Núcleos a usar (-1 = todos)")
+    parser.add_argument("--sin-cache", action="store_true", help="Ignora la caché del dataset preprocesado")
+    parser.add_argument("--parametros", type=json.loads, default=None,
+                        help="JSON con hiperparámetros que reemplazan a PARAMETROS (ver recomendador.ajuste)")
+    args = parser.parse_args(argv)
+
+    metadatos = entrenar(
+        args.datos, args.salida, args.procesos, usar_cache=not args.sin_cache, parametros=args.parametros
+    )
+    metricas = metadatos["metricas"]
+    print(f"🎯 Accuracy en test: {metricas['accuracy_test']:.3f}")
+    print(f"🔁 Validación cruzada ({FOLDS} folds): {[round(s, 3) for s in metricas['cv_scores']]}")
+    print(f"Promedio de accuracy: {metricas['cv_promedio']:.3f}")
+    print("⏱️ " + ", ".join(f"{etapa} {segundos:.2f} s" for etapa, segundos in metadatos["tiempos"].items()))
+    print(f"✅ Modelo guardado como '{args.salida}'")
+
+
+if __name__ == "__main__":
+    main()
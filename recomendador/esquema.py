@@ -0,0 +1,72 @@
+"""Campos del formulario y valores que la app puede enviar al modelo."""
+
+from numbers import Number
+from typing import Any, Dict, Iterable, List, Mapping
+
+EDAD = "Edad"
+GENERO = "Género"
+TIPO_PIEL = "Tipo_de_piel"
+COLOR_PIEL = "Color_de_piel"
+QUEMARSE = "Tu_piel_tiende_a_enrojecerse_o_quemarse_fácilmente_con_el_sol"
+HORAS_SOL = "Cuántas_horas_promedio_pasas_al_día_expuesto_al_sol"
+AIRE_LIBRE = "Qué_tan_frecuente_realizas_actividades_al_aire_libre"
+
+# Orden de las columnas del DataFrame de entrada que arma app.py
+CAMPOS = (EDAD, GENERO, TIPO_PIEL, COLOR_PIEL, QUEMARSE, HORAS_SOL, AIRE_LIBRE)
+
+# Dominio finito de cada campo, en el mismo orden que las opciones de la app
+DOMINIOS = {
+    EDAD: tuple(range(10, 101)),
+    GENERO: ("Femenino", "Masculino", "Prefiero no decirlo"),
+    TIPO_PIEL: ("Normal", "Grasa", "Seca", "Mixta", "Sensible"),
+    COLOR_PIEL: ("Muy clara", "Clara", "Morena clara", "Morena oscura", "Oscura"),
+    QUEMARSE: ("Sí", "A veces", "No"),
+    HORAS_SOL: ("Menos de 1 hora", "Entre 1 y 3 horas", "Más de 3 horas"),
+    AIRE_LIBRE: ("Casi nunca", "Ocasionalmente", "Frecuentemente", "Muy frecuentemente"),
+}
+
+
+# Cómo se muestra cada campo al usuario
+NOMBRES = {
+    EDAD: "Edad",
+    GENERO: "Género",
+    TIPO_PIEL: "Tipo de piel",
+    COLOR_PIEL: "Color de piel",
+    QUEMARSE: "Sensibilidad al sol",
+    HORAS_SOL: "Horas de sol",
+    AIRE_LIBRE: "Actividades al aire libre",
+}
+
+
+def limpiar_columnas(columnas: Iterable[str]) -> List[str]:
+    """Limpia encabezados de la encuesta igual que el notebook de entrenamiento."""
+    limpias = []
+    for columna in columnas:
+        columna = columna.strip()
+        for caracter in ("\n", "¿", "?"):
+            columna = columna.replace(caracter, "")
+        limpias.append(columna.replace(" ", "_"))
+    return limpias
+
+
+# Nombres cortos aceptados por las entradas que no son la app (API, pruebas de carga)
+ALIAS = {
+    "genero": GENERO,
+    "quemarse": QUEMARSE,
+    "horas_sol": HORAS_SOL,
+    "aire_libre": AIRE_LIBRE,
+}
+
+
+def normalizar_perfil(datos: Mapping[str, Any]) -> Dict[str, Any]:
+    """Perfil con los siete campos en orden canónico, aceptando nombres cortos."""
+    perfil = {ALIAS.get(campo, campo): valor for campo, valor in datos.items()}
+    faltantes = [campo for campo in CAMPOS if campo not in perfil]
+    if faltantes:
+        raise ValueError(f"Faltan campos en el perfil: {faltantes}")
+    # Listas u objetos (JSON mal formado) no son hashables ni codificables
+    no_escalares = [campo for campo in CAMPOS
+                    if not (perfil[campo] is None or isinstance(perfil[campo], (str, Number)))]
+    if no_escalares:
+        raise ValueError(f"Se esperaba un valor simple en los campos: {no_escalares}")
+    return {campo: perfil[campo] for campo in CAMPOS}
@@ -0,0 +1,432 @@
+"""Tablas de contingencia de la encuesta, acumuladas de forma incremental.
+
+Todo lo que muestra la página de estadísticas (tasas de uso, tablas cruzadas,
+chi-cuadrado, intervalos de confianza) se deriva de conteos por par
+``(factor, resultado)``. Los conteos se suman, así que:
+
+- cada bloque del CSV se lee como categorías y se cuenta de forma
+  vectorizada (códigos + ``bincount``), y se suma al acumulado;
+- el acumulado se guarda en ``.cache/estadisticas`` junto con el SHA-256 y
+  el tamaño de la parte del CSV ya contada, que termina siempre en un salto
+  de línea (una fila que se está escribiendo no se guarda a medias);
+- si el CSV conserva ese prefijo (se le añadieron filas al final), solo se
+  leen los bytes nuevos; si cambió de otra forma, se recuentan todos.
+
+Uso::
+
+    python -m recomendador.estadisticas [--datos respuestas.csv] [--sin-cache]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import math
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from recomendador import esquema
+from recomendador.entrenamiento import OBJETIVO, RUTA_DATOS
+from recomendador.esquema import AIRE_LIBRE, COLOR_PIEL, EDAD, GENERO, HORAS_SOL, QUEMARSE, TIPO_PIEL, limpiar_columnas
+from recomendador.modelo import RAIZ_PROYECTO
+
+DIRECTORIO_CACHE = RAIZ_PROYECTO / ".cache" / "estadisticas"
+TAMANO_BLOQUE = 200_000
+BYTES_LECTURA = 1 << 20
+
+# Cambiar si cambian las columnas o la forma de contar, para invalidar la caché
+VERSION_AGREGADOS = 1
+
+# Columnas de la encuesta que no entran al modelo
+HORARIO = "En_qué_horario_sueles_estar_más_expuesto_al_sol"
+REAPLICACION = "Si_respondiste_“Sí”,_cuántas_veces_al_día_lo_reaplicas"
+SPF = "Qué_factor_SPF_usas_normalmente"
+ASPECTO = "Qué_aspecto_valoras_más_al_escoger_un_protector_solar"
+NUBLADOS = "Consideras_que_el_protector_solar_es_necesario_incluso_en_días_nublados"
+QUEMADURAS = "Has_tenido_quemaduras_solares_en_el_último_año"
+CONSCIENCIA = (
+    "Qué_tan_consciente_eres_de_los_efectos_del_sol_en_la_piel_Escala_del_1_al_5_"
+    "(1_=_nada_consciente,_5_=_muy_consciente)"
+)
+CUIDADO_FACIAL = "Con_qué_frecuencia_usas_otros_productos_para_el_cuidado_facial_(hidratante,_serum,_etc.)"
+
+# Perfil de quien responde (filas de las tablas) y hábitos (columnas)
+FACTORES = (EDAD, GENERO, TIPO_PIEL, COLOR_PIEL, QUEMARSE, HORAS_SOL, HORARIO, AIRE_LIBRE)
+RESULTADOS = (OBJETIVO, REAPLICACION, SPF, ASPECTO, NUBLADOS, QUEMADURAS, CONSCIENCIA, CUIDADO_FACIAL)
+
+NOMBRES = {
+    **esquema.NOMBRES,
+    HORARIO: "Horario de exposición",
+    OBJETIVO: "Usa protector a diario",
+    REAPLICACION: "Reaplicaciones al día",
+    SPF: "SPF habitual",
+    ASPECTO: "Aspecto más valorado",
+    NUBLADOS: "Necesario en días nublados",
+    QUEMADURAS: "Quemaduras en el último año",
+    CONSCIENCIA: "Consciencia (1-5)",
+    CUIDADO_FACIAL: "Otros productos faciales",
+}
+
+SIN_RESPUESTA = "Sin respuesta"
+SI = "Sí"
+Z_95 = 1.959963984540054
+
+
+@dataclass
+class Agregados:
+    """Conteos acumulados y la parte del CSV de la que salen."""
+
+    sha256: str = ""
+    bytes_contados: int = 0
+    filas: int = 0
+    # (factor, resultado) -> tabla de conteos (niveles del factor × niveles del resultado)
+    conteos: Dict[Tuple[str, str], Any] = field(default_factory=dict)
+    columnas_csv: Tuple[str, ...] = ()
+    version: int = VERSION_AGREGADOS
+
+    def tabla(self, factor: str, resultado: str):
+        """Tabla cruzada de conteos, con las filas y columnas ordenadas."""
+        tabla = self.conteos[(factor, resultado)]
+        return tabla.sort_index().sort_index(axis=1).astype(np.int64)
+
+    def sumar(self, bloque) -> None:
+        """Cuenta un bloque ya limpio y lo suma a los acumulados."""
+        codigos = {columna: _factorizar(bloque[columna]) for columna in FACTORES + RESULTADOS}
+        for factor in FACTORES:
+            codigos_f, niveles_f = codigos[factor]
+            for resultado in RESULTADOS:
+                codigos_r, niveles_r = codigos[resultado]
+                conteo = np.bincount(
+                    codigos_f * len(niveles_r) + codigos_r, minlength=len(niveles_f) * len(niveles_r)
+                ).reshape(len(niveles_f), len(niveles_r))
+                nueva = _marco(conteo, niveles_f, niveles_r)
+                anterior = self.conteos.get((factor, resultado))
+                self.conteos[(factor, resultado)] = nueva if anterior is None else _sumar_tablas(anterior, nueva)
+        self.filas += len(bloque)
+
+
+def _sumar_tablas(a, b):
+    # add(fill_value=0) deja NaN donde la fila solo está en una tabla y la columna
+    # solo en la otra: ambas se llevan antes a la unión de niveles
+    filas = a.index.union(b.index)
+    columnas = a.columns.union(b.columns)
+    return (a.reindex(index=filas, columns=columnas, fill_value=0)
+            + b.reindex(index=filas, columns=columnas, fill_value=0))
+
+
+def _factorizar(serie) -> Tuple[np.ndarray, Any]:
+    # Las respuestas vacías cuentan como una categoría más
+    if serie.hasnans:
+        serie = serie.cat.add_categories(SIN_RESPUESTA).fillna(SIN_RESPUESTA)
+    return serie.cat.codes.to_numpy(dtype=np.intp), serie.cat.categories
+
+
+def _marco(conteo: np.ndarray, filas, columnas):
+    import pandas as pd
+
+    return pd.DataFrame(conteo, index=pd.Index(filas, name="fila"), columns=pd.Index(columnas, name="columna"))
+
+
+class _Tramo(io.RawIOBase):
+    """Bytes ``[inicio, fin)`` de un archivo: ``read_csv`` no lee más allá de ``fin``."""
+
+    def __init__(self, archivo, inicio: int, fin: int) -> None:
+        self._archivo = archivo
+        self._archivo.seek(inicio)
+        self._restantes = fin - inicio
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        n = self._archivo.readinto(memoryview(destino)[: min(len(destino), self._restantes)])
+        self._restantes -= n
+        return n
+
+
+def _hash_tramo(archivo, hasher, inicio: int, fin: int) -> None:
+    archivo.seek(inicio)
+    restantes = fin - inicio
+    while restantes > 0:
+        datos = archivo.read(min(BYTES_LECTURA, restantes))
+        if not datos:
+            break
+        hasher.update(datos)
+        restantes -= len(datos)
+
+
+def _bloques(archivo, inicio: int, fin: int, columnas_csv: Tuple[str, ...],
+             tamano_bloque: int) -> Iterator:
+    import pandas as pd
+
+    # Solo las columnas contadas, por posición (la marca temporal no se lee)
+    usar = [columnas_csv.index(columna) for columna in FACTORES + RESULTADOS]
+    tramo = io.BufferedReader(_Tramo(archivo, inicio, fin), BYTES_LECTURA)
+    lector = pd.read_csv(tramo, header=0 if inicio == 0 else None, usecols=usar, chunksize=tamano_bloque,
+                         encoding="utf-8", dtype="category")
+    for bloque in lector:
+        bloque.columns = [columnas_csv[i] for i in sorted(usar)]
+        yield bloque
+
+
+def _columnas_csv(archivo) -> Tuple[str, ...]:
+    import pandas as pd
+
+    archivo.seek(0)
+    columnas = tuple(limpiar_columnas(pd.read_csv(archivo, nrows=0, encoding="utf-8").columns))
+    faltantes = set(FACTORES + RESULTADOS) - set(columnas)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el CSV: {sorted(faltantes)}")
+    return columnas
+
+
+def _ruta_cache(ruta_csv: Path) -> Path:
+    clave = hashlib.sha256(str(ruta_csv.resolve()).encode("utf-8")).hexdigest()[:16]
+    return DIRECTORIO_CACHE / f"{clave}_v{VERSION_AGREGADOS}.pkl"
+
+
+def _leer_cache(ruta: Path) -> Optional[Agregados]:
+    try:
+        with open(ruta, "rb") as archivo:
+            agregados = pickle.load(archivo)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return agregados if getattr(agregados, "version", None) == VERSION_AGREGADOS else None
+
+
+def _guardar_cache(ruta: Path, agregados: Agregados) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta_tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(ruta_tmp, "wb") as archivo:
+        pickle.dump(agregados, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+    ruta_tmp.replace(ruta)
+
+
+def calcular_agregados(ruta_csv: Path = RUTA_DATOS, usar_cache: bool = True,
+                       tamano_bloque: int = TAMANO_BLOQUE) -> Tuple[Agregados, str]:
+    """Agregados del CSV completo y cómo se obtuvieron (``cache``, ``incremental`` o ``completo``)."""
+    ruta_csv = Path(ruta_csv)
+    ruta_cache = _ruta_cache(ruta_csv)
+    previos = _leer_cache(ruta_cache) if usar_cache else None
+
+    with open(ruta_csv, "rb") as archivo:
+        # Tamaño fijado al empezar: lo que se escriba mientras tanto queda para la próxima vez
+        fin = archivo.seek(0, io.SEEK_END)
+        # Solo se guarda hasta el último salto de línea: una fila a medio escribir
+        # no puede quedar en bytes_contados (la siguiente pasada empezaría a mitad de fila)
+        corte = _fin_ultima_linea(archivo, fin)
+        encabezado = _fin_encabezado(archivo)
+        if corte < encabezado:
+            # El encabezado tiene saltos de línea entre comillas: aún no hay ninguna fila completa
+            corte = 0
+        hasher = hashlib.sha256()
+        inicio = 0
+        if previos is not None and previos.bytes_contados <= corte:
+            _hash_tramo(archivo, hasher, 0, previos.bytes_contados)
+            if hasher.hexdigest() == previos.sha256:
+                inicio = previos.bytes_contados
+            else:
+                hasher = hashlib.sha256()
+                previos = None
+        else:
+            previos = None
+
+        if previos is not None and inicio == corte:
+            agregados, origen = previos, "cache"
+        else:
+            agregados = previos or Agregados(columnas_csv=_columnas_csv(archivo))
+            if corte > inicio:
+                for bloque in _bloques(archivo, inicio, corte, agregados.columnas_csv, tamano_bloque):
+                    agregados.sumar(bloque)
+            _hash_tramo(archivo, hasher, inicio, corte)
+            agregados.sha256 = hasher.hexdigest()
+            agregados.bytes_contados = corte
+            if usar_cache:
+                _guardar_cache(ruta_cache, agregados)
+            origen = "incremental" if previos is not None else "completo"
+
+        cola = max(corte, encabezado)
+        if cola < fin and _fila_completa(archivo, cola, fin, len(agregados.columnas_csv)):
+            # Última fila sin salto de línea (así exportan muchos formularios): se cuenta
+            # en el resultado, pero no en lo guardado
+            agregados = replace(agregados, conteos=dict(agregados.conteos))
+            for bloque in _bloques(archivo, cola, fin, agregados.columnas_csv, tamano_bloque):
+                agregados.sumar(bloque)
+    return agregados, origen
+
+
+def _fin_encabezado(archivo) -> int:
+    """Bytes que ocupa la fila de encabezado, con sus saltos de línea entre comillas."""
+    archivo.seek(0)
+    leidos = 0
+
+    def lineas() -> Iterator[str]:
+        nonlocal leidos
+        for linea in iter(archivo.readline, b""):
+            leidos += len(linea)
+            yield linea.decode("utf-8")
+
+    # csv.reader pide líneas de una en una: se detiene al cerrar la primera fila
+    next(csv.reader(lineas()), None)
+    return leidos
+
+
+def _fila_completa(archivo, inicio: int, fin: int, n_columnas: int) -> bool:
+    """Si ``[inicio, fin)`` es una sola fila con todas sus columnas (y no una a medio escribir)."""
+    archivo.seek(inicio)
+    texto = archivo.read(fin - inicio).decode("utf-8", errors="replace")
+    filas = list(csv.reader(io.StringIO(texto, newline="")))
+    return len(filas) == 1 and len(filas[0]) == n_columnas
+
+
+def _fin_ultima_linea(archivo, fin: int) -> int:
+    """Posición justo después del último salto de línea antes de ``fin`` (0 si no hay ninguno)."""
+    posicion = fin
+    while posicion > 0:
+        inicio = max(0, posicion - BYTES_LECTURA)
+        archivo.seek(inicio)
+        salto = archivo.read(posicion - inicio).rfind(b"\n")
+        if salto >= 0:
+            return inicio + salto + 1
+        posicion = inicio
+    return 0
+
+
+_vigentes: Dict[Path, Tuple[Tuple[int, int], Agregados, str]] = {}
+_lock_vigentes = threading.Lock()
+
+
+def agregados_vigentes(ruta_csv: Path = RUTA_DATOS) -> Tuple[Agregados, str]:
+    """``calcular_agregados`` compartido por proceso: mientras el CSV no cambie de
+    tamaño ni de fecha, ni siquiera se vuelve a calcular su hash."""
+    ruta_csv = Path(ruta_csv).resolve()
+    with _lock_vigentes:
+        estado = ruta_csv.stat()
+        firma = (estado.st_size, estado.st_mtime_ns)
+        guardado = _vigentes.get(ruta_csv)
+        if guardado is None or guardado[0] != firma:
+            guardado = _vigentes[ruta_csv] = (firma, *calcular_agregados(ruta_csv))
+        return guardado[1], guardado[2]
+
+
+def _sin_faltantes(tabla):
+    # Las pruebas y tasas usan solo respuestas; las filas/columnas vacías se quitan
+    tabla = tabla.drop(index=SIN_RESPUESTA, columns=SIN_RESPUESTA, errors="ignore")
+    return tabla.loc[tabla.sum(axis=1) > 0, tabla.sum(axis=0) > 0]
+
+
+def intervalo_wilson(exitos: np.ndarray, total: np.ndarray, z: float = Z_95) -> Tuple[np.ndarray, np.ndarray]:
+    """Intervalo de Wilson para proporciones (se porta bien con muestras pequeñas)."""
+    exitos = np.asarray(exitos, dtype=float)
+    total = np.asarray(total, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = exitos / total
+        centro = (p + z ** 2 / (2 * total)) / (1 + z ** 2 / total)
+        radio = z * np.sqrt(p * (1 - p) / total + z ** 2 / (4 * total ** 2)) / (1 + z ** 2 / total)
+    return centro - radio, centro + radio
+
+
+def tasas(agregados: Agregados, factor: str, resultado: str = OBJETIVO, nivel: str = SI):
+    """Proporción de ``resultado == nivel`` por nivel de ``factor``, con IC del 95 %."""
+    import pandas as pd
+
+    tabla = _sin_faltantes(agregados.tabla(factor, resultado))
+    total = tabla.sum(axis=1)
+    exitos = tabla[nivel] if nivel in tabla.columns else pd.Series(0, index=tabla.index)
+    inferior, superior = intervalo_wilson(exitos.to_numpy(), total.to_numpy())
+    return pd.DataFrame(
+        {"respuestas": total, "casos": exitos, "tasa": exitos / total, "ic_inferior": inferior,
+         "ic_superior": superior},
+        index=tabla.index,
+    )
+
+
+def medias(agregados: Agregados, factor: str, resultado: str = CONSCIENCIA):
+    """Media de un resultado numérico por nivel de ``factor``, con IC t del 95 %."""
+    import pandas as pd
+    from scipy import stats
+
+    tabla = _sin_faltantes(agregados.tabla(factor, resultado))
+    valores = pd.to_numeric(tabla.columns, errors="coerce").to_numpy(dtype=float)
+    tabla = tabla.loc[:, ~np.isnan(valores)]
+    valores = valores[~np.isnan(valores)]
+    n = tabla.sum(axis=1).to_numpy(dtype=float)
+    conteos = tabla.to_numpy(dtype=float)
+    media = conteos @ valores / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        varianza = (conteos @ valores ** 2 - n * media ** 2) / (n - 1)
+        radio = stats.t.ppf(0.975, n - 1) * np.sqrt(varianza / n)
+    return pd.DataFrame(
+        {"respuestas": n.astype(np.int64), "media": media, "ic_inferior": media - radio,
+         "ic_superior": media + radio},
+        index=tabla.index,
+    )
+
+
+@dataclass(frozen=True)
+class PruebaChi2:
+    chi2: float
+    grados_libertad: int
+    p_valor: float
+    v_cramer: float
+    respuestas: int
+    # Fracción de celdas con frecuencia esperada < 5 (la aproximación pierde validez)
+    celdas_esperado_bajo: float
+
+
+def prueba_chi2(agregados: Agregados, factor: str, resultado: str) -> Optional[PruebaChi2]:
+    """Chi-cuadrado de independencia sobre la tabla sin respuestas vacías (``None`` si es degenerada)."""
+    from scipy import stats
+
+    tabla = _sin_faltantes(agregados.tabla(factor, resultado)).to_numpy()
+    if min(tabla.shape) < 2:
+        return None
+    chi2, p_valor, grados, esperados = stats.chi2_contingency(tabla, correction=False)
+    n = int(tabla.sum())
+    return PruebaChi2(
+        chi2=float(chi2),
+        grados_libertad=int(grados),
+        p_valor=float(p_valor),
+        v_cramer=math.sqrt(chi2 / (n * (min(tabla.shape) - 1))),
+        respuestas=n,
+        celdas_esperado_bajo=float((esperados < 5).mean()),
+    )
+
+
+def pruebas(agregados: Agregados, resultado: str = OBJETIVO):
+    """Chi-cuadrado de cada factor contra ``resultado``, de menor a mayor p-valor."""
+    import pandas as pd
+
+    filas = {NOMBRES[f]: prueba_chi2(agregados, f, resultado) for f in FACTORES}
+    filas = {nombre: vars(prueba) for nombre, prueba in filas.items() if prueba is not None}
+    # Con columnas explícitas aunque ninguna prueba sea posible (resultado sin respuestas)
+    return pd.DataFrame.from_dict(
+        filas, orient="index", columns=[campo.name for campo in fields(PruebaChi2)]
+    ).sort_values("p_valor")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Resumen estadístico de la encuesta.")
+    parser.add_argument("--datos", type=Path, default=RUTA_DATOS, help="CSV de la encuesta")
+    parser.add_argument("--sin-cache", action="store_true", help="Recuenta todo el CSV")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    agregados, origen = calcular_agregados(args.datos, usar_cache=not args.sin_cache)
+    segundos = time.perf_counter() - inicio
+    print(f"📊 {agregados.filas:,} respuestas ({origen}, {segundos * 1e3:.1f} ms)")
+    for factor in (TIPO_PIEL, HORAS_SOL, AIRE_LIBRE):
+        print(f"\nUso diario por {NOMBRES[factor].lower()}:")
+        print(tasas(agregados, factor).round(3).to_string())
+    print(f"\nChi-cuadrado contra '{NOMBRES[OBJETIVO]}':")
+    print(pruebas(agregados).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Aporte de cada respuesta del formulario a la probabilidad de "Sí".
+
+Descomposición por caminos de decisión: en cada árbol, al bajar de un nodo a
+su hijo la probabilidad de "Sí" cambia en ``valor(hijo) - valor(nodo)``, y ese
+cambio se atribuye al campo de la columna que decide el corte. Sumando a lo
+largo del camino y promediando entre árboles::
+
+    prob_si = sesgo + sum(aportes[campo])
+
+donde ``sesgo`` es la probabilidad media en las raíces. Los aportes
+acumulados hasta cada nodo se precalculan una vez por modelo, así que
+explicar una fila cuesta lo mismo que recorrer el bosque hasta las hojas.
+
+Un campo puede aportar aunque su respuesta no active ninguna columna: el
+modelo también decide por la ausencia de una categoría. Para quien lee la
+explicación eso no es un efecto de su respuesta (la edad exacta de la app,
+por ejemplo, no cae en ningún tramo ``Edad_…`` del modelo), así que
+``Explicacion`` marca esos campos en ``sin_columna``, ``ordenados`` los omite
+y su aporte se suma a ``base``.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from recomendador.bosque import FILAS_POR_BLOQUE, BosqueCompilado, por_filas_unicas
+from recomendador.esquema import CAMPOS
+
+
+def campo_de_columna(columna: str, campos: Sequence[str] = CAMPOS) -> str:
+    """Campo del formulario del que sale una columna de ``get_dummies``."""
+    for campo in campos:
+        if columna == campo or columna.startswith(campo + "_"):
+            return campo
+    raise ValueError(f"La columna {columna!r} no corresponde a ningún campo del formulario")
+
+
+@dataclass(frozen=True)
+class Explicacion:
+    sesgo: float
+    aportes: Dict[str, float]
+    # Campos cuya respuesta no activa ninguna columna del modelo
+    sin_columna: Tuple[str, ...] = ()
+
+    @property
+    def base(self) -> float:
+        """Probabilidad de partida: ``sesgo`` más lo que aportan los campos ``sin_columna``."""
+        return self.sesgo + sum(self.aportes[campo] for campo in self.sin_columna)
+
+    def ordenados(self, minimo: float = 0.0) -> List[Tuple[str, float]]:
+        """Campos con columna activa, de mayor a menor influencia (en valor absoluto)."""
+        return sorted(
+            (
+                (campo, aporte) for campo, aporte in self.aportes.items()
+                if campo not in self.sin_columna and abs(aporte) > minimo
+            ),
+            key=lambda par: -abs(par[1]),
+        )
+
+
+class Explicador:
+    """Aportes por campo precalculados para cada nodo del bosque."""
+
+    def __init__(self, bosque: BosqueCompilado, clase: Any) -> None:
+        self.bosque = bosque
+        columnas = [str(c) for c in bosque.feature_names_in_]
+        por_columna = [campo_de_columna(c) for c in columnas]
+        self.campos: Tuple[str, ...] = tuple(c for c in CAMPOS if c in por_columna)
+        indice_campo = np.array([self.campos.index(c) for c in por_columna], dtype=np.intp)
+        self._indice_campo = indice_campo
+
+        valores = bosque.valores[int(np.flatnonzero(bosque.classes_ == clase)[0])]
+        self.sesgo = float(valores.take(bosque.raices).mean())
+
+        # Aporte acumulado de cada campo desde la raíz hasta cada nodo
+        acumulados = np.zeros((bosque.n_nodos, len(self.campos)))
+        frontera = bosque.raices
+        while True:
+            internos = frontera[bosque.hijos[frontera, 0] != frontera]
+            if len(internos) == 0:
+                break
+            campo = indice_campo.take(bosque.caracteristicas.take(internos))
+            for lado in (0, 1):
+                hijos = bosque.hijos[internos, lado]
+                acumulados[hijos] = acumulados[internos]
+                acumulados[hijos, campo] += valores.take(hijos) - valores.take(internos)
+            frontera = bosque.hijos[internos].ravel()
+        # Un arreglo contiguo por campo: ``take`` sobre los índices de hoja
+        self._acumulados = np.ascontiguousarray(acumulados.T)
+
+    def _aportes(self, X: np.ndarray) -> np.ndarray:
+        salida = np.empty((X.shape[0], len(self.campos)))
+        for inicio in range(0, X.shape[0], FILAS_POR_BLOQUE):
+            bloque = slice(inicio, inicio + FILAS_POR_BLOQUE)
+            hojas = self.bosque.hojas(X[bloque])
+            for j, acumulados in enumerate(self._acumulados):
+                salida[bloque, j] = acumulados.take(hojas).sum(axis=1)
+        salida /= self.bosque.n_arboles
+        return salida
+
+    def aportes_matriz(self, X: np.ndarray) -> np.ndarray:
+        """Aportes (filas × ``campos``) para filas ya codificadas."""
+        return por_filas_unicas(self._aportes, X)
+
+    def activos(self, X: np.ndarray) -> np.ndarray:
+        """Si cada fila activa alguna columna de cada campo (filas × ``campos``)."""
+        activos = np.zeros((X.shape[0], len(self.campos)), dtype=bool)
+        filas, columnas = np.nonzero(X)
+        activos[filas, self._indice_campo[columnas]] = True
+        return activos
+
+    def explicar_matriz(self, X: np.ndarray) -> List[Explicacion]:
+        return [
+            Explicacion(
+                self.sesgo,
+                dict(zip(self.campos, fila.tolist())),
+                tuple(campo for campo, activo in zip(self.campos, activos) if not activo),
+            )
+            for fila, activos in zip(self.aportes_matriz(X), self.activos(X))
+        ]
+
+
+_explicadores: Dict[Tuple[int, Any], Tuple[BosqueCompilado, Explicador]] = {}
+
+
+def explicador_para(bosque: BosqueCompilado, clase: Any) -> Explicador:
+    """Explicador compartido por proceso; el precálculo se hace una vez por bosque."""
+    clave = (id(bosque), clase)
+    guardado = _explicadores.get(clave)
+    if guardado is None or guardado[0] is not bosque:
+        guardado = _explicadores[clave] = (bosque, Explicador(bosque, clase))
+    return guardado[1]
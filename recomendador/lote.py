@@ -0,0 +1,180 @@
+"""Puntuación por lotes de exportaciones de la encuesta.
+
+Lee el CSV por bloques, limpia los encabezados como el notebook, codifica
+cada bloque de forma vectorizada y escribe predicción, probabilidad y nivel
+de SPF en CSV o Parquet. La memoria queda acotada por el tamaño del bloque
+(y el número de bloques en vuelo), no por el tamaño del archivo.
+
+Con ``--explicar`` añade el aporte de cada campo a la probabilidad
+(``aporte_<campo>``, ver ``recomendador.explicacion``); con ``--registrar``
+anota cada fila en el registro de predicciones (``recomendador.registro``)
+para el monitor de deriva.
+
+Uso::
+
+    python -m recomendador.lote respuestas.csv predicciones.parquet --procesos 4
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, Optional
+
+from recomendador.esquema import CAMPOS, limpiar_columnas
+from recomendador.modelo import cargar_modelo, ruta_preferida
+from recomendador.prediccion import Predictor, crear_predictor
+
+TAMANO_BLOQUE = 100_000
+
+_predictores: Dict[Path, Predictor] = {}
+
+
+def _predictor(ruta_modelo: Path) -> Predictor:
+    # Un predictor por proceso; el registro de modelos evita volver a deserializarlo
+    if ruta_modelo not in _predictores:
+        _predictores[ruta_modelo] = crear_predictor(cargar_modelo(ruta_modelo), usar_tabla=False)
+    return _predictores[ruta_modelo]
+
+
+def puntuar_bloque(bloque, ruta_modelo: Path, explicar: bool = False, registrar: bool = False):
+    """Devuelve un DataFrame con ``prediccion``, ``prob_si`` y ``nivel_spf``
+    (más una columna ``aporte_<campo>`` por campo si ``explicar``)."""
+    import pandas as pd
+
+    predictor = _predictor(ruta_modelo)
+    X = predictor.codificador.codificar_lote(bloque)
+    resultado = predictor.predecir_matriz(X)
+    if registrar and predictor.registro is not None:
+        predictor.registro.registrar_lote(bloque, resultado, predictor.version)
+        # Los procesos del pool terminan sin pasar por atexit: el bloque se escribe ya
+        predictor.registro.vaciar()
+    columnas = {
+        "prediccion": resultado.etiquetas,
+        "prob_si": resultado.prob_si,
+        "nivel_spf": resultado.niveles_spf,
+    }
+    if explicar:
+        aportes = predictor.explicar_matriz(X)
+        for j, campo in enumerate(predictor.campos_explicados):
+            columnas[f"aporte_{campo}"] = aportes[:, j]
+    return pd.DataFrame(columnas, index=bloque.index)
+
+
+def leer_bloques(ruta_csv: Path, tamano_bloque: int = TAMANO_BLOQUE) -> Iterator:
+    """Itera el CSV en bloques con solo las columnas del formulario ya limpias."""
+    import pandas as pd
+
+    originales = pd.read_csv(ruta_csv, nrows=0, encoding="utf-8").columns
+    nombres = dict(zip(originales, limpiar_columnas(originales)))
+    usar = [original for original, limpia in nombres.items() if limpia in CAMPOS]
+    faltantes = set(CAMPOS) - {nombres[original] for original in usar}
+    if faltantes:
+        raise ValueError(f"Faltan columnas en {ruta_csv}: {sorted(faltantes)}")
+
+    lector = pd.read_csv(ruta_csv, usecols=usar, chunksize=tamano_bloque, encoding="utf-8")
+    for bloque in lector:
+        yield bloque.rename(columns=nombres)
+
+
+class _Escritor:
+    """Escritura incremental en CSV o Parquet según la extensión de salida."""
+
+    def __init__(self, ruta: Path) -> None:
+        self.ruta = ruta
+        self.parquet = ruta.suffix.lower() in (".parquet", ".pq")
+        self._escritor = None
+        self._primero = True
+
+    def escribir(self, bloque) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.ruta, tabla.schema)
+            self._escritor.write_table(tabla)
+        else:
+            bloque.to_csv(self.ruta, mode="w" if self._primero else "a", header=self._primero, index=False)
+        self._primero = False
+
+    def cerrar(self) -> None:
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def puntuar_csv(
+    entrada: Path,
+    salida: Path,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    procesos: int = 1,
+    ruta_modelo: Optional[Path] = None,
+    explicar: bool = False,
+    registrar: bool = False,
+) -> Dict[str, float]:
+    """Puntúa ``entrada`` completo y devuelve filas procesadas, segundos y filas/s."""
+    ruta_modelo = Path(ruta_modelo or ruta_preferida()).resolve()
+    escritor = _Escritor(Path(salida))
+    inicio = time.perf_counter()
+    filas = 0
+
+    ejecutor: Optional[Executor] = ProcessPoolExecutor(procesos) if procesos > 1 else None
+    try:
+        if ejecutor is None:
+            for bloque in leer_bloques(entrada, tamano_bloque):
+                escritor.escribir(puntuar_bloque(bloque, ruta_modelo, explicar, registrar))
+                filas += len(bloque)
+        else:
+            # Como mucho dos bloques en vuelo por proceso, escritos en orden
+            pendientes: Deque[Future] = deque()
+            for bloque in leer_bloques(entrada, tamano_bloque):
+                pendientes.append(ejecutor.submit(puntuar_bloque, bloque, ruta_modelo, explicar, registrar))
+                if len(pendientes) >= 2 * procesos:
+                    resultado = pendientes.popleft().result()
+                    escritor.escribir(resultado)
+                    filas += len(resultado)
+            while pendientes:
+                resultado = pendientes.popleft().result()
+                escritor.escribir(resultado)
+                filas += len(resultado)
+    finally:
+        escritor.cerrar()
+        if ejecutor is not None:
+            ejecutor.shutdown()
+
+    segundos = time.perf_counter() - inicio
+    return {"filas": filas, "segundos": segundos, "filas_por_segundo": filas / segundos if segundos else 0.0}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Puntúa un CSV de respuestas de la encuesta.")
+    parser.add_argument("entrada", type=Path, help="CSV con el esquema de la encuesta")
+    parser.add_argument("salida", type=Path, help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE, help="Filas por bloque")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (1 = sin pool)")
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo .pkl o .bosque (por defecto el preferido)")
+    parser.add_argument("--explicar", action="store_true", help="Añade el aporte de cada campo a la probabilidad")
+    parser.add_argument("--registrar", action="store_true",
+                        help="Anota cada fila en el registro de predicciones (monitor de deriva)")
+    args = parser.parse_args(argv)
+
+    try:
+        resumen = puntuar_csv(args.entrada, args.salida, args.tamano_bloque, args.procesos, args.modelo,
+                              args.explicar, args.registrar)
+    except ValueError as e:
+        print(f"🚨 ERROR: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"✅ {resumen['filas']:,} filas puntuadas en {resumen['segundos']:.2f} s "
+        f"({resumen['filas_por_segundo']:,.0f} filas/s) → {args.salida}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
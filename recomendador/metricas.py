@@ -0,0 +1,259 @@
+"""Cronómetros por etapa del camino de predicción e histogramas de latencia.
+
+Se activan con ``RECOMENDADOR_METRICAS=1``; desactivados, ``cronometro``
+devuelve un objeto vacío compartido y el costo es una llamada a función.
+
+Las latencias se acumulan en histogramas de cubetas logarítmicas (de 1 µs a
+~16 s) y se exportan en el formato de texto de Prometheus, con p50/p95/p99
+estimados a partir de las cubetas:
+
+- con ``RECOMENDADOR_METRICAS_PUERTO`` definido, en ``http://<host>:<puerto>/metrics``
+  (``<host>`` es ``RECOMENDADOR_METRICAS_HOST``, por defecto solo ``127.0.0.1``);
+- si no, en ``RECOMENDADOR_METRICAS_ARCHIVO`` (por defecto ``.cache/metricas.prom``),
+  reescrito desde un hilo aparte como mucho cada ``INTERVALO_ARCHIVO_S``
+  segundos, y al salir.
+
+El servicio HTTP de ``recomendador.servidor`` también las publica en ``GET /metricas``.
+
+Solo usa la biblioteca estándar: importarlo no retrasa el arranque de la app.
+"""
+
+import atexit
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+VARIABLE_ACTIVAR = "RECOMENDADOR_METRICAS"
+VARIABLE_PUERTO = "RECOMENDADOR_METRICAS_PUERTO"
+VARIABLE_HOST = "RECOMENDADOR_METRICAS_HOST"
+HOST = "127.0.0.1"
+VARIABLE_ARCHIVO = "RECOMENDADOR_METRICAS_ARCHIVO"
+RUTA_ARCHIVO = Path(__file__).resolve().parent.parent / ".cache" / "metricas.prom"
+INTERVALO_ARCHIVO_S = 5.0
+
+# Límites superiores de las cubetas: 1 µs · 2^k
+LIMITES = tuple(1e-6 * 2 ** k for k in range(25))
+CUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger(__name__)
+
+
+class Histograma:
+    """Conteos por cubeta, suma y total; no guarda las muestras."""
+
+    __slots__ = ("cubetas", "suma", "total")
+
+    def __init__(self) -> None:
+        self.cubetas = [0] * (len(LIMITES) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float) -> None:
+        self.cubetas[bisect.bisect_left(LIMITES, segundos)] += 1
+        self.suma += segundos
+        self.total += 1
+
+    def cuantil(self, q: float) -> float:
+        """Interpolación lineal dentro de la cubeta que contiene el cuantil."""
+        if self.total == 0:
+            return float("nan")
+        objetivo = q * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.cubetas):
+            if conteo and acumulado + conteo >= objetivo:
+                inferior = LIMITES[i - 1] if i > 0 else 0.0
+                superior = LIMITES[i] if i < len(LIMITES) else LIMITES[-1]
+                return inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+        return LIMITES[-1]
+
+
+class _Cronometro:
+    __slots__ = ("_metricas", "_etapa", "_inicio")
+
+    def __init__(self, metricas: "Metricas", etapa: str) -> None:
+        self._metricas = metricas
+        self._etapa = etapa
+        self._inicio = time.perf_counter()
+
+    def __enter__(self) -> "_Cronometro":
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.detener()
+
+    def detener(self) -> None:
+        self._metricas.observar(self._etapa, time.perf_counter() - self._inicio)
+
+
+class _CronometroNulo:
+    __slots__ = ()
+
+    def __enter__(self) -> "_CronometroNulo":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def detener(self) -> None:
+        pass
+
+
+_NULO = _CronometroNulo()
+
+
+class Metricas:
+    """Histogramas por etapa, seguros entre hilos."""
+
+    def __init__(self, activas: bool = False, archivo: Optional[Path] = None) -> None:
+        self.activas = activas
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, Histograma] = {}
+        self._proxima_escritura = 0.0
+        self._escritura_pendiente = threading.Event()
+        # El hilo escritor y atexit comparten el archivo temporal
+        self._lock_archivo = threading.Lock()
+        self._pid_escritor: Optional[int] = None
+
+    def cronometro(self, etapa: str):
+        """Mide el bloque ``with`` (o hasta ``detener()``) y lo suma a ``etapa``."""
+        return _Cronometro(self, etapa) if self.activas else _NULO
+
+    def observar(self, etapa: str, segundos: float) -> None:
+        with self._lock:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma()
+            histograma.observar(segundos)
+            if self.archivo is None or time.monotonic() < self._proxima_escritura:
+                return
+            self._proxima_escritura = time.monotonic() + INTERVALO_ARCHIVO_S
+            # Un hilo escritor por proceso (tras un fork el del padre no existe)
+            if self._pid_escritor != os.getpid():
+                self._pid_escritor = os.getpid()
+                threading.Thread(target=self._escribir_siempre, name="metricas-archivo", daemon=True).start()
+        # El archivo nunca se escribe en el hilo de la petición
+        self._escritura_pendiente.set()
+
+    def _escribir_siempre(self) -> None:
+        while True:
+            self._escritura_pendiente.wait()
+            self._escritura_pendiente.clear()
+            self.escribir_archivo()
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """Conteo, media y cuantiles de cada etapa."""
+        with self._lock:
+            return {
+                etapa: {
+                    "total": h.total,
+                    "media_s": h.suma / h.total,
+                    **{f"p{int(q * 100)}_s": h.cuantil(q) for q in CUANTILES},
+                }
+                for etapa, h in self._histogramas.items()
+            }
+
+    def exportar_texto(self) -> str:
+        """Formato de exposición de texto de Prometheus."""
+        lineas: List[str] = [
+            "# HELP recomendador_etapa_segundos Latencia de cada etapa del camino de predicción",
+            "# TYPE recomendador_etapa_segundos histogram",
+        ]
+        cuantiles: List[str] = []
+        with self._lock:
+            for etapa, h in sorted(self._histogramas.items()):
+                acumulado = 0
+                for limite, conteo in zip(LIMITES, h.cubetas):
+                    acumulado += conteo
+                    lineas.append(f'recomendador_etapa_segundos_bucket{{etapa="{etapa}",le="{limite:.6g}"}} {acumulado}')
+                lineas.append(f'recomendador_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {h.total}')
+                lineas.append(f'recomendador_etapa_segundos_sum{{etapa="{etapa}"}} {h.suma:.9g}')
+                lineas.append(f'recomendador_etapa_segundos_count{{etapa="{etapa}"}} {h.total}')
+                for q in CUANTILES:
+                    cuantiles.append(
+                        f'recomendador_etapa_cuantil_segundos{{etapa="{etapa}",cuantil="{q}"}} {h.cuantil(q):.9g}'
+                    )
+        lineas += [
+            "# HELP recomendador_etapa_cuantil_segundos Cuantiles estimados desde las cubetas",
+            "# TYPE recomendador_etapa_cuantil_segundos gauge",
+        ] + cuantiles
+        lineas += _lineas_cache()
+        return "\n".join(lineas) + "\n"
+
+    def escribir_archivo(self) -> None:
+        if self.archivo is None:
+            return
+        try:
+            with self._lock_archivo:
+                self.archivo.parent.mkdir(parents=True, exist_ok=True)
+                ruta_tmp = self.archivo.with_name(self.archivo.name + ".tmp")
+                ruta_tmp.write_text(self.exportar_texto(), encoding="utf-8")
+                ruta_tmp.replace(self.archivo)
+        except OSError:
+            logger.warning("No se pudieron escribir las métricas en %s", self.archivo, exc_info=True)
+
+
+def _lineas_cache() -> List[str]:
+    # Solo si la caché ya está en uso: exportar no debe importar el resto del paquete
+    import sys
+
+    modulo = sys.modules.get("recomendador.cache")
+    if modulo is None:
+        return []
+    estadisticas = modulo.cache_predicciones.estadisticas()
+    lineas = []
+    for nombre, tipo in (("aciertos", "counter"), ("fallos", "counter"), ("desalojos", "counter"),
+                         ("entradas", "gauge"), ("capacidad", "gauge")):
+        sufijo = "_total" if tipo == "counter" else ""
+        lineas.append(f"# TYPE recomendador_cache_{nombre}{sufijo} {tipo}")
+        lineas.append(f"recomendador_cache_{nombre}{sufijo} {estadisticas[nombre]}")
+    return lineas
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path not in ("/metrics", "/metricas"):
+            self.send_error(404)
+            return
+        datos = metricas.exportar_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        pass
+
+
+def _iniciar_exportador(host: str, puerto: int) -> bool:
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    except OSError:
+        logger.warning("No se pudo abrir %s:%d para las métricas; se escribirán en archivo", host, puerto)
+        return False
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return True
+
+
+def _configurar() -> Metricas:
+    if os.environ.get(VARIABLE_ACTIVAR, "") not in ("1", "true", "si", "sí"):
+        return Metricas(activas=False)
+    puerto = os.environ.get(VARIABLE_PUERTO)
+    if puerto and _iniciar_exportador(os.environ.get(VARIABLE_HOST) or HOST, int(puerto)):
+        return Metricas(activas=True)
+    configuradas = Metricas(activas=True, archivo=Path(os.environ.get(VARIABLE_ARCHIVO) or RUTA_ARCHIVO))
+    atexit.register(configuradas.escribir_archivo)
+    return configuradas
+
+
+metricas = _configurar()
+cronometro = metricas.cronometro
@@ -0,0 +1,239 @@
+"""Registro de modelos compartido por todo el proceso.
+
+Streamlit vuelve a ejecutar ``app.py`` en cada interacción; el registro
+garantiza que el Random Forest se deserializa una sola vez por proceso y que
+solo se recarga cuando el archivo del modelo cambia en disco.
+
+Se aceptan dos formatos: el ``.pkl`` de joblib que genera el notebook y el
+artefacto compacto ``.bosque`` (ver ``recomendador.artefacto``), que se mapea
+en memoria sin importar sklearn y se prefiere cuando existe y salió del
+``.pkl`` actual (si el notebook reentrenó el modelo y el artefacto no se
+regeneró, se avisa y se usa el ``.pkl``). La variable de
+entorno ``RECOMENDADOR_MODELO`` fuerza otro archivo, por ejemplo un modelo
+comprimido con ``recomendador.compresion``.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RAIZ_PROYECTO = Path(__file__).resolve().parent.parent
+RUTA_MODELO = RAIZ_PROYECTO / "modelo_protector_solar_mejorado.pkl"
+RUTA_ARTEFACTO = RUTA_MODELO.with_suffix(".bosque")
+RUTA_METADATOS = RUTA_MODELO.with_suffix(".json")
+VARIABLE_MODELO = "RECOMENDADOR_MODELO"
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_archivo(ruta: Path, tamano_bloque: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class ModeloCargado:
+    """Modelo en memoria junto con los datos del archivo del que salió.
+
+    ``sha256`` es el hash del archivo cargado; ``sha256_modelo`` identifica el
+    modelo entrenado (el ``.pkl`` de origen) y coincide para un ``.pkl`` y el
+    artefacto generado a partir de él.
+    """
+
+    modelo: Any
+    ruta: Path
+    mtime_ns: int
+    tamano_archivo: int
+    sha256: str
+    tiempo_carga_s: float
+    memoria_bytes: int
+    sha256_modelo: str
+
+    @property
+    def version(self) -> str:
+        return self.sha256_modelo[:12]
+
+
+def _estimar_memoria(modelo: Any) -> int:
+    if hasattr(modelo, "nbytes"):
+        return modelo.nbytes
+    # Los árboles de sklearn guardan nodos y valores en arreglos NumPy
+    total = 0
+    for estimador in getattr(modelo, "estimators_", []):
+        arbol = getattr(estimador, "tree_", None)
+        if arbol is None:
+            continue
+        estado = arbol.__getstate__()
+        total += estado["nodes"].nbytes + estado["values"].nbytes
+    return total
+
+
+def _es_artefacto(ruta: Path) -> bool:
+    return ruta.suffix == RUTA_ARTEFACTO.suffix
+
+
+class RegistroModelos:
+    """Caché de modelos por ruta, segura entre hilos y sesiones."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entradas: Dict[Path, ModeloCargado] = {}
+
+    def obtener(self, ruta: Path = RUTA_MODELO) -> ModeloCargado:
+        ruta = Path(ruta).resolve()
+        stat = ruta.stat()
+        entrada = self._entradas.get(ruta)
+        if entrada is not None and entrada.mtime_ns == stat.st_mtime_ns and entrada.tamano_archivo == stat.st_size:
+            return entrada
+
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            stat = ruta.stat()
+            if entrada is not None and entrada.mtime_ns == stat.st_mtime_ns and entrada.tamano_archivo == stat.st_size:
+                return entrada
+
+            if _es_artefacto(ruta):
+                datos = None
+                sha256 = sha256_archivo(ruta)
+            else:
+                datos = ruta.read_bytes()
+                sha256 = hashlib.sha256(datos).hexdigest()
+
+            if entrada is not None and entrada.sha256 == sha256:
+                # Solo cambió la fecha del archivo: se conserva el modelo cargado
+                entrada = ModeloCargado(
+                    modelo=entrada.modelo,
+                    ruta=ruta,
+                    mtime_ns=stat.st_mtime_ns,
+                    tamano_archivo=stat.st_size,
+                    sha256=sha256,
+                    tiempo_carga_s=entrada.tiempo_carga_s,
+                    memoria_bytes=entrada.memoria_bytes,
+                    sha256_modelo=entrada.sha256_modelo,
+                )
+            else:
+                inicio = time.perf_counter()
+                if datos is None:
+                    from recomendador.artefacto import cargar_artefacto
+
+                    modelo, encabezado = cargar_artefacto(ruta)
+                    sha256_modelo = encabezado.get("sha256_modelo") or sha256
+                else:
+                    import joblib
+
+                    modelo = joblib.load(io.BytesIO(datos))
+                    sha256_modelo = sha256
+                entrada = ModeloCargado(
+                    modelo=modelo,
+                    ruta=ruta,
+                    mtime_ns=stat.st_mtime_ns,
+                    tamano_archivo=stat.st_size,
+                    sha256=sha256,
+                    tiempo_carga_s=time.perf_counter() - inicio,
+                    memoria_bytes=_estimar_memoria(modelo),
+                    sha256_modelo=sha256_modelo,
+                )
+            self._entradas[ruta] = entrada
+            return entrada
+
+    def descartar(self, ruta: Path = RUTA_MODELO) -> None:
+        with self._lock:
+            self._entradas.pop(Path(ruta).resolve(), None)
+
+
+registro = RegistroModelos()
+
+
+class ColumnasIncompatibles(ValueError):
+    """Las columnas del modelo no coinciden con las registradas al entrenarlo."""
+
+
+def verificar_columnas(modelo_cargado: ModeloCargado, ruta: Path = RUTA_METADATOS) -> Optional[List[str]]:
+    """Compara las columnas del modelo con los metadatos del entrenamiento.
+
+    Devuelve las columnas registradas, o ``None`` si no hay metadatos o son de
+    otro modelo.
+    """
+    try:
+        metadatos = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    if metadatos.get("sha256_modelo") != modelo_cargado.sha256_modelo:
+        return None
+    columnas = list(metadatos["columnas"])
+    actuales = [str(c) for c in modelo_cargado.modelo.feature_names_in_]
+    if actuales != columnas:
+        raise ColumnasIncompatibles(
+            f"El modelo espera {len(actuales)} columnas distintas de las {len(columnas)} registradas al entrenarlo"
+        )
+    return columnas
+
+
+_vigencia: Dict[Tuple[int, ...], bool] = {}
+
+
+def artefacto_vigente(ruta_artefacto: Optional[Path] = None, ruta_modelo: Optional[Path] = None) -> bool:
+    """Si el artefacto existe y se generó a partir del ``.pkl`` actual.
+
+    Sin ``.pkl`` con el que comparar, el artefacto vale. El resultado se
+    recuerda mientras ninguno de los dos archivos cambie de fecha o tamaño,
+    así que el hash del ``.pkl`` se calcula una vez por versión.
+    """
+    ruta_artefacto = Path(ruta_artefacto or RUTA_ARTEFACTO)
+    ruta_modelo = Path(ruta_modelo or RUTA_MODELO)
+    try:
+        estado_artefacto = ruta_artefacto.stat()
+    except FileNotFoundError:
+        return False
+    try:
+        estado_modelo = ruta_modelo.stat()
+    except FileNotFoundError:
+        return True
+    clave = (estado_artefacto.st_ino, estado_artefacto.st_mtime_ns, estado_artefacto.st_size,
+             estado_modelo.st_ino, estado_modelo.st_mtime_ns, estado_modelo.st_size)
+    vigente = _vigencia.get(clave)
+    if vigente is None:
+        from recomendador.artefacto import leer_encabezado
+
+        try:
+            encabezado, _ = leer_encabezado(ruta_artefacto)
+        except (OSError, ValueError):
+            vigente = False
+        else:
+            vigente = encabezado.get("sha256_modelo") == sha256_archivo(ruta_modelo)
+        if not vigente:
+            logger.warning("%s no corresponde a %s (¿se reentrenó el modelo?); se usa el .pkl. "
+                           "Regenérelo con python -m recomendador.artefacto", ruta_artefacto.name, ruta_modelo.name)
+        _vigencia[clave] = vigente
+    return vigente
+
+
+def ruta_preferida() -> Path:
+    """``$RECOMENDADOR_MODELO`` si está definida; si no, el artefacto compacto
+    si existe y corresponde al ``.pkl`` (ver ``artefacto_vigente``) y, en
+    último caso, el ``.pkl`` del notebook.
+
+    Las rutas relativas de la variable se toman desde la raíz del proyecto.
+    """
+    forzada = os.environ.get(VARIABLE_MODELO)
+    if forzada:
+        return RAIZ_PROYECTO / forzada
+    return RUTA_ARTEFACTO if artefacto_vigente() else RUTA_MODELO
+
+
+def cargar_modelo(ruta: Optional[Path] = None) -> ModeloCargado:
+    """Devuelve el modelo del registro global del proceso.
+
+    Sin ``ruta`` se usa ``ruta_preferida()``.
+    """
+    return registro.obtener(ruta_preferida() if ruta is None else ruta)
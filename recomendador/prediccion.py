@@ -0,0 +1,154 @@
+"""Punto único de inferencia: etiqueta, probabilidad y nivel de SPF.
+
+Todo sale de una sola llamada a ``predict_proba``; la app, el puntuador por
+lotes y cualquier API comparten este camino. Con un registro
+(``recomendador.registro``), cada perfil puntuado queda anotado para vigilar
+la deriva.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy as np
+
+from recomendador.bosque import bosque_para, predecir_probabilidades
+from recomendador.cache import CachePredicciones, cache_predicciones
+from recomendador.codificador import CodificadorEntradas, codificador_para
+from recomendador.explicacion import Explicacion, explicador_para
+from recomendador.metricas import cronometro
+from recomendador.modelo import ModeloCargado
+from recomendador.registro import RegistroPredicciones, registro_predicciones
+from recomendador.tabla import TablaPerfiles, cargar_tabla_si_vigente
+
+CLASE_SI = 1
+
+NIVEL_MAXIMO = "MÁXIMO"
+NIVEL_ALTO = "ALTO"
+NIVEL_MODERADO = "MODERADO"
+
+# Umbrales de probabilidad de "Sí" para cada nivel de protección
+UMBRAL_MAXIMO = 0.85
+UMBRAL_ALTO = 0.65
+
+
+def niveles_spf(prob_si: np.ndarray) -> np.ndarray:
+    """Nivel de protección recomendado para cada probabilidad de "Sí"."""
+    prob_si = np.asarray(prob_si)
+    return np.select(
+        [prob_si > UMBRAL_MAXIMO, prob_si > UMBRAL_ALTO],
+        [NIVEL_MAXIMO, NIVEL_ALTO],
+        default=NIVEL_MODERADO,
+    ).astype(object)
+
+
+@dataclass(frozen=True)
+class Prediccion:
+    etiqueta: int
+    prob_si: float
+    nivel_spf: str
+
+    @property
+    def confianza(self) -> float:
+        """Probabilidad de la clase predicha."""
+        return self.prob_si if self.etiqueta == CLASE_SI else 1 - self.prob_si
+
+
+@dataclass(frozen=True)
+class PrediccionLote:
+    etiquetas: np.ndarray
+    prob_si: np.ndarray
+    niveles_spf: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.etiquetas)
+
+    def __getitem__(self, i: int) -> Prediccion:
+        return Prediccion(int(self.etiquetas[i]), float(self.prob_si[i]), self.niveles_spf[i])
+
+
+def _desde_probabilidades(probabilidades: np.ndarray, clases: np.ndarray) -> PrediccionLote:
+    # Misma regla que RandomForestClassifier.predict: clase de mayor probabilidad
+    etiquetas = clases.take(np.argmax(probabilidades, axis=1))
+    prob_si = probabilidades[:, int(np.flatnonzero(clases == CLASE_SI)[0])]
+    return PrediccionLote(etiquetas, prob_si, niveles_spf(prob_si))
+
+
+class Predictor:
+    """Modelo + codificador (+ tabla precalculada opcional) detrás de una sola llamada."""
+
+    def __init__(self, modelo: Any, codificador: CodificadorEntradas,
+                 tabla: Optional[TablaPerfiles] = None, cache: Optional[CachePredicciones] = None,
+                 version: str = "", registro: Optional[RegistroPredicciones] = None) -> None:
+        self.modelo = modelo
+        self.codificador = codificador
+        self.tabla = tabla
+        self.cache = cache
+        self.registro = registro
+        # Versión del modelo en la clave de la caché
+        self.version = version
+        self.clases = np.asarray(modelo.classes_)
+
+    def predecir_matriz(self, X: np.ndarray) -> PrediccionLote:
+        """Predice sobre filas ya codificadas."""
+        return _desde_probabilidades(predecir_probabilidades(self.modelo, X), self.clases)
+
+    def predecir_lote(self, datos: Mapping[str, Sequence[Any]]) -> PrediccionLote:
+        """Predice columnas crudas (dict de secuencias o DataFrame)."""
+        return self.predecir_matriz(self.codificador.codificar_lote(datos))
+
+    def predecir(self, perfil: Mapping[str, Any]) -> Prediccion:
+        """Predice un perfil del formulario; usa la caché y la tabla si están disponibles."""
+        if self.cache is not None:
+            prediccion = self.cache.obtener(perfil, self.version, self._predecir)
+        else:
+            prediccion = self._predecir(perfil)
+        self.registrar(perfil, prediccion)
+        return prediccion
+
+    def registrar(self, perfil: Mapping[str, Any], prediccion: Prediccion) -> None:
+        """Anota un perfil ya puntuado (también los que salen de la caché)."""
+        if self.registro is not None:
+            self.registro.registrar(perfil, prediccion, self.version)
+
+    def _predecir(self, perfil: Mapping[str, Any]) -> Prediccion:
+        if self.tabla is not None:
+            # La tabla solo mira los campos que usa el modelo: el resto se valida
+            # igual que en el camino del codificador
+            self.codificador.validar(perfil)
+            with cronometro("tabla"):
+                proba = self.tabla.predict_proba(perfil)[np.newaxis, :]
+            return _desde_probabilidades(proba, self.tabla.clases)[0]
+        with cronometro("codificacion"):
+            X = self.codificador.codificar(perfil)
+        with cronometro("predict_proba"):
+            proba = predecir_probabilidades(self.modelo, X)
+        return _desde_probabilidades(proba, self.clases)[0]
+
+    def explicar_matriz(self, X: np.ndarray) -> np.ndarray:
+        """Aporte de cada campo a la probabilidad de "Sí" (filas × ``campos_explicados``)."""
+        return explicador_para(self.modelo, CLASE_SI).aportes_matriz(X)
+
+    @property
+    def campos_explicados(self) -> Sequence[str]:
+        return explicador_para(self.modelo, CLASE_SI).campos
+
+    def explicar_lote(self, datos: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        return self.explicar_matriz(self.codificador.codificar_lote(datos))
+
+    def explicar(self, perfil: Mapping[str, Any]) -> Explicacion:
+        """Por qué el modelo da esa probabilidad a un perfil del formulario."""
+        with cronometro("explicacion"):
+            X = self.codificador.codificar(perfil)
+            return explicador_para(self.modelo, CLASE_SI).explicar_matriz(X)[0]
+
+
+def crear_predictor(modelo_cargado: ModeloCargado, usar_tabla: bool = True,
+                    usar_cache: bool = True, usar_registro: bool = True) -> Predictor:
+    """Predictor sobre el bosque compilado, con el codificador compartido y, si procede,
+    su tabla, la caché de perfiles y el registro de predicciones del proceso."""
+    modelo = bosque_para(modelo_cargado)
+    tabla = cargar_tabla_si_vigente(modelo_cargado) if usar_tabla else None
+    cache = cache_predicciones if usar_cache else None
+    registro = registro_predicciones() if usar_registro else None
+    return Predictor(modelo, codificador_para(modelo.feature_names_in_), tabla, cache, modelo_cargado.version,
+                     registro)
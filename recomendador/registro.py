@@ -0,0 +1,229 @@
+"""Registro de predicciones: una línea JSON por perfil puntuado.
+
+``registrar`` solo deja el perfil y el resultado en una cola acotada; un hilo
+aparte los serializa y los escribe en bloques (como mucho cada
+``INTERVALO_S``) con una sola escritura ``O_APPEND``, así que la petición
+nunca espera al disco. Si la cola se llena, el registro se descarta y se
+cuenta en ``descartados``.
+
+El archivo ``predicciones.jsonl`` rota al superar ``MAX_BYTES``
+(``predicciones.jsonl.1`` … ``.COPIAS``). Varios procesos pueden escribir en el
+mismo directorio: cada escritura es atómica y la rotación se hace bajo
+``flock``; quien encuentra el archivo ya rotado lo vuelve a abrir.
+
+Configuración:
+
+- ``RECOMENDADOR_REGISTRO=0`` lo desactiva;
+- ``RECOMENDADOR_REGISTRO_DIR`` cambia el directorio (por defecto ``.cache/predicciones``).
+
+``recomendador.deriva`` lee estos archivos de forma incremental.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
+
+from recomendador.esquema import CAMPOS, normalizar_perfil
+from recomendador.modelo import RAIZ_PROYECTO
+
+VARIABLE_ACTIVAR = "RECOMENDADOR_REGISTRO"
+VARIABLE_DIRECTORIO = "RECOMENDADOR_REGISTRO_DIR"
+DIRECTORIO = RAIZ_PROYECTO / ".cache" / "predicciones"
+NOMBRE = "predicciones.jsonl"
+MAX_BYTES = 16 * 2 ** 20
+COPIAS = 5
+CAPACIDAD_COLA = 10_000
+INTERVALO_S = 0.5
+# Elementos de la cola por escritura: acota la memoria del bloque serializado
+ELEMENTOS_POR_ESCRITURA = 5_000
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()
+
+
+def _a_json(valor: Any) -> Any:
+    # Escalares de NumPy (Edad del puntuador por lotes, prob_si de un lote)
+    if hasattr(valor, "item"):
+        return valor.item()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+class RegistroPredicciones:
+    """Cola acotada + hilo escritor sobre un archivo JSONL rotativo."""
+
+    def __init__(self, directorio: Path = DIRECTORIO, max_bytes: int = MAX_BYTES, copias: int = COPIAS,
+                 capacidad: int = CAPACIDAD_COLA, intervalo_s: float = INTERVALO_S) -> None:
+        self.directorio = Path(directorio)
+        self.ruta = self.directorio / NOMBRE
+        self.max_bytes = max_bytes
+        self.copias = copias
+        self.intervalo_s = intervalo_s
+        self.escritos = 0
+        self.descartados = 0
+        self._cola: "queue.Queue[Any]" = queue.Queue(capacidad)
+        self._fd: Optional[int] = None
+        self._inodo: Optional[int] = None
+        self._hilo = threading.Thread(target=self._escribir_siempre, name="registro-predicciones", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def registrar(self, perfil: Mapping[str, Any], prediccion: Any, version: str) -> None:
+        """Encola un perfil y su ``Prediccion``; nunca bloquea."""
+        self._encolar((False, time.time(), perfil, prediccion, version))
+
+    def registrar_lote(self, datos: Mapping[str, Any], lote: Any, version: str) -> None:
+        """Encola columnas crudas (dict o DataFrame) y su ``PrediccionLote`` como un solo elemento."""
+        self._encolar((True, time.time(), datos, lote, version))
+
+    def _encolar(self, elemento: Tuple[Any, ...]) -> None:
+        try:
+            self._cola.put_nowait(elemento)
+        except queue.Full:
+            self.descartados += 1
+
+    def vaciar(self) -> None:
+        """Espera a que todo lo encolado hasta ahora esté escrito."""
+        self._cola.join()
+
+    def cerrar(self, timeout: float = 5.0) -> None:
+        if not self._hilo.is_alive():
+            return
+        try:
+            self._cola.put(_FIN, timeout=timeout)
+        except queue.Full:
+            return
+        self._hilo.join(timeout)
+
+    def _escribir_siempre(self) -> None:
+        while True:
+            pendientes = [self._cola.get()]
+            limite = time.monotonic() + self.intervalo_s
+            while pendientes[-1] is not _FIN and len(pendientes) < ELEMENTOS_POR_ESCRITURA:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            fin = pendientes[-1] is _FIN
+            lineas = [linea for elemento in pendientes if elemento is not _FIN for linea in _lineas(elemento)]
+            try:
+                if lineas:
+                    self._escribir("".join(lineas).encode("utf-8"))
+                    self.escritos += len(lineas)
+            except OSError:
+                self.descartados += len(lineas)
+                logger.warning("No se pudo escribir el registro de predicciones en %s", self.ruta, exc_info=True)
+            finally:
+                for _ in pendientes:
+                    self._cola.task_done()
+            if fin:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                return
+
+    def _abrir(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._inodo = os.fstat(self._fd).st_ino
+
+    def _escribir(self, datos: bytes) -> None:
+        # Otro proceso pudo haber rotado el archivo desde la última escritura
+        try:
+            rotado = os.stat(self.ruta).st_ino != self._inodo
+        except FileNotFoundError:
+            rotado = True
+        if self._fd is None or rotado:
+            self._abrir()
+        tamano = os.fstat(self._fd).st_size
+        if tamano and tamano + len(datos) > self.max_bytes:
+            self._rotar(len(datos))
+        os.write(self._fd, datos)
+
+    def _rotar(self, nuevos: int) -> None:
+        with open(self.directorio / (NOMBRE + ".lock"), "w") as candado:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+            # Puede que otro proceso ya lo haya rotado mientras se esperaba el candado
+            tamano = os.stat(self.ruta).st_size
+            if tamano and tamano + nuevos > self.max_bytes:
+                for i in range(self.copias - 1, 0, -1):
+                    anterior = self.ruta.with_name(f"{NOMBRE}.{i}")
+                    if anterior.exists():
+                        anterior.replace(self.ruta.with_name(f"{NOMBRE}.{i + 1}"))
+                self.ruta.replace(self.ruta.with_name(f"{NOMBRE}.1"))
+            self._abrir()
+
+
+@lru_cache(maxsize=4096)
+def _json(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False, default=_a_json)
+
+
+@lru_cache(maxsize=4096)
+def _perfil_json(valores: Tuple[Any, ...]) -> str:
+    # Los perfiles se repiten mucho (ver recomendador.cache): se serializan una vez
+    return json.dumps(dict(zip(CAMPOS, valores)), ensure_ascii=False, default=_a_json)
+
+
+def _linea(instante: float, perfil: str, etiqueta: Any, prob_si: Any, nivel_spf: Any, version: str) -> str:
+    return (
+        f'{{"t": {instante:.3f}, "version": {_json(version)}, "perfil": {perfil}, '
+        f'"etiqueta": {int(etiqueta)}, "prob_si": {float(prob_si)!r}, "nivel_spf": {_json(nivel_spf)}}}\n'
+    )
+
+
+def _lineas(elemento: Tuple[Any, ...]) -> Iterator[str]:
+    es_lote, instante, datos, resultado, version = elemento
+    if not es_lote:
+        try:
+            perfil = _perfil_json(tuple(normalizar_perfil(datos).values()))
+        except (ValueError, TypeError):
+            perfil = json.dumps(dict(datos), ensure_ascii=False, default=_a_json)
+        yield _linea(instante, perfil, resultado.etiqueta, resultado.prob_si, resultado.nivel_spf, version)
+        return
+    columnas: List[Any] = [datos[campo] for campo in CAMPOS]
+    for i, valores in enumerate(zip(*columnas)):
+        yield _linea(instante, _perfil_json(valores), resultado.etiquetas[i], resultado.prob_si[i],
+                     resultado.niveles_spf[i], version)
+
+
+def archivos_registro(directorio: Path = DIRECTORIO) -> List[Path]:
+    """Archivos del registro que existen, del más antiguo al más reciente."""
+    directorio = Path(directorio)
+    rotados = sorted(directorio.glob(NOMBRE + ".*[0-9]"), key=lambda ruta: -int(ruta.suffix[1:]))
+    actual = directorio / NOMBRE
+    return rotados + ([actual] if actual.exists() else [])
+
+
+_registro: Optional[RegistroPredicciones] = None
+_pid_registro: Optional[int] = None
+_lock_registro = threading.Lock()
+
+
+def registro_predicciones() -> Optional[RegistroPredicciones]:
+    """Registro del proceso (``None`` si está desactivado).
+
+    Se crea al primer uso y otra vez tras un ``fork``: el hilo escritor del
+    padre no existe en el hijo.
+    """
+    global _registro, _pid_registro
+    if os.environ.get(VARIABLE_ACTIVAR, "1") in ("0", "false", "no"):
+        return None
+    with _lock_registro:
+        if _registro is None or _pid_registro != os.getpid():
+            _registro = RegistroPredicciones(Path(os.environ.get(VARIABLE_DIRECTORIO) or DIRECTORIO))
+            _pid_registro = os.getpid()
+        return _registro
@@ -0,0 +1,331 @@
+"""Servicio HTTP JSON de predicción con micro-lotes.
+
+Las peticiones que llegan con pocos milisegundos de diferencia se agrupan en
+una sola llamada vectorizada a ``predict_proba``, de modo que el throughput
+crece con la carga en lugar de recorrer el bosque completo por petición.
+
+Uso::
+
+    python -m recomendador.servidor --puerto 8000 [--procesos 4]
+
+Con ``--procesos N`` el proceso padre mapea el artefacto ``.bosque`` una sola
+vez (un ``.pkl`` se convierte antes en ``/dev/shm``) y luego crea N procesos
+hijos con ``fork`` que atienden el mismo socket. Los hijos heredan el mapeo de
+solo lectura: los arreglos del bosque ocupan las mismas páginas físicas en
+todos ellos y nunca se copian.
+
+Endpoints:
+
+- ``POST /predecir``: perfil con Edad, Género, Tipo_de_piel, Color_de_piel,
+  quemarse, horas_sol y aire_libre (se aceptan también los nombres largos).
+- ``GET /salud``: el proceso responde.
+- ``GET /listo``: el modelo está cargado (503 mientras no lo esté).
+- ``GET /metricas``: latencias por etapa y caché, en texto de Prometheus
+  (ver ``recomendador.metricas``).
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from recomendador.esquema import normalizar_perfil
+from recomendador.metricas import cronometro, metricas
+from recomendador.modelo import ModeloCargado, cargar_modelo, ruta_preferida
+from recomendador.prediccion import CLASE_SI, Prediccion, Predictor, crear_predictor
+
+VENTANA_MS = 2.0
+LOTE_MAXIMO = 256
+# Espera máxima de una petición por su lote antes de responder 503
+TIEMPO_MAXIMO_S = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+class MicroLotes:
+    """Agrupa perfiles concurrentes en lotes para un solo ``predict_proba``."""
+
+    def __init__(self, predictor: Predictor, ventana_ms: float = VENTANA_MS,
+                 lote_maximo: int = LOTE_MAXIMO) -> None:
+        self.predictor = predictor
+        self.ventana_s = ventana_ms / 1000
+        self.lote_maximo = lote_maximo
+        self._cola: "queue.Queue[Tuple[Mapping[str, Any], Future]]" = queue.Queue()
+        self._matriz = np.zeros((lote_maximo, predictor.codificador.n_columnas))
+        self._hilo = threading.Thread(target=self._procesar, name="micro-lotes", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, perfil: Mapping[str, Any]) -> "Future[Prediccion]":
+        futuro: "Future[Prediccion]" = Future()
+        self._cola.put((perfil, futuro))
+        return futuro
+
+    def predecir(self, perfil: Mapping[str, Any], timeout: Optional[float] = None) -> Prediccion:
+        """Predicción de ``perfil``; los perfiles repetidos salen de la caché sin encolarse."""
+        cache = self.predictor.cache
+        if cache is not None:
+            prediccion = cache.obtener(perfil, self.predictor.version, lambda p: self.enviar(p).result(timeout))
+        else:
+            prediccion = self.enviar(perfil).result(timeout)
+        self.predictor.registrar(perfil, prediccion)
+        return prediccion
+
+    def _recoger(self) -> List[Tuple[Mapping[str, Any], Future]]:
+        pendientes = [self._cola.get()]
+        limite = time.perf_counter() + self.ventana_s
+        while len(pendientes) < self.lote_maximo:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                pendientes.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return pendientes
+
+    def _procesar(self) -> None:
+        while True:
+            pendientes = self._recoger()
+            # Cada perfil se codifica en su fila; los inválidos fallan por separado
+            validos = []
+            for perfil, futuro in pendientes:
+                try:
+                    self.predictor.codificador.codificar(perfil, salida=self._matriz[len(validos)])
+                except (KeyError, ValueError) as e:
+                    futuro.set_exception(ValueError(str(e)))
+                    continue
+                except Exception as e:
+                    # Nunca debe terminar el hilo: el resto del lote sigue
+                    futuro.set_exception(e)
+                    continue
+                validos.append(futuro)
+            if not validos:
+                continue
+            try:
+                with cronometro("lote_servidor"):
+                    resultado = self.predictor.predecir_matriz(self._matriz[:len(validos)])
+            except Exception as e:
+                for futuro in validos:
+                    futuro.set_exception(e)
+                continue
+            for i, futuro in enumerate(validos):
+                futuro.set_result(resultado[i])
+
+
+class EstadoServicio:
+    """Modelo y micro-lotes del servicio; se llenan al terminar la carga."""
+
+    def __init__(self) -> None:
+        self.modelo_cargado: Optional[ModeloCargado] = None
+        self.lotes: Optional[MicroLotes] = None
+        self.error: Optional[str] = None
+
+    def cargar(self, ruta_modelo: Optional[Path], ventana_ms: float, lote_maximo: int) -> None:
+        try:
+            modelo_cargado = cargar_modelo(ruta_modelo)
+            predictor = crear_predictor(modelo_cargado, usar_tabla=False)
+            self.lotes = MicroLotes(predictor, ventana_ms, lote_maximo)
+            self.modelo_cargado = modelo_cargado
+        except Exception as e:
+            logger.exception("No se pudo cargar el modelo")
+            self.error = str(e)
+
+    def listo(self) -> Dict[str, Any]:
+        if self.modelo_cargado is None:
+            return {"listo": False, "error": self.error}
+        return {
+            "listo": True,
+            "version_modelo": self.modelo_cargado.version,
+            "tiempo_carga_s": round(self.modelo_cargado.tiempo_carga_s, 4),
+            "memoria_bytes": self.modelo_cargado.memoria_bytes,
+            "cache": self.lotes.predictor.cache.estadisticas() if self.lotes.predictor.cache is not None else None,
+        }
+
+
+def _respuesta(prediccion: Prediccion) -> Dict[str, Any]:
+    return {
+        "prediccion": "Sí" if prediccion.etiqueta == CLASE_SI else "No",
+        "etiqueta": prediccion.etiqueta,
+        "prob_si": prediccion.prob_si,
+        "confianza": prediccion.confianza,
+        "nivel_spf": prediccion.nivel_spf,
+    }
+
+
+class ManejadorPrediccion(BaseHTTPRequestHandler):
+    estado: EstadoServicio
+    protocol_version = "HTTP/1.1"
+
+    def _json(self, estado_http: HTTPStatus, cuerpo: Dict[str, Any]) -> None:
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado_http)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self) -> None:
+        if self.path == "/salud":
+            self._json(HTTPStatus.OK, {"estado": "ok"})
+        elif self.path == "/listo":
+            listo = self.estado.listo()
+            self._json(HTTPStatus.OK if listo["listo"] else HTTPStatus.SERVICE_UNAVAILABLE, listo)
+        elif self.path == "/metricas":
+            datos = metricas.exportar_texto().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+        else:
+            self._json(HTTPStatus.NOT_FOUND, {"error": "Ruta no encontrada"})
+
+    def do_POST(self) -> None:
+        if self.path != "/predecir":
+            self._json(HTTPStatus.NOT_FOUND, {"error": "Ruta no encontrada"})
+            return
+        if self.estado.lotes is None:
+            self._json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Modelo no cargado"})
+            return
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            datos = json.loads(self.rfile.read(longitud) or b"{}")
+            if not isinstance(datos, dict):
+                raise ValueError("Se esperaba un objeto JSON")
+            with cronometro("peticion"):
+                prediccion = self.estado.lotes.predecir(normalizar_perfil(datos), TIEMPO_MAXIMO_S)
+        except ValueError as e:
+            self._json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except TiempoAgotado:
+            self._json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Tiempo de espera agotado"})
+            return
+        self._json(HTTPStatus.OK, _respuesta(prediccion))
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        logger.debug("%s - " + formato, self.address_string(), *args)
+
+
+class ServidorPrediccion(ThreadingHTTPServer):
+    daemon_threads = True
+    # Cola de conexiones amplia para ráfagas de clientes concurrentes
+    request_queue_size = 128
+
+
+def crear_servidor(host: str = "127.0.0.1", puerto: int = 8000, ruta_modelo: Optional[Path] = None,
+                   ventana_ms: float = VENTANA_MS, lote_maximo: int = LOTE_MAXIMO,
+                   escucha: Optional[socket.socket] = None) -> ServidorPrediccion:
+    """Servidor listo para ``serve_forever``; el modelo se carga en segundo plano.
+
+    ``escucha`` es un socket ya enlazado y compartido con otros procesos.
+    """
+    estado = EstadoServicio()
+    manejador = type("Manejador", (ManejadorPrediccion,), {"estado": estado})
+    if escucha is None:
+        servidor = ServidorPrediccion((host, puerto), manejador)
+    else:
+        servidor = ServidorPrediccion(escucha.getsockname()[:2], manejador, bind_and_activate=False)
+        servidor.socket.close()
+        servidor.socket = escucha
+    threading.Thread(
+        target=estado.cargar, args=(ruta_modelo, ventana_ms, lote_maximo), name="carga-modelo", daemon=True
+    ).start()
+    return servidor
+
+
+def _servir(servidor: ServidorPrediccion) -> None:
+    """``serve_forever`` hasta SIGTERM o Ctrl+C; después vacía el registro de predicciones."""
+    # shutdown() espera a que serve_forever termine: no puede llamarse desde su mismo hilo
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=servidor.shutdown, daemon=True).start())
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        # Los hijos de multiprocessing salen con os._exit: atexit no vaciaría la cola
+        lotes = servidor.RequestHandlerClass.estado.lotes
+        if lotes is not None and lotes.predictor.registro is not None:
+            lotes.predictor.registro.cerrar()
+
+
+def _trabajador(escucha: socket.socket, ruta_modelo: Path, ventana_ms: float, lote_maximo: int) -> None:
+    # El registro de modelos heredado del padre ya tiene el artefacto mapeado
+    servidor = crear_servidor(ruta_modelo=ruta_modelo, ventana_ms=ventana_ms, lote_maximo=lote_maximo,
+                              escucha=escucha)
+    _servir(servidor)
+
+
+def servir_procesos(host: str, puerto: int, procesos: int, ruta_modelo: Optional[Path] = None,
+                    ventana_ms: float = VENTANA_MS, lote_maximo: int = LOTE_MAXIMO) -> None:
+    """Un socket y ``procesos`` hijos que comparten el bosque mapeado en memoria."""
+    from recomendador.artefacto import artefacto_compartido
+
+    ruta = artefacto_compartido(ruta_modelo or ruta_preferida())
+    # Se verifica la suma y se mapea antes del fork, una sola vez
+    cargar_modelo(ruta)
+    escucha = socket.create_server((host, puerto), backlog=ServidorPrediccion.request_queue_size)
+
+    contexto = multiprocessing.get_context("fork")
+    hijos = [
+        contexto.Process(target=_trabajador, args=(escucha, ruta, ventana_ms, lote_maximo),
+                         name=f"trabajador-{i}", daemon=True)
+        for i in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    logger.info("Escuchando en http://%s:%d con %d procesos (modelo %s)", host, puerto, procesos, ruta)
+
+    def reenviar(*_: Any) -> None:
+        # Cada hijo cierra su servidor y escribe su registro antes de salir
+        for hijo in hijos:
+            if hijo.is_alive():
+                os.kill(hijo.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, reenviar)
+    try:
+        for hijo in hijos:
+            hijo.join()
+    except KeyboardInterrupt:
+        # Ctrl+C llega a todo el grupo de procesos: los hijos ya se están cerrando
+        for hijo in hijos:
+            hijo.join()
+    finally:
+        escucha.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Servicio HTTP de predicción de protector solar.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo .pkl o .bosque (por defecto el preferido)")
+    parser.add_argument("--ventana-ms", type=float, default=VENTANA_MS, help="Espera máxima para agrupar peticiones")
+    parser.add_argument("--lote-maximo", type=int, default=LOTE_MAXIMO, help="Perfiles máximos por lote")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help="Procesos hijos que comparten el modelo mapeado (1 = un solo proceso)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.procesos > 1:
+        servir_procesos(args.host, args.puerto, args.procesos, args.modelo, args.ventana_ms, args.lote_maximo)
+        return
+    servidor = crear_servidor(args.host, args.puerto, args.modelo, args.ventana_ms, args.lote_maximo)
+    logger.info("Escuchando en http://%s:%d", args.host, args.puerto)
+    _servir(servidor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Tabla precalculada de probabilidades para todo el espacio de perfiles.
+
+Todas las entradas de la app son discretas, así que ``predict_proba`` se
+evalúa una sola vez sobre la rejilla completa y la app responde cada consulta
+con una búsqueda en un arreglo mapeado en memoria.
+
+Construcción::
+
+    python -m recomendador.tabla
+"""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recomendador.bosque import predecir_probabilidades
+from recomendador.codificador import CodificadorEntradas
+from recomendador.esquema import CAMPOS, DOMINIOS
+from recomendador.modelo import RAIZ_PROYECTO, ModeloCargado, cargar_modelo
+
+RUTA_TABLA = RAIZ_PROYECTO / "tabla_perfiles.npy"
+FORMATO = 1
+
+logger = logging.getLogger(__name__)
+
+_tablas: Dict[Tuple[Path, str], Optional["TablaPerfiles"]] = {}
+
+
+class TablaDesactualizada(ValueError):
+    """La tabla en disco no corresponde al modelo cargado."""
+
+
+def _columna_dummy(campo: str, valor: Any) -> str:
+    # Nombre que produce pd.get_dummies: los numéricos conservan el nombre del campo
+    if isinstance(valor, str):
+        return f"{campo}_{valor}"
+    return campo
+
+
+def campos_relevantes(columnas_modelo: Sequence[str]) -> Tuple[str, ...]:
+    """Campos con al menos un valor que activa una columna del modelo."""
+    columnas = set(columnas_modelo)
+    return tuple(
+        campo for campo in CAMPOS
+        if any(_columna_dummy(campo, valor) in columnas for valor in DOMINIOS[campo])
+    )
+
+
+def _ruta_metadatos(ruta: Path) -> Path:
+    return ruta.with_suffix(".json")
+
+
+class TablaPerfiles:
+    """Probabilidades indexadas por el código de opción de cada campo relevante."""
+
+    def __init__(self, probabilidades: np.ndarray, metadatos: Dict[str, Any]) -> None:
+        self.probabilidades = probabilidades
+        self.campos: Tuple[str, ...] = tuple(metadatos["campos"])
+        self.clases = np.asarray(metadatos["clases"])
+        self.sha256_modelo: str = metadatos["sha256_modelo"]
+        self._codigos = {
+            campo: {valor: i for i, valor in enumerate(metadatos["dominios"][campo])}
+            for campo in self.campos
+        }
+
+    def indice(self, perfil: Mapping[str, Any]) -> Tuple[int, ...]:
+        try:
+            return tuple(self._codigos[campo][perfil[campo]] for campo in self.campos)
+        except KeyError as e:
+            raise ValueError(f"Valor fuera del dominio de la tabla: {e}") from None
+
+    def predict_proba(self, perfil: Mapping[str, Any]) -> np.ndarray:
+        return self.probabilidades[self.indice(perfil)]
+
+
+def construir_tabla(
+    modelo_cargado: ModeloCargado,
+    ruta: Path = RUTA_TABLA,
+    tamano_lote: int = 65536,
+) -> TablaPerfiles:
+    """Evalúa el modelo sobre la rejilla completa y guarda la tabla en ``ruta``."""
+    modelo = modelo_cargado.modelo
+    columnas = list(modelo.feature_names_in_)
+    campos = campos_relevantes(columnas)
+    forma = tuple(len(DOMINIOS[campo]) for campo in campos)
+    total = int(np.prod(forma, dtype=np.int64))
+
+    ruta = Path(ruta)
+    ruta_tmp = ruta.with_name(ruta.name + ".tmp")
+    probabilidades = np.lib.format.open_memmap(
+        ruta_tmp, mode="w+", dtype=np.float64, shape=forma + (len(modelo.classes_),)
+    )
+    planas = probabilidades.reshape(total, -1)
+    dominios = {campo: np.asarray(DOMINIOS[campo], dtype=object) for campo in campos}
+    codificador = CodificadorEntradas(columnas, campos=campos)
+
+    for inicio in range(0, total, tamano_lote):
+        fin = min(inicio + tamano_lote, total)
+        codigos = np.unravel_index(np.arange(inicio, fin), forma)
+        lote = {campo: dominios[campo][cod] for campo, cod in zip(campos, codigos)}
+        planas[inicio:fin] = predecir_probabilidades(modelo, codificador.codificar_lote(lote))
+
+    probabilidades.flush()
+    del planas, probabilidades
+    ruta_tmp.replace(ruta)
+
+    metadatos = {
+        "formato": FORMATO,
+        "sha256_modelo": modelo_cargado.sha256_modelo,
+        "campos": list(campos),
+        "dominios": {campo: list(DOMINIOS[campo]) for campo in campos},
+        "clases": modelo.classes_.tolist(),
+    }
+    _ruta_metadatos(ruta).write_text(json.dumps(metadatos, ensure_ascii=False, indent=2), encoding="utf-8")
+    return TablaPerfiles(np.load(ruta, mmap_mode="r"), metadatos)
+
+
+def cargar_tabla(modelo_cargado: ModeloCargado, ruta: Path = RUTA_TABLA) -> TablaPerfiles:
+    """Abre la tabla mapeada en memoria y verifica que sea del modelo cargado."""
+    ruta = Path(ruta)
+    metadatos = json.loads(_ruta_metadatos(ruta).read_text(encoding="utf-8"))
+    if metadatos.get("formato") != FORMATO:
+        raise TablaDesactualizada(f"Formato de tabla no soportado: {metadatos.get('formato')}")
+    if metadatos["sha256_modelo"] != modelo_cargado.sha256_modelo:
+        raise TablaDesactualizada(
+            f"La tabla {ruta.name} se generó para el modelo {metadatos['sha256_modelo'][:12]}, "
+            f"pero el modelo cargado es {modelo_cargado.version}"
+        )
+    return TablaPerfiles(np.load(ruta, mmap_mode="r"), metadatos)
+
+
+def cargar_tabla_si_vigente(modelo_cargado: ModeloCargado, ruta: Path = RUTA_TABLA) -> Optional[TablaPerfiles]:
+    """Como ``cargar_tabla``, pero devuelve ``None`` si falta o está desactualizada.
+
+    El resultado se recuerda por proceso para cada versión del modelo.
+    """
+    clave = (Path(ruta).resolve(), modelo_cargado.sha256_modelo)
+    if clave in _tablas:
+        return _tablas[clave]
+    try:
+        tabla = cargar_tabla(modelo_cargado, ruta)
+    except FileNotFoundError:
+        tabla = None
+    except TablaDesactualizada as e:
+        logger.warning("%s; se usará el modelo directamente. Reconstruye con `python -m recomendador.tabla`.", e)
+        tabla = None
+    _tablas[clave] = tabla
+    return tabla
+
+
+if __name__ == "__main__":
+    modelo_cargado = cargar_modelo()
+    inicio = time.perf_counter()
+    tabla = construir_tabla(modelo_cargado)
+    print(
+        f"✅ Tabla {RUTA_TABLA.name} generada: {tabla.probabilidades.shape[:-1]} perfiles "
+        f"({', '.join(tabla.campos)}) en {time.perf_counter() - inicio:.2f} s"
+    )
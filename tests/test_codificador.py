@@ -0,0 +1,72 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recomendador.codificador import CodificadorEntradas
+from recomendador.entrenamiento import RUTA_DATOS
+from recomendador.esquema import CAMPOS, COLOR_PIEL, DOMINIOS, HORAS_SOL, limpiar_columnas
+from recomendador.modelo import cargar_modelo
+
+
+@pytest.fixture(scope="module")
+def columnas():
+    return [str(c) for c in cargar_modelo().modelo.feature_names_in_]
+
+
+def _con_get_dummies(df, columnas):
+    # Lo que hacía app.py antes del codificador
+    return pd.get_dummies(df).reindex(columns=columnas, fill_value=0).to_numpy(dtype=np.float64)
+
+
+def _rejilla():
+    return pd.DataFrame(list(itertools.product(*(DOMINIOS[campo] for campo in CAMPOS))), columns=list(CAMPOS))
+
+
+def _encuesta():
+    df = pd.read_csv(RUTA_DATOS, encoding="utf-8")
+    df.columns = limpiar_columnas(df.columns)
+    return df[list(CAMPOS)].astype(object)
+
+
+@pytest.mark.parametrize("datos", [_rejilla, _encuesta], ids=["rejilla_dominios", "encuesta"])
+def test_igual_que_get_dummies(columnas, datos):
+    df = datos()
+    codificador = CodificadorEntradas(columnas)
+    esperado = _con_get_dummies(df, columnas)
+
+    assert np.array_equal(codificador.codificar_lote(df), esperado)
+    # Fila a fila (la ruta de la app), sobre una muestra para no tardar
+    muestra = range(0, len(df), max(1, len(df) // 500))
+    filas = np.vstack([codificador.codificar(df.iloc[i].to_dict()) for i in muestra])
+    assert np.array_equal(filas, esperado[list(muestra)])
+
+
+def test_valores_de_la_app_sin_columna_quedan_en_cero(columnas):
+    codificador = CodificadorEntradas(columnas)
+    perfil = {campo: DOMINIOS[campo][0] for campo in CAMPOS}
+    perfil[COLOR_PIEL] = "Oscura"
+    perfil[HORAS_SOL] = "Más de 3 horas"
+    assert f"{COLOR_PIEL}_Oscura" not in columnas
+
+    fila = codificador.codificar(perfil).reshape(-1)
+    for campo in (COLOR_PIEL, HORAS_SOL):
+        assert not fila[[i for i, c in enumerate(columnas) if c.startswith(campo + "_")]].any()
+
+
+def test_valor_desconocido_da_value_error(columnas):
+    codificador = CodificadorEntradas(columnas)
+    perfil = {campo: DOMINIOS[campo][0] for campo in CAMPOS}
+    perfil[COLOR_PIEL] = "Azul"
+    with pytest.raises(ValueError, match=COLOR_PIEL):
+        codificador.codificar(perfil)
+    with pytest.raises(ValueError, match=COLOR_PIEL):
+        codificador.codificar_lote({campo: [valor] for campo, valor in perfil.items()})
+
+
+def test_no_silencia_avisos_de_sklearn_en_todo_el_proceso():
+    import warnings
+
+    # Importar el codificador no debe ocultar avisos a otros estimadores (p. ej. en el notebook)
+    assert not any("feature names" in str(filtro[1]) for filtro in warnings.filters)
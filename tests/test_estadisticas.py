@@ -0,0 +1,70 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from recomendador import estadisticas
+from recomendador.entrenamiento import RUTA_DATOS
+from recomendador.estadisticas import FACTORES, RESULTADOS, calcular_agregados
+
+PARES = list(itertools.product(FACTORES, RESULTADOS))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(estadisticas, "DIRECTORIO_CACHE", tmp_path / "cache")
+
+
+def _iguales(a, b):
+    assert a.filas == b.filas
+    for par in PARES:
+        pd.testing.assert_frame_equal(a.tabla(*par), b.tabla(*par))
+
+
+@pytest.fixture(scope="module")
+def completos():
+    return calcular_agregados(RUTA_DATOS, usar_cache=False)[0]
+
+
+def test_varios_bloques_igual_que_uno(completos):
+    # Con bloques de 10 filas aparecen niveles que solo existen en algunos bloques
+    _iguales(calcular_agregados(RUTA_DATOS, usar_cache=False, tamano_bloque=10)[0], completos)
+
+
+def test_incremental_igual_que_recuento(tmp_path, cache, completos):
+    respuestas = pd.read_csv(RUTA_DATOS, encoding="utf-8")
+    ruta = tmp_path / "respuestas.csv"
+    respuestas.iloc[:27].to_csv(ruta, index=False)
+    assert calcular_agregados(ruta, tamano_bloque=10)[1] == "completo"
+
+    respuestas.iloc[27:].to_csv(ruta, index=False, header=False, mode="a")
+    agregados, origen = calcular_agregados(ruta, tamano_bloque=10)
+    assert origen == "incremental"
+    _iguales(agregados, completos)
+    assert calcular_agregados(ruta)[1] == "cache"
+
+
+def test_fila_a_medio_escribir_no_se_guarda(tmp_path, cache, completos):
+    respuestas = pd.read_csv(RUTA_DATOS, encoding="utf-8")
+    ruta = tmp_path / "respuestas.csv"
+    respuestas.iloc[:27].to_csv(ruta, index=False)
+    resto = respuestas.iloc[27:].to_csv(index=False, header=False).encode("utf-8")
+    mitad = resto.index(b"\n") // 2
+
+    with open(ruta, "ab") as archivo:
+        archivo.write(resto[:mitad])
+    agregados, _ = calcular_agregados(ruta, tamano_bloque=10)
+    assert agregados.filas == 27
+
+    with open(ruta, "ab") as archivo:
+        archivo.write(resto[mitad:])
+    agregados, origen = calcular_agregados(ruta, tamano_bloque=10)
+    assert origen == "incremental"
+    _iguales(agregados, completos)
+
+
+def test_ultima_fila_sin_salto_de_linea_se_cuenta_sin_guardarse(completos):
+    # El CSV de la encuesta termina sin salto de línea
+    assert not RUTA_DATOS.read_bytes().endswith(b"\n")
+    assert completos.filas == 44
+    assert completos.bytes_contados < RUTA_DATOS.stat().st_size
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from recomendador import metricas as modulo
+from recomendador.metricas import Metricas
+
+
+def test_el_archivo_se_escribe_fuera_del_hilo_que_observa(tmp_path, monkeypatch):
+    hilos = []
+    escribir = Metricas.escribir_archivo
+    monkeypatch.setattr(Metricas, "escribir_archivo",
+                        lambda self: (hilos.append(threading.current_thread()), escribir(self)))
+    registro = Metricas(activas=True, archivo=tmp_path / "metricas.prom")
+
+    registro.observar("peticion", 0.001)
+    limite = time.monotonic() + 5
+    while not registro.archivo.exists() and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert "recomendador_etapa_segundos_count{etapa=\"peticion\"} 1" in registro.archivo.read_text(encoding="utf-8")
+    assert hilos and threading.current_thread() not in hilos
+
+
+def test_escrituras_limitadas_con_observaciones_concurrentes(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo, "INTERVALO_ARCHIVO_S", 60.0)
+    escrituras = []
+    monkeypatch.setattr(Metricas, "escribir_archivo", lambda self: escrituras.append(1))
+    registro = Metricas(activas=True, archivo=tmp_path / "metricas.prom")
+
+    hilos = [threading.Thread(target=lambda: [registro.observar("peticion", 0.001) for _ in range(200)])
+             for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    time.sleep(0.1)
+    assert len(escrituras) == 1
+    assert registro.resumen()["peticion"]["total"] == 1600
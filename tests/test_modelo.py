@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+
+from recomendador import modelo
+from recomendador.modelo import RUTA_ARTEFACTO, RUTA_MODELO, artefacto_vigente, ruta_preferida
+
+
+@pytest.fixture
+def copias(tmp_path, monkeypatch):
+    pkl = shutil.copy(RUTA_MODELO, tmp_path / RUTA_MODELO.name)
+    bosque = shutil.copy(RUTA_ARTEFACTO, tmp_path / RUTA_ARTEFACTO.name)
+    monkeypatch.setattr(modelo, "RUTA_MODELO", pkl)
+    monkeypatch.setattr(modelo, "RUTA_ARTEFACTO", bosque)
+    monkeypatch.delenv(modelo.VARIABLE_MODELO, raising=False)
+    return pkl, bosque
+
+
+def test_se_prefiere_el_artefacto_del_pkl_actual(copias):
+    pkl, bosque = copias
+    assert artefacto_vigente()
+    assert ruta_preferida() == bosque
+
+
+def test_artefacto_de_otro_pkl_cede_al_pkl(copias, caplog):
+    pkl, bosque = copias
+    # Un .pkl reentrenado: el artefacto ya no corresponde
+    with open(pkl, "ab") as archivo:
+        archivo.write(b"\0")
+    assert not artefacto_vigente()
+    assert ruta_preferida() == pkl
+    assert "reentrenó" in caplog.text
+
+
+def test_sin_pkl_vale_el_artefacto(copias):
+    pkl, bosque = copias
+    pkl.unlink()
+    assert ruta_preferida() == bosque
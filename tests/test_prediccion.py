@@ -0,0 +1,41 @@
+import pytest
+
+from recomendador.esquema import CAMPOS, DOMINIOS, EDAD, GENERO, normalizar_perfil
+from recomendador.modelo import cargar_modelo
+from recomendador.prediccion import crear_predictor
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["tabla", "codificador"])
+def predictor(request):
+    predictor = crear_predictor(cargar_modelo(), usar_tabla=request.param, usar_cache=False, usar_registro=False)
+    if request.param and predictor.tabla is None:
+        pytest.skip("No hay tabla de perfiles vigente")
+    return predictor
+
+
+@pytest.mark.parametrize("campo", CAMPOS[1:])
+def test_valor_fuera_del_dominio_da_value_error(predictor, campo):
+    perfil = {c: DOMINIOS[c][0] for c in CAMPOS}
+    perfil[campo] = "Otro"
+    with pytest.raises(ValueError, match=campo):
+        predictor.predecir(perfil)
+
+
+def test_tabla_y_codificador_coinciden():
+    modelo_cargado = cargar_modelo()
+    con_tabla = crear_predictor(modelo_cargado, usar_cache=False, usar_registro=False)
+    sin_tabla = crear_predictor(modelo_cargado, usar_tabla=False, usar_cache=False, usar_registro=False)
+    perfil = normalizar_perfil({c: DOMINIOS[c][-1] for c in CAMPOS})
+    perfil[GENERO] = "Prefiero no decirlo"
+    assert con_tabla.predecir(perfil) == sin_tabla.predecir(perfil)
+
+
+def test_explicacion_omite_campos_sin_columna():
+    predictor = crear_predictor(cargar_modelo(), usar_tabla=False, usar_cache=False, usar_registro=False)
+    perfil = normalizar_perfil({c: DOMINIOS[c][0] for c in CAMPOS})
+    explicacion = predictor.explicar(perfil)
+    # La edad exacta de la app no cae en ningún tramo Edad_… del modelo
+    assert EDAD in explicacion.sin_columna
+    assert EDAD not in dict(explicacion.ordenados())
+    total = explicacion.base + sum(aporte for _, aporte in explicacion.ordenados())
+    assert total == pytest.approx(predictor.predecir(perfil).prob_si)
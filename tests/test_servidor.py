@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from recomendador.esquema import normalizar_perfil
+from recomendador.modelo import cargar_modelo
+from recomendador.prediccion import crear_predictor
+from recomendador.servidor import MicroLotes, crear_servidor
+
+PERFIL = {
+    "Edad": 21,
+    "Género": "Femenino",
+    "Tipo_de_piel": "Mixta",
+    "Color_de_piel": "Clara",
+    "quemarse": "A veces",
+    "horas_sol": "Entre 1 y 3 horas",
+    "aire_libre": "Ocasionalmente",
+}
+
+
+@pytest.fixture(scope="module")
+def url():
+    with pytest.MonkeyPatch.context() as parche:
+        parche.setenv("RECOMENDADOR_REGISTRO", "0")
+        servidor = crear_servidor(puerto=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+        limite = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base + "/listo")
+                break
+            except urllib.error.HTTPError:
+                assert time.monotonic() < limite, "el modelo no cargó"
+                time.sleep(0.05)
+        yield base
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def _post(url, cuerpo):
+    peticion = urllib.request.Request(url + "/predecir", data=json.dumps(cuerpo).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+            return respuesta.status, json.load(respuesta)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_perfil_no_escalar_da_400_y_el_servicio_sigue(url):
+    estado, cuerpo = _post(url, {**PERFIL, "Edad": [1]})
+    assert estado == 400
+    assert "Edad" in cuerpo["error"]
+
+    estado, cuerpo = _post(url, PERFIL)
+    assert estado == 200
+    assert 0.0 <= cuerpo["prob_si"] <= 1.0
+
+
+def test_un_perfil_que_falla_no_detiene_los_micro_lotes():
+    predictor = crear_predictor(cargar_modelo(), usar_tabla=False, usar_cache=False, usar_registro=False)
+    lotes = MicroLotes(predictor)
+    # Sin pasar por normalizar_perfil: el codificador recibe una lista
+    perfil = normalizar_perfil(PERFIL)
+    malo = lotes.enviar({**perfil, "Edad": [1]})
+    with pytest.raises(TypeError):
+        malo.result(5)
+    assert lotes.predecir(perfil, timeout=5).prob_si == predictor.predecir(perfil).prob_si